@@ -0,0 +1,170 @@
+# Arrow storage for the json-like list_of_dict columns (genres,
+# production_companies, production_countries, spoken_languages).
+# Instead of python lists of dicts in object columns, each column is
+# one Arrow list<struct<id, name>> array: an offsets buffer, an id
+# buffer and a dictionary encoded name buffer, held by the DataFrame
+# as a pd.ArrowDtype column and written to Parquet as is.
+#
+# usage:
+# from arrow_utils import to_arrow_columns, contains_id, list_lengths
+# df = to_arrow_columns(df)                  # after process_columns
+# comedies = df[contains_id(df['genres'], 35)]
+# df['num_genres'] = list_lengths(df['genres'])
+# write_parquet(df, "all_cleaned.parquet")
+# df = read_parquet("all_cleaned.parquet")
+#
+# The accessors work on the offsets and values buffers with numpy and
+# pyarrow.compute, never on python objects per row.
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from column_types import column_types, extract_list_of_dict
+
+# the key of each list_of_dict column used as the element id; the
+# countries and languages are identified by their iso codes
+list_of_dict_id_keys = {
+    "genres": "id",
+    "production_companies": "id",
+    "production_countries": "iso_3166_1",
+    "spoken_languages": "iso_639_1",
+}
+
+NAME_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+def get_list_struct_type(id_key="id"):
+    # list<struct<id:int32, name:dictionary<string>>>, with a string
+    # dictionary id for the iso code keys
+    id_type = pa.int32() if id_key == "id" else NAME_TYPE
+    return pa.list_(pa.struct([("id", id_type), ("name", NAME_TYPE)]))
+
+def to_arrow_list_array(values, id_key="id"):
+    # an Arrow list<struct> array of a sequence of lists of dicts.
+    # Strings are parsed like process_columns, missing values are null.
+    offsets = [0]
+    ids, names, valid = [], [], []
+    for value in values:
+        if isinstance(value, str):
+            value = extract_list_of_dict(value)
+        if isinstance(value, list):
+            for item in value:
+                ids.append(item.get(id_key) if isinstance(item, dict) else None)
+                names.append(item.get("name") if isinstance(item, dict) else None)
+            valid.append(True)
+        else:
+            valid.append(False)
+        offsets.append(len(ids))
+    list_type = get_list_struct_type(id_key)
+    id_type = list_type.value_type.field("id").type
+    if pa.types.is_dictionary(id_type):
+        id_array = pa.array(ids, type=pa.string()).dictionary_encode()
+    else:
+        id_array = pa.array(ids, type=pa.int32())
+    name_array = pa.array(names, type=pa.string()).dictionary_encode()
+    structs = pa.StructArray.from_arrays([id_array, name_array], fields=list(list_type.value_type))
+    mask = pa.array(np.logical_not(valid), type=pa.bool_())
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), structs, mask=mask)
+
+def is_list_of_dict_column(col):
+    return column_types.get(col) == "list_of_dict"
+
+def to_arrow_columns(df, cols=None):
+    # replace the list_of_dict columns of df with Arrow backed columns
+    if cols is None:
+        cols = [col for col in df.columns if is_list_of_dict_column(col)]
+    df = df.copy(deep=False)
+    for col in cols:
+        array = to_arrow_list_array(df[col], id_key=list_of_dict_id_keys.get(col, "id"))
+        df[col] = pd.Series(pd.arrays.ArrowExtensionArray(array), index=df.index, name=col)
+    return df
+
+def as_list_array(values):
+    # the single pyarrow ListArray behind a Series, ChunkedArray or array
+    if isinstance(values, pd.Series):
+        if not isinstance(values.dtype, pd.ArrowDtype):
+            raise ValueError(f"column:{values.name} is not Arrow backed, convert it with to_arrow_columns")
+        values = pa.array(values)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    if not pa.types.is_list(values.type):
+        raise ValueError(f"expected an Arrow list array, got type:{values.type}")
+    return values
+
+def list_lengths(values):
+    # number of elements of each row, 0 for missing rows
+    array = as_list_array(values)
+    offsets = array.offsets.to_numpy()
+    return np.diff(offsets)
+
+def list_parent_rows(values):
+    # the row of each flattened element
+    array = as_list_array(values)
+    return np.repeat(np.arange(len(array)), list_lengths(array))
+
+def flat_values(values):
+    # the struct elements of the rows, in row order, honoring slices
+    array = as_list_array(values)
+    offsets = array.offsets.to_numpy()
+    return array.values.slice(offsets[0], offsets[-1] - offsets[0])
+
+def rows_with(values, element_mask):
+    # True for each row having at least one element where element_mask is
+    array = as_list_array(values)
+    hits = np.bincount(list_parent_rows(array)[element_mask], minlength=len(array))
+    return hits > 0
+
+def element_matches(field_array, value):
+    # True where a field of the flattened elements equals value
+    if pa.types.is_dictionary(field_array.type):
+        positions = np.flatnonzero(field_array.dictionary.to_numpy(zero_copy_only=False) == value)
+        if len(positions) == 0:
+            return np.zeros(len(field_array), dtype=bool)
+        indices = field_array.indices.to_numpy(zero_copy_only=False)
+        return np.isin(indices, positions)
+    return pc.fill_null(pc.equal(field_array, pa.scalar(value, field_array.type)), False).to_numpy(zero_copy_only=False)
+
+def contains_id(values, element_id):
+    # True for each row with an element of the given id
+    return rows_with(values, element_matches(flat_values(values).field("id"), element_id))
+
+def contains_name(values, name):
+    return rows_with(values, element_matches(flat_values(values).field("name"), name))
+
+def list_names(values):
+    # list<dictionary<string>> of the names of each row, sharing the
+    # offsets and name buffers of the column
+    array = as_list_array(values)
+    names = pa.ListArray.from_arrays(array.offsets, array.values.field("name"), mask=array.is_null())
+    return names
+
+def list_ids(values):
+    array = as_list_array(values)
+    return pa.ListArray.from_arrays(array.offsets, array.values.field("id"), mask=array.is_null())
+
+def explode_list_column(values):
+    # one row per element: the row position, id and name, with the
+    # names and string ids as Categoricals
+    elements = flat_values(values)
+    frame = {'row': list_parent_rows(values)}
+    for key in ["id", "name"]:
+        field_array = elements.field(key)
+        if pa.types.is_dictionary(field_array.type):
+            frame[key] = pd.Categorical.from_codes(
+                field_array.indices.fill_null(-1).to_numpy(),
+                field_array.dictionary.to_pylist())
+        else:
+            frame[key] = field_array.to_numpy(zero_copy_only=False)
+    return pd.DataFrame(frame)
+
+def write_parquet(df, parquet_path):
+    # Arrow backed columns are written with their nested types
+    df.to_parquet(parquet_path, engine="pyarrow", index=False)
+
+def read_parquet(parquet_path):
+    # list columns come back Arrow backed, the other columns as numpy.
+    # The pandas metadata is ignored, it cannot describe nested ArrowDtypes.
+    table = pq.read_table(parquet_path)
+    return table.to_pandas(types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_list(t) else None,
+                           ignore_metadata=True)
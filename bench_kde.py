@@ -0,0 +1,77 @@
+# Benchmark the FFT binned_kde against gaussian_kde and
+# KernelDensity.score_samples on samples of increasing size, evaluated
+# at the 1,000 curve points of the multimodal analyses, with the
+# largest deviation from each exact estimate relative to its peak.
+#
+# usage:
+# python bench_kde.py [nrows ...]
+#
+# defaults to 3,000 (the multimodal demo) up to 1,000,000 rows. The
+# exact estimates are skipped above MAX_EXACT_ROWS, where they take minutes.
+
+import sys
+import time
+import numpy as np
+from scipy.stats import gaussian_kde
+from sklearn.neighbors import KernelDensity
+from kde_utils import binned_kde
+
+DEFAULT_ROW_COUNTS = [3_000, 45_000, 1_000_000]
+MAX_EXACT_ROWS = 100_000
+NUM_CURVE_POINTS = 1000
+NUM_REPEATS = 3
+KERNEL_DENSITY_BANDWIDTH = 0.5
+
+def make_sample(nrows):
+    # the three modes of the multimodal_distribution_analysis demo
+    rng = np.random.default_rng(0)
+    sizes = rng.multinomial(nrows, [1 / 3, 1 / 2, 1 / 6])
+    return np.concatenate([rng.normal(-5, 1, sizes[0]), rng.normal(0, 1.5, sizes[1]),
+                           rng.normal(5, 0.5, sizes[2])])
+
+def time_best(func, repeats=NUM_REPEATS):
+    # best of repeats, and the last result
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def relative_error(estimate, exact):
+    return np.abs(estimate - exact).max() / exact.max()
+
+def bench_sample(data):
+    # rows of (method, seconds, relative error)
+    x = np.linspace(data.min(), data.max(), NUM_CURVE_POINTS)
+    rows = []
+    seconds, scott = time_best(lambda: binned_kde(data, bandwidth='scott', x=x)[1])
+    if len(data) <= MAX_EXACT_ROWS:
+        exact_seconds, exact = time_best(lambda: gaussian_kde(data)(x), repeats=1)
+        rows.append(('gaussian_kde', exact_seconds, 0.0))
+        rows.append(('binned_kde scott', seconds, relative_error(scott, exact)))
+    else:
+        rows.append(('binned_kde scott', seconds, np.nan))
+
+    seconds, fixed = time_best(lambda: binned_kde(data, bandwidth=KERNEL_DENSITY_BANDWIDTH, x=x)[1])
+    if len(data) <= MAX_EXACT_ROWS:
+        kde = KernelDensity(bandwidth=KERNEL_DENSITY_BANDWIDTH).fit(data[:, None])
+        exact_seconds, exact = time_best(lambda: np.exp(kde.score_samples(x[:, None])), repeats=1)
+        rows.append(('KernelDensity', exact_seconds, 0.0))
+        rows.append((f'binned_kde {KERNEL_DENSITY_BANDWIDTH}', seconds, relative_error(fixed, exact)))
+    else:
+        rows.append((f'binned_kde {KERNEL_DENSITY_BANDWIDTH}', seconds, np.nan))
+
+    seconds, _ = time_best(lambda: binned_kde(data, bandwidth='isj', x=x))
+    rows.append(('binned_kde isj', seconds, np.nan))
+    return rows
+
+if __name__ == '__main__':
+    row_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS
+    print(f"{'Rows':>10} {'Method':>20} {'Seconds':>10} {'Rel error':>10}")
+    print('-' * 53)
+    for nrows in row_counts:
+        data = make_sample(nrows)
+        for method, seconds, error in bench_sample(data):
+            error = f"{error:>10.2e}" if np.isfinite(error) else f"{'-':>10}"
+            print(f"{nrows:>10} {method:>20} {seconds:>10.4f} {error}")
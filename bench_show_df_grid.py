@@ -0,0 +1,49 @@
+# Benchmark show_df_grid on frames of increasing length to show
+# that the cost of a preview stays flat as the number of rows grows.
+#
+# usage:
+# python bench_show_df_grid.py [nrows ...]
+#
+# defaults to 45,000 (the movies dataset) up to 10,000,000 rows
+
+import contextlib
+import io
+import sys
+import time
+import numpy as np
+import pandas as pd
+from stat_utils import show_df_grid
+
+DEFAULT_ROW_COUNTS = [45_000, 1_000_000, 10_000_000]
+NUM_COLUMNS = 8
+NUM_REPEATS = 5
+
+def make_frame(nrows, ncols=NUM_COLUMNS):
+    rng = np.random.default_rng(0)
+    data = {}
+    for j in range(ncols):
+        if j % 2 == 0:
+            data[f"col_{j}"] = rng.normal(0, 1e6, nrows).astype(np.float32)
+        else:
+            data[f"col_{j}"] = rng.integers(0, 1_000_000, nrows, dtype=np.int32)
+    return pd.DataFrame(data)
+
+def time_show_df_grid(df, repeats=NUM_REPEATS):
+    # best of repeats, with the printed grid discarded
+    best = float('inf')
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            show_df_grid(df, N=3, val_size=8, col_width=10)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == '__main__':
+    row_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS
+    print(f"{'Rows':>12} {'Cols':>6} {'Seconds':>10}")
+    print('-' * 30)
+    for nrows in row_counts:
+        df = make_frame(nrows)
+        seconds = time_show_df_grid(df)
+        print(f"{nrows:>12} {len(df.columns):>6} {seconds:>10.4f}")
+        del df
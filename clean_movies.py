@@ -1,17 +1,34 @@
 import pandas as pd
 import os
-from column_types import process_columns, get_column_type_extractor, is_numeric_column
+from column_types import process_columns, get_column_extractor, is_numeric_column
 import stat_utils
 from plot_utils import plot_column_distribution
 from sklearn.preprocessing import StandardScaler
 from env_utils import reload_dotenv 
 from stat_utils import show_column_stats
+from column_catalog import ColumnCatalog
+from zip_utils import (is_zip_path, list_zip_csv_members, read_zip_csv_members,
+                       MOVIES_METADATA_MEMBER, MOVIES_COMPANION_MEMBERS)
+from csv_scanner import read_csv_scanned, show_csv_scan_report
+from arrow_utils import to_arrow_columns, write_parquet
+from text_index import TextIndex
+from key_index import build_key_indexes, save_key_indexes
+from near_duplicates import find_near_duplicates, show_near_duplicates
+from quality_rules import check_quality, show_rule_report
+from distribution_report import DistributionReport
+from histogram_store import HistogramStore, compare_stores
  
 reload_dotenv()
 
-def clean_movies(df):
+def clean_movies(df, report_dir=None, histogram_store=None):
     # The mother cleaner function that applies all the cleaning functions
-    # and returns the cleaned DataFrame
+    # and returns the cleaned DataFrame.
+    # With a report_dir, the distributions of the numeric columns before
+    # and after scaling are written to a static report there instead of
+    # being shown one interactive figure at a time.
+    # With a histogram_store the report reads its histograms from the
+    # store, which is compared with the one saved by the previous run
+    # and then saved in its place.
     
     print(f"clean_movies starting - rows: {len(df)} columns: {len(df.columns)}")   
 
@@ -25,18 +42,23 @@ def clean_movies(df):
     
     print(f"clean_movies after dropping {num_duplicates} duplicate rows - rows: {len(df)} columns: {len(df.columns)}")   
 
+    # profile the null counts of every column once, the catalog
+    # is shared by the column dropping steps below
+    catalog = ColumnCatalog(df)
+
     # Drop columns that have all null values
-    blank_columns = df.columns[df.isnull().all()]
+    blank_columns = catalog.blank_columns()
     print(f"Dropping blank columns: {blank_columns}")
     df = df.drop(columns=blank_columns)
+    catalog.rebind(df)
   
     print(f"clean_movies after dropping {len(blank_columns)} blank columns - rows: {len(df)} columns: {len(df.columns)}")   
 
     # Drop columns with more than 50% missing values
-    missing_threshold = 0.5 * len(df)
-    missing_columns = df.columns[df.isnull().sum() > missing_threshold] 
+    missing_columns = catalog.columns_with_null_fraction_above(0.5)
     print(f"Dropping columns with more than 50% missing values: {missing_columns}") 
     df = df.drop(columns=missing_columns)
+    catalog.rebind(df)
 
     # for each common column type, apply the appropriate cleaning function
     # for example, if each value in a column is defined as a float,
@@ -44,37 +66,65 @@ def clean_movies(df):
     # or None if conversion is not possible, for example if the value
     # is a string that cannot be converted to a float.
     df = process_columns(df)
+    catalog.rebind(df)
     
-    df = autoscale_numeric_columns(df, verbose=True)
+    report = DistributionReport(report_dir, store=histogram_store) if report_dir else None
+    df = autoscale_numeric_columns(df, verbose=True, catalog=catalog, report=report)
+    if report is not None:
+        print(f"Saved the distribution report to {report.write()}")
+    if histogram_store is not None and histogram_store.path:
+        show_histogram_drift(histogram_store)
+        histogram_store.save()
+        print(f"Saved the column histograms to {histogram_store.path}")
     
     print(f"clean_movies finished with rows: {len(df)} columns: {len(df.columns)}")   
 
     # Return the cleansed df for further investigation
     return df
 
-def autoscale_numeric_columns(df, verbose=False):
+# the drift of each column histogram since the histograms were last saved
+def show_histogram_drift(histogram_store):
+    previous = HistogramStore(histogram_store.path)
+    if not previous.names:
+        return
+    drift = compare_stores(previous, histogram_store)
+    if len(drift) > 0:
+        print("Column histogram drift since the last run:")
+        print(drift.to_string(float_format=lambda x: f"{x:.4f}"))
+
+# catalog is an optional ColumnCatalog of df that the stats are
+# read from, whose profiles of the scaled columns are invalidated
+# report is an optional DistributionReport
+def autoscale_numeric_columns(df, verbose=False, catalog=None, report=None):
     for col in df.columns:
         if is_numeric_column(col):
-            df = autoscale_numeric_column(df, col, verbose=verbose)            
+            df = autoscale_numeric_column(df, col, verbose=verbose, report=report, catalog=catalog)
+    return df
 
-def show_column_stats_and_distribution(df, col, title=""):
-    stat_utils.show_column_stats(df, col, title=title)
-    plot_column_distribution(df, col, title=title)
+# the distribution is added to report if given, otherwise it is
+# shown as an interactive figure
+def show_column_stats_and_distribution(df, col, title="", report=None, stage="", catalog=None):
+    stat_utils.show_column_stats(df, col, title=title, catalog=catalog)
+    if report is not None:
+        report.add(df, col, stage=stage)
+    else:
+        plot_column_distribution(df, col, title=title)
 
-def autoscale_numeric_column(df, col, verbose=False):
+def autoscale_numeric_column(df, col, verbose=False, report=None, catalog=None):
     # use the column type extractor to identify valid values
     # apply StandardScaler to the valid values
     # reinsert the scaled values back into the DataFrame
     # return the DataFrame with the scaled column
     # includes option to show stats and distribution
-    # before and after scaling
+    # before and after scaling, or to add them to a report
     
-    title = "Column:{col} stats and distribution"
+    title = f"Column:{col} stats and distribution"
     if verbose:
-        show_column_stats_and_distribution(df, col, title=title+" before scaling")
+        show_column_stats_and_distribution(df, col, title=title+" before scaling", report=report, stage="before scaling",
+                                           catalog=catalog)
         
     # Get the column type extractor
-    column_type_extractor = get_column_type_extractor(col)
+    column_type_extractor = get_column_extractor(col)
     
     # Create a column type matcher which retuns a valid value or None
     def column_type_matcher(x):
@@ -92,9 +142,12 @@ def autoscale_numeric_column(df, col, verbose=False):
     
     # Reinsert scaled values back into the DataFrame
     df.loc[valid_values.index, col] = scaled_values
+    if catalog is not None:
+        catalog.invalidate(col)
     
     if verbose:
-        show_column_stats_and_distribution(df, col, title=title+" after scaling")
+        show_column_stats_and_distribution(df, col, title=title+" after scaling", report=report, stage="after scaling",
+                                           catalog=catalog)
 
     # return the DataFrame with the scaled column
     return df
@@ -102,6 +155,10 @@ def autoscale_numeric_column(df, col, verbose=False):
 
 if __name__ == '__main__':
     # Read the CSV file into a Pandas DataFrame
+    # MOVIES_CSV_PATH may also point at the downloaded zip file, in which
+    # case the movies_metadata.csv member is streamed without unzipping,
+    # concurrently with the members listed in MOVIES_ZIP_MEMBERS, comma
+    # separated, by default the MOVIES_COMPANION_MEMBERS in the zip file
     movies_csv_file = os.getenv('MOVIES_CSV_PATH')
     if not movies_csv_file:
         raise ValueError("MOVIES_CSV_PATH environment variable is not set")
@@ -111,25 +168,79 @@ if __name__ == '__main__':
     if not movie_outputs_path:
         raise ValueError("MOVIES_OUTPUTS_PATH environment variable is not set")
     all_cleaned_csv_path = os.path.join(movie_outputs_path, "all_cleaned.csv")
+    all_cleaned_parquet_path = os.path.join(movie_outputs_path, "all_cleaned.parquet")
     
+    # rows broken by bad quoting are realigned while reading, and the
+    # rows that cannot be realigned are quarantined here
+    quarantine_path = os.path.join(movie_outputs_path, "quarantined_rows.csv")
+
     print(f"Reading from {movies_csv_file} forcing dtype=str")
-    df = pd.read_csv("movies.csv", dtype=str, low_memory=False)
+    if is_zip_path(movies_csv_file):
+        zip_members = os.getenv('MOVIES_ZIP_MEMBERS')
+        if zip_members is None:
+            names = [os.path.basename(name) for name in list_zip_csv_members(movies_csv_file)]
+            companions = [member for member in MOVIES_COMPANION_MEMBERS if member in names]
+        else:
+            companions = [member.strip() for member in zip_members.split(',') if member.strip()]
+        scan_reports = []
+
+        def read_movies(f, **read_csv_kwargs):
+            movies_df, movies_report = read_csv_scanned(f, quarantine_path=quarantine_path, **read_csv_kwargs)
+            scan_reports.append(movies_report)
+            return movies_df
+
+        frames, all_stats = read_zip_csv_members(movies_csv_file, [MOVIES_METADATA_MEMBER] + companions,
+                                                 readers={MOVIES_METADATA_MEMBER: read_movies},
+                                                 dtype=str, low_memory=False)
+        # keyed by full member name, the companion frames stay in frames
+        df = frames[all_stats[0].member]
+        scan_report = scan_reports[0]
+    else:
+        df, scan_report = read_csv_scanned(movies_csv_file, quarantine_path=quarantine_path, dtype=str, low_memory=False)
+    show_csv_scan_report(scan_report, quarantine_path=quarantine_path)
     
+    # check the declared data-quality rules of quality_rules.py
+    show_rule_report(check_quality(df))
+
+    # index the text columns for keyword lookups by row position
+    text_index_path = os.path.join(movie_outputs_path, "text_index.npz")
+    TextIndex().add_frame(df).save(text_index_path)
+    print(f"Saved the text index to {text_index_path}")
+
+    # re-releases and movies listed under more than one id, which the
+    # exact duplicate check of clean_movies does not catch
+    _, near_duplicate_clusters = find_near_duplicates(df)
+    show_near_duplicates(near_duplicate_clusters, df)
+    near_duplicates_path = os.path.join(movie_outputs_path, "near_duplicates.csv")
+    near_duplicate_clusters.to_csv(near_duplicates_path, index=False)
+
     # before doing any cleaning, show the stats of 
     # of the original dataframe
     if input("Want to review the dataset stats?") == 'y':
+        catalog = ColumnCatalog(df)
         for col in df.columns:
-            show_column_stats(df, col)
+            show_column_stats(df, col, catalog=catalog)
 
     if input("Ready to start cleaning the dataset? (y/n): ") == 'y':
-        df = clean_movies(df)
+        # the before and after scaling distributions go to a static report
+        report_dir = os.path.join(movie_outputs_path, "distribution_report")
+        histogram_store = HistogramStore(os.path.join(movie_outputs_path, "histograms.npz"))
+        df = clean_movies(df, report_dir=report_dir, histogram_store=histogram_store)
 
         if input("Want to review the final dataset stats?") == 'y':
+            catalog = ColumnCatalog(df)
             for col in df.columns:
-                show_column_stats(df, col)
+                show_column_stats(df, col, catalog=catalog)
 
         if input("Ready to save the data (y/n): ") == 'y':
             print(f"Saving cleaned df to {all_cleaned_csv_path}")
             df.to_csv(all_cleaned_csv_path, index=False)
+            # the list_of_dict columns are stored as nested Arrow lists
+            print(f"Saving cleaned df to {all_cleaned_parquet_path}")
+            write_parquet(to_arrow_columns(df), all_cleaned_parquet_path)
+            # id and imdb_id lookups of the saved rows, by row position
+            key_index_path = os.path.join(movie_outputs_path, "key_index")
+            print(f"Saving the id and imdb_id key indexes to {key_index_path}")
+            save_key_indexes(build_key_indexes(df.reset_index(drop=True)), key_index_path)
 
     print("done")
\ No newline at end of file
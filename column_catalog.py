@@ -0,0 +1,192 @@
+# A catalog of per-column profiles computed once for a DataFrame
+# and shared by the cleaning, dropping and reporting stages, instead
+# of each stage recomputing null masks, null counts, value counts,
+# nunique and the stats of numeric columns.
+#
+# usage:
+# from column_catalog import ColumnCatalog
+# catalog = ColumnCatalog(df)     # or ColumnCatalog(df, cache=ProfileCache())
+# df = df.drop(columns=catalog.blank_columns())
+# catalog.rebind(df)
+# ...
+# df[col] = cleaned_values
+# catalog.invalidate(col)   # only this column is profiled again
+# catalog.value_counts(col, 10)
+# catalog.get_stats(col)     # the stat_utils.ColumnStats of a numeric column
+#
+# A profile stays valid until its column changes. Dropping columns
+# keeps the profiles of the remaining columns, and rebind profiles
+# again the columns whose content fingerprint changed, e.g. after
+# process_columns rewrote their values; dropping or reordering rows
+# invalidates every profile. With a profile_cache.ProfileCache,
+# columns whose content was already profiled are looked up on disk.
+
+from dataclasses import dataclass, replace
+import numpy as np
+import pandas as pd
+from column_types import column_types
+from profile_cache import column_fingerprint
+
+# the most frequent values kept in each profile
+MAX_TOP_VALUES = 10
+# bump when the fields of ColumnProfile change
+PROFILE_CACHE_KIND = "column_profile_v2"
+
+@dataclass
+class ColumnProfile:
+    column: str
+    nrows: int
+    null_bitmap: np.ndarray  # np.packbits of the null mask, 1 bit per row
+    null_count: int
+    distinct_count: int
+    top_values: pd.Series  # the MAX_TOP_VALUES most frequent values and their counts
+    column_type: str  # the declared column type, or the dtype name
+    memory_bytes: int
+
+    @property
+    def null_mask(self):
+        return np.unpackbits(self.null_bitmap, count=self.nrows).astype(bool)
+
+    @property
+    def null_fraction(self):
+        return self.null_count / self.nrows if self.nrows > 0 else 0.0
+
+    @property
+    def null_percent(self):
+        # rounded like stat_utils.get_column_nan_percent
+        return round(100 * self.null_fraction)
+
+def get_inferred_column_type(df, col):
+    column_type = column_types.get(col)
+    return column_type if column_type is not None else str(df[col].dtype)
+
+def count_values(series):
+    # the non-null value counts, most frequent first. Parsed json-like
+    # columns hold unhashable lists and dicts, which are counted by
+    # their string form instead
+    try:
+        return series.value_counts(dropna=True)
+    except TypeError:
+        return series.dropna().astype(str).value_counts()
+
+class ColumnCatalog:
+    """Per-column null bitmap, null count, distinct count, type and memory footprint of a DataFrame."""
+
+    def __init__(self, df, cache=None):
+        self.df = df
+        self.cache = cache
+        self.profiles = {}
+        self.fingerprints = {}
+        self.stats = {}
+        self.profile_count = 0
+        self._profile_columns(list(df.columns))
+
+    def _profile_columns(self, cols):
+        # the fingerprints tell rebind which columns changed
+        fingerprints = {col: column_fingerprint(self.df[col]) for col in cols}
+        self.fingerprints.update(fingerprints)
+        if self.cache is None:
+            self._compute_profiles(cols)
+            return
+        # profiles depend only on the column content, the column
+        # name and type are filled in again after a cache hit
+        missing = []
+        for col in cols:
+            profile = self.cache.get(PROFILE_CACHE_KIND, fingerprints[col])
+            if profile is None:
+                missing.append(col)
+            else:
+                self.profiles[col] = replace(profile, column=col,
+                                             column_type=get_inferred_column_type(self.df, col))
+        self._compute_profiles(missing)
+        for col in missing:
+            self.cache.put(PROFILE_CACHE_KIND, fingerprints[col], self.profiles[col])
+
+    def _compute_profiles(self, cols):
+        # one isna pass and one memory_usage pass over all the given columns
+        if len(cols) == 0:
+            return
+        df = self.df
+        null_masks = df[cols].isna().to_numpy()
+        null_counts = null_masks.sum(axis=0)
+        memory = df[cols].memory_usage(index=False, deep=True)
+        for j, col in enumerate(cols):
+            value_counts = count_values(df[col])
+            self.profiles[col] = ColumnProfile(
+                column=col,
+                nrows=len(df),
+                null_bitmap=np.packbits(null_masks[:, j]),
+                null_count=int(null_counts[j]),
+                distinct_count=len(value_counts),
+                top_values=value_counts.iloc[:MAX_TOP_VALUES],
+                column_type=get_inferred_column_type(df, col),
+                memory_bytes=int(memory.iloc[j]))
+        self.profile_count += len(cols)
+
+    def get(self, col):
+        if col not in self.df.columns:
+            raise ValueError(f"column:{col} is not in the catalog DataFrame")
+        if col not in self.profiles:
+            self._profile_columns([col])
+        return self.profiles[col]
+
+    def __getitem__(self, col):
+        return self.get(col)
+
+    def __contains__(self, col):
+        return col in self.df.columns
+
+    def value_counts(self, col, n=MAX_TOP_VALUES):
+        # the n most frequent values of col and their counts
+        if n <= MAX_TOP_VALUES:
+            return self.get(col).top_values.iloc[:n]
+        return count_values(self.df[col]).iloc[:n]
+
+    def get_stats(self, col):
+        # the stat_utils.ColumnStats of a numeric column, computed once
+        # per profile. Imported here since stat_utils uses the catalog.
+        from stat_utils import compute_column_stats
+        self.get(col)
+        if col not in self.stats:
+            self.stats[col] = compute_column_stats(self.df, [col], cache=self.cache)[col]
+        return self.stats[col]
+
+    def invalidate(self, col):
+        # call after the values of col have changed
+        self.profiles.pop(col, None)
+        self.fingerprints.pop(col, None)
+        self.stats.pop(col, None)
+
+    def rebind(self, df):
+        # point the catalog at a derived DataFrame. Profiles survive
+        # when only columns were dropped or added, those of columns
+        # whose content changed are computed again, and any change of
+        # the rows invalidates all of them.
+        same_rows = len(df) == len(self.df) and df.index.equals(self.df.index)
+        self.df = df
+        if same_rows:
+            kept = [col for col in self.profiles
+                    if col in df.columns and self.fingerprints.get(col) == column_fingerprint(df[col])]
+        else:
+            kept = []
+        self.profiles = {col: self.profiles[col] for col in kept}
+        self.fingerprints = {col: self.fingerprints[col] for col in kept}
+        self.stats = {col: stats for col, stats in self.stats.items() if col in self.profiles}
+        missing = [col for col in df.columns if col not in self.profiles]
+        self._profile_columns(missing)
+        return self
+
+    def all_profiles(self):
+        return [self.get(col) for col in self.df.columns]
+
+    def blank_columns(self):
+        return [p.column for p in self.all_profiles() if p.null_count == p.nrows]
+
+    def columns_with_null_fraction_above(self, fraction):
+        return [p.column for p in self.all_profiles() if p.null_count > fraction * p.nrows]
+
+    def columns_with_null_percent_at_least(self, threshold_perc):
+        return [p.column for p in self.all_profiles() if p.null_percent >= threshold_perc]
+
+    def memory_bytes(self):
+        return sum(p.memory_bytes for p in self.all_profiles())
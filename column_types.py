@@ -17,10 +17,15 @@ def show_all_column_stats(df):
     for col in df.columns:
         show_column_stats(df, col)
 
-def show_column_stats(df, col, title=""):
+# sketch is an optional sketch_utils.ColumnSketch of the column,
+# used for the unique count instead of an exact in-memory nunique
+def show_column_stats(df, col, title="", sketch=None):
     print(f"Column: {col} Stats: {title}")
     print(df[col].describe())
-    print(f"Number of unique values: {df[col].notnull().nunique()}")
+    if sketch is not None:
+        print(f"Number of unique values: ~{sketch.nunique()}")
+    else:
+        print(f"Number of unique values: {df[col].nunique()}")
     errors = column_errors.get(col)
     num_errors = 0 if errors is None else len(errors)
     print(f"Column: {col} has {num_errors} extraction errors")
@@ -196,10 +201,12 @@ def extract_list_of_dict(s):
 def is_list_of_dict(x):
     return extract_list_of_dict(x) is not None
 
+status_categories = ["Rumored", "Planned", "In Production", "Post Production", "Released", "Canceled"]
+
 def extract_status_category(x):
     if extract_string(x) is not None:
         x = x.strip()
-        if x in ["Rumored", "Planned", "In Production", "Post Production", "Released", "Canceled"]:
+        if x in status_categories:
             return x
     return None
 
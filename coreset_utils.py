@@ -0,0 +1,64 @@
+# Reduced representations of large 1-d samples, for the clustering and
+# outlier methods whose cost or memory grows faster than the number of
+# rows, and the vectorized passes that carry their results back to
+# every row.
+#
+# usage:
+# from coreset_utils import stratified_subsample, weighted_coreset, assign_nearest_center
+# sample = values[stratified_subsample(values, 20000)]   # every quantile range represented
+# coreset = weighted_coreset(values, 20000)              # bin means weighted by their counts
+# coreset = weighted_coreset(values, 20000, width=0.05, max_width=0.1)   # None if it needs wider bins
+# labels = coreset_labels[coreset.inverse]               # labels of the bins back to the rows
+# labels = assign_nearest_center(values, centers)        # index of the nearest center of each row
+
+from collections import namedtuple
+import numpy as np
+
+DEFAULT_NUM_STRATA = 10
+
+# points are the mean of the values in each non-empty bin of the given
+# width, weights their counts, and inverse the bin of each value
+Coreset = namedtuple('Coreset', ['points', 'weights', 'inverse', 'width'])
+
+def stratified_subsample(values, size, num_strata=DEFAULT_NUM_STRATA, seed=0):
+    # sorted indexes of size values, drawn without replacement from
+    # num_strata equal count quantile strata in proportion to their size,
+    # so the tails are represented as well as the bulk
+    values = np.asarray(values)
+    if size >= len(values):
+        return np.arange(len(values))
+    rng = np.random.default_rng(seed)
+    strata = np.array_split(np.argsort(values, kind='stable'), num_strata)
+    bounds = np.round(np.linspace(0, size, num_strata + 1)).astype(np.int64)
+    indexes = [rng.choice(stratum, min(count, len(stratum)), replace=False)
+               for stratum, count in zip(strata, np.diff(bounds))]
+    return np.sort(np.concatenate(indexes))
+
+def weighted_coreset(values, max_points, width=None, max_width=None):
+    # the values binned to at most max_points non-empty bins, starting
+    # at width (by default an even split of the range into max_points
+    # bins) and doubling it until they fit. None when they do not fit
+    # in bins of at most max_width.
+    values = np.asarray(values, dtype=np.float64)
+    if width is None:
+        span = values.max() - values.min()
+        width = span / max_points if span > 0 else 1.0
+    while True:
+        bins, inverse, counts = np.unique(np.floor(values / width).astype(np.int64),
+                                          return_inverse=True, return_counts=True)
+        if len(bins) <= max_points:
+            break
+        if max_width is not None and width * 2 > max_width:
+            return None
+        width *= 2
+    points = np.bincount(inverse, weights=values, minlength=len(bins)) / counts
+    return Coreset(points, counts, inverse, width)
+
+def assign_nearest_center(values, centers):
+    # the index of the nearest of centers for each of values, by binary
+    # search between the midpoints of the sorted centers
+    centers = np.asarray(centers, dtype=np.float64)
+    order = np.argsort(centers)
+    sorted_centers = centers[order]
+    midpoints = (sorted_centers[:-1] + sorted_centers[1:]) / 2
+    return order[np.searchsorted(midpoints, values)]
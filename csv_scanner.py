@@ -0,0 +1,407 @@
+# A single-pass, quote-aware record scanner for csv files whose rows
+# were broken by bad quoting, e.g. the movies_metadata.csv rows whose
+# overview was split by a bare line break, shifting every later field
+# of the row into the wrong column.
+#
+# usage:
+# from csv_scanner import read_csv_scanned, show_csv_scan_report
+# df, report = read_csv_scanned(csv_path, quarantine_path="quarantined_rows.csv",
+#                               dtype=str, low_memory=False)
+# show_csv_scan_report(report)
+#
+# The file is read in blocks. Records are framed on the raw bytes of a
+# block with numpy, record ends and field separators being the line
+# breaks and commas outside of quotes. Quotes are read as csv.reader
+# and pandas read them: a run of an odd number of quotes at the start
+# of a field opens a quoted section, within one it closes the section,
+# and anywhere else, e.g. 12" single, it is a literal character. A record must have the
+# field count of the header and the type signature of column_types:
+# every non-empty boolean, integer, float, date, dict and list_of_dict
+# field starts with a character its type can start with, and dates
+# are 10 characters long. Only the few records that fail are split
+# with csv.reader and realigned when possible:
+#   too few fields   joined with the following records, the split
+#                    field rejoined with the line break that split it
+#   too many fields  adjacent fields merged back into one string column,
+#                    at the first column that restores the signature
+# A record that csv.reader still splits differently, e.g. one whose
+# quoted section is never closed, is checked up to the end of its first
+# row and the records after it are framed again from there.
+# Records that cannot be realigned are written to the quarantine file
+# with their byte offset and line number, and left out of the DataFrame.
+# Good records are copied to pandas byte for byte, so apart from the
+# realigned and quarantined rows the result equals pd.read_csv.
+# The encoding must be ASCII compatible, e.g. utf-8 or latin-1.
+
+import csv
+import io
+import time
+from collections import namedtuple
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from column_types import column_types
+
+# a realigned or quarantined record, offset in bytes and line counted from 1
+RecordIssue = namedtuple("RecordIssue", ["offset", "line", "reason", "record"])
+
+# (characters a value may start with, required length or None)
+column_type_signatures = {
+    "boolean": ("TtFf", None),
+    "integer": ("0123456789", None),
+    "float": ("0123456789+-.", None),
+    "ymd_datetime": ("0123456789", 10),
+    "dict": ("{", None),
+    "list_of_dict": ("[", None),
+}
+
+# column types that realignment may merge extra fields into
+MERGEABLE_COLUMN_TYPES = {"string"}
+MAX_JOINED_RECORDS = 4
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+QUOTE, COMMA, CR, LF = ord('"'), ord(','), ord('\r'), ord('\n')
+
+# the bytes a quoted field may follow
+FIELD_STARTS = np.zeros(256, dtype=bool)
+FIELD_STARTS[[COMMA, CR, LF]] = True
+
+@dataclass
+class CsvScanReport:
+    source: str
+    columns: list = field(default_factory=list)
+    records: int = 0
+    bytes_scanned: int = 0
+    seconds: float = 0.0
+    realigned: list = field(default_factory=list)
+    quarantined: list = field(default_factory=list)
+
+def get_signature_checks(columns, types=None):
+    # (position, first character lookup table, length) of every
+    # column with a type signature
+    types = column_types if types is None else types
+    checks = []
+    for j, col in enumerate(columns):
+        signature = column_type_signatures.get(types.get(col))
+        if signature is not None:
+            first_chars, length = signature
+            table = np.zeros(256, dtype=bool)
+            table[list(first_chars.encode("ascii"))] = True
+            checks.append((j, table, length))
+    return checks
+
+def matches_signature(fields, checks):
+    # the signature check of one record split by csv.reader
+    for j, table, length in checks:
+        value = fields[j]
+        if value == "":
+            continue
+        if ord(value[0]) > 255 or not table[ord(value[0])]:
+            return False
+        if length is not None and len(value) != length:
+            return False
+    return True
+
+def get_quote_runs(b):
+    # the start of each run of consecutive quotes in a block starting
+    # outside of quotes, and whether the block is inside quotes after it.
+    # An odd run at the start of a field flips the state, any other odd
+    # run leaves it outside of quotes, closing a quoted section or being
+    # literal, and an even run is escaped quotes or an empty field.
+    quotes = np.flatnonzero(b == QUOTE)
+    first = np.concatenate([[True], np.diff(quotes) > 1]) if len(quotes) > 0 else np.zeros(0, dtype=bool)
+    run_starts = quotes[first]
+    odd = (np.diff(np.append(np.flatnonzero(first), len(quotes))) & 1) == 1
+    field_start = (run_starts == 0) | FIELD_STARTS[b[np.maximum(run_starts - 1, 0)]]
+    flips = np.cumsum(odd & field_start)
+    # the flips up to the last run that left the block outside of quotes
+    outside = np.maximum.accumulate(np.where(odd & ~field_start, flips, 0)) if len(flips) > 0 else flips
+    return run_starts, ((flips - outside) & 1) == 1
+
+def outside_quotes(quote_runs, positions):
+    run_starts, inside = quote_runs
+    runs = np.searchsorted(run_starts, positions) - 1
+    return (runs < 0) | ~inside[np.maximum(runs, 0)] if len(inside) > 0 else np.ones(len(positions), dtype=bool)
+
+def frame_records(b, at_eof):
+    # start, end, field count and field separator positions of the
+    # complete records of a block of bytes. A record ends after a line
+    # break outside of quotes, or at the end of the file.
+    quote_runs = get_quote_runs(b)
+    line_breaks = np.flatnonzero(b == LF)
+    ends = line_breaks[outside_quotes(quote_runs, line_breaks)] + 1
+    if at_eof and len(b) > 0 and (len(ends) == 0 or ends[-1] < len(b)):
+        ends = np.append(ends, len(b))
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+    commas = np.flatnonzero(b == COMMA)
+    commas = commas[outside_quotes(quote_runs, commas)]
+    if len(ends) > 0:
+        commas = commas[commas < ends[-1]]
+    comma_records = np.searchsorted(ends, commas, side="right")
+    counts = np.bincount(comma_records, minlength=len(ends)) + 1
+    return starts, ends, counts, commas, comma_records
+
+def content_ends(b, starts, ends):
+    # record ends without the trailing line break
+    ends = ends.copy()
+    ends -= (ends > starts) & (b[np.maximum(ends - 1, 0)] == LF)
+    ends -= (ends > starts) & (b[np.maximum(ends - 1, 0)] == CR)
+    return ends
+
+def signature_mask(b, starts, ends, commas, ncols, checks):
+    # True for each record, all with ncols fields, whose fields match
+    # the type signature
+    ok = np.ones(len(starts), dtype=bool)
+    if len(starts) == 0 or len(checks) == 0:
+        return ok
+    separators = commas.reshape(len(starts), ncols - 1)
+    record_ends = content_ends(b, starts, ends)
+    last = len(b) - 1
+    for j, table, length in checks:
+        field_starts = starts if j == 0 else separators[:, j - 1] + 1
+        field_ends = record_ends if j == ncols - 1 else separators[:, j]
+        quoted = (field_ends > field_starts) & (b[np.minimum(field_starts, last)] == QUOTE)
+        value_starts = field_starts + quoted
+        value_ends = field_ends - quoted
+        field_ok = table[b[np.minimum(value_starts, last)]]
+        if length is not None:
+            field_ok &= (value_ends - value_starts) == length
+        ok &= (value_ends <= value_starts) | field_ok
+    return ok
+
+def split_record(raw, encoding):
+    # the fields of the first row of raw as csv.reader splits it, and
+    # the length of that row in bytes, short of raw when frame_records
+    # ran the record on over the following rows. Returns None fields
+    # and the first line when csv.reader rejects the row.
+    lines = raw.splitlines(keepends=True)
+    reader = csv.reader(line.decode(encoding) for line in lines)
+    try:
+        fields = next(reader, [])
+    except csv.Error:
+        return None, len(lines[0]) if lines else 0
+    return fields, sum(len(line) for line in lines[:reader.line_num])
+
+def join_records(fields_list, raws):
+    # rejoin records split by a bare line break: the last field of one
+    # record continues in the first field of the next
+    fields = list(fields_list[0])
+    for next_fields, raw in zip(fields_list[1:], raws):
+        line_break = "\r\n" if raw.endswith(b"\r\n") else "\n"
+        if fields and next_fields:
+            fields[-1] = fields[-1] + line_break + next_fields[0]
+            fields.extend(next_fields[1:])
+        else:
+            fields.extend(next_fields)
+    return fields
+
+def merge_extra_fields(fields, ncols, checks, mergeable):
+    # merge the surplus fields back into the first mergeable column
+    # that gives a record with the header's signature, or None
+    extra = len(fields) - ncols
+    for j in mergeable:
+        merged = fields[:j] + [",".join(fields[j:j + extra + 1])] + fields[j + extra + 1:]
+        if matches_signature(merged, checks):
+            return merged
+    return None
+
+def format_record(fields, encoding):
+    text = io.StringIO()
+    csv.writer(text, lineterminator="\n").writerow(fields)
+    return text.getvalue().encode(encoding)
+
+def with_line_break(raw):
+    return raw if raw.endswith(b"\n") else raw + b"\n"
+
+class CsvScanner:
+    """Frames, checks and realigns the records of a csv file in one pass."""
+
+    def __init__(self, encoding="utf-8", types=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.encoding = encoding
+        self.types = column_types if types is None else types
+        self.block_size = block_size
+
+    def scan(self, f, source=""):
+        # scan an open binary csv file. Returns the bytes of a csv with
+        # only well formed records, and the CsvScanReport of the scan.
+        start = time.perf_counter()
+        self.report = CsvScanReport(source=source)
+        self.segments = []
+        self.pending = []
+        self.ncols = None
+        block_offset, block_line = 0, 1
+        data = b""
+        at_eof = False
+        reframe = False
+        while True:
+            if not reframe:
+                chunk = f.read(self.block_size)
+                at_eof = len(chunk) == 0
+                data += chunk
+            b = np.frombuffer(data, dtype=np.uint8)
+            starts, ends, counts, commas, comma_records = frame_records(b, at_eof)
+            if len(ends) == 0:
+                # a record longer than the block
+                if at_eof:
+                    break
+                reframe = False
+                continue
+            framed = int(ends[-1])
+            line_breaks = np.flatnonzero(b[:framed] == LF)
+            used = self.scan_block(data, b, block_offset, block_line, line_breaks,
+                                   starts, ends, counts, commas, comma_records)
+            reframe = used < framed
+            data = data[used:]
+            block_offset += used
+            block_line += int(np.searchsorted(line_breaks, used))
+            if at_eof and not reframe:
+                break
+        if self.pending:
+            self.quarantine_pending()
+        self.report.bytes_scanned = block_offset
+        self.report.seconds = time.perf_counter() - start
+        return b"".join(self.segments), self.report
+
+    def scan_block(self, data, b, block_offset, block_line, line_breaks,
+                   starts, ends, counts, commas, comma_records):
+        # scan the framed records of a block, returns the number of bytes
+        # scanned, short of the framed records when they must be framed again
+        first = 0
+        if self.ncols is None:
+            # the first record of the file is the header
+            header_raw = data[starts[0]:ends[0]]
+            self.report.columns, _ = split_record(header_raw, self.encoding)
+            self.ncols = len(self.report.columns)
+            self.checks = get_signature_checks(self.report.columns, self.types)
+            self.mergeable = [j for j, col in enumerate(self.report.columns)
+                              if self.types.get(col) in MERGEABLE_COLUMN_TYPES]
+            self.segments.append(with_line_break(header_raw))
+            first = 1
+
+        # vectorized checks of every record, blank lines are kept for
+        # pandas to skip
+        full = counts == self.ncols
+        full[:first] = False
+        good = full.copy()
+        good[full] = signature_mask(b, starts[full], ends[full], commas[full[comma_records]],
+                                    self.ncols, self.checks)
+        good |= (counts == 1) & (ends - starts <= 2) & (b[np.minimum(starts, len(b) - 1)] != QUOTE)
+        good[:first] = True
+
+        copied = first
+        for i in np.flatnonzero(~good):
+            if i > copied:
+                # good records between two bad ones end any pending join
+                if self.pending:
+                    self.quarantine_pending()
+                self.segments.append(data[starts[copied]:ends[i - 1]])
+            raw = data[starts[i]:ends[i]]
+            line = block_line + int(np.searchsorted(line_breaks, starts[i]))
+            fields, length = split_record(raw, self.encoding)
+            record = (block_offset + int(starts[i]), line, raw[:length], fields)
+            if fields is None:
+                if self.pending:
+                    self.quarantine_pending()
+                self.quarantine(record, "not a csv record")
+            elif self.pending:
+                self.complete_pending(record)
+            else:
+                self.check_record(record)
+            if length < len(raw):
+                # the rest of the block is framed again after this row
+                self.report.records += i + 1 - first
+                return int(starts[i]) + length
+            copied = i + 1
+        self.report.records += len(starts) - first
+        if copied < len(starts):
+            if self.pending:
+                self.quarantine_pending()
+            self.segments.append(with_line_break(data[starts[copied]:ends[-1]]))
+        return int(ends[-1])
+
+    def decode(self, raw):
+        return raw.decode(self.encoding, errors="replace")
+
+    def quarantine(self, record, reason):
+        offset, line, raw, _ = record
+        self.report.quarantined.append(RecordIssue(offset, line, reason, self.decode(raw)))
+
+    def quarantine_pending(self):
+        reason = f"{len(self.pending[0][3])} fields, expected {self.ncols}"
+        for record in self.pending:
+            self.quarantine(record, reason)
+        self.pending = []
+
+    def realign(self, records, fields, reason):
+        self.segments.append(format_record(fields, self.encoding))
+        offset, line = records[0][0], records[0][1]
+        raw = b"".join(record[2] for record in records)
+        self.report.realigned.append(RecordIssue(offset, line, reason, self.decode(raw)))
+
+    def check_record(self, record):
+        fields = record[3]
+        if len(fields) == self.ncols and matches_signature(fields, self.checks):
+            # a row framed with the rows after it, which pandas reads as
+            # csv.reader does, copied on its own
+            self.segments.append(with_line_break(record[2]))
+        elif len(fields) == self.ncols:
+            self.quarantine(record, "type signature mismatch")
+        elif len(fields) < self.ncols:
+            self.pending = [record]
+        else:
+            merged = merge_extra_fields(fields, self.ncols, self.checks, self.mergeable)
+            if merged is None:
+                self.quarantine(record, f"{len(fields)} fields, expected {self.ncols}")
+            else:
+                self.realign([record], merged, f"merged {len(fields) - self.ncols} extra fields")
+
+    def complete_pending(self, record):
+        # try to complete the pending short records with this one
+        candidate = self.pending + [record]
+        joined = join_records([r[3] for r in candidate], [r[2] for r in candidate[:-1]])
+        if len(joined) < self.ncols and len(candidate) < MAX_JOINED_RECORDS:
+            self.pending = candidate
+            return
+        if len(joined) == self.ncols and matches_signature(joined, self.checks):
+            self.pending = []
+            self.realign(candidate, joined, f"joined {len(candidate)} split records")
+            return
+        # the record does not complete the pending ones, which are
+        # quarantined, and is checked again on its own
+        self.quarantine_pending()
+        self.check_record(record)
+
+def write_quarantine(report, quarantine_path):
+    # the quarantined records with their byte offsets, one per row
+    with open(quarantine_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(RecordIssue._fields)
+        for issue in report.quarantined:
+            writer.writerow(issue)
+
+def read_csv_scanned(path_or_file, quarantine_path=None, encoding="utf-8", types=None,
+                     block_size=DEFAULT_BLOCK_SIZE, **read_csv_kwargs):
+    # scan a csv file or open binary file and read its well formed and
+    # realigned records with pd.read_csv. Returns the DataFrame and the
+    # CsvScanReport, and writes any quarantined records to quarantine_path.
+    # read_csv_kwargs must not change how records are split, e.g. sep or quotechar.
+    scanner = CsvScanner(encoding, types, block_size)
+    if isinstance(path_or_file, (str, bytes)) or hasattr(path_or_file, "__fspath__"):
+        with open(path_or_file, "rb") as f:
+            data, report = scanner.scan(f, source=str(path_or_file))
+    else:
+        data, report = scanner.scan(path_or_file, source=getattr(path_or_file, "name", ""))
+    if quarantine_path is not None and len(report.quarantined) > 0:
+        write_quarantine(report, quarantine_path)
+    df = pd.read_csv(io.BytesIO(data), encoding=encoding, **read_csv_kwargs)
+    return df, report
+
+def show_csv_scan_report(report, max_output_lines=10, quarantine_path=None):
+    mb_per_sec = report.bytes_scanned / 1e6 / report.seconds if report.seconds > 0 else float('inf')
+    print(f"Scanned {report.records} records, {report.bytes_scanned / 1e6:.1f} MB of {report.source} "
+          f"in {report.seconds:.2f} seconds ({mb_per_sec:.1f} MB/s)")
+    destination = f" to {quarantine_path}" if quarantine_path and report.quarantined else ""
+    print(f"Realigned {len(report.realigned)} records, quarantined {len(report.quarantined)} records{destination}")
+    for kind, issues in [("realigned", report.realigned), ("quarantined", report.quarantined)]:
+        for issue in issues[:max_output_lines]:
+            print(f"{kind} line:{issue.line} offset:{issue.offset} {issue.reason}: {issue.record[:60]!r}")
@@ -0,0 +1,166 @@
+# Headless report of the distributions of numeric columns: the density
+# histogram and fitted normal PDF of each column, rendered to static
+# HTML (plotly) and PNG (matplotlib) files by a pool of worker processes,
+# with one index.html page linking them all.
+#
+# usage:
+# from distribution_report import DistributionReport
+# report = DistributionReport("outputs/distribution_report")
+# report.add(df, 'budget', stage='before scaling')
+# ...scale the column...
+# report.add(df, 'budget', stage='after scaling')
+# index_path = report.write()            # renders in parallel, returns index.html
+# report = DistributionReport(output_dir, store=HistogramStore(path))
+#
+# The histograms and PDFs are computed with numpy in the calling
+# process, so the workers only receive a few hundred numbers per figure
+# and never the DataFrame. Nothing is shown and nothing waits for input.
+# With a HistogramStore the histograms are read from the store, named
+# by column and stage, and binned only for columns it does not hold.
+
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+DEFAULT_REPORT_BINS = 50
+NUM_PDF_POINTS = 200
+REPORT_FORMATS = ('html', 'png')
+
+@dataclass
+class ColumnDistribution:
+    col: str
+    stage: str
+    count: int
+    mean: float
+    stddev: float
+    edges: np.ndarray  # histogram bin edges
+    density: np.ndarray  # probability density of each bin
+    pdf_x: np.ndarray
+    pdf_y: np.ndarray  # fitted normal PDF at pdf_x
+
+    @property
+    def title(self):
+        return f"{self.stage} Distribution of column: {self.col}".strip()
+
+def compute_distribution(values, col, stage="", bins=DEFAULT_REPORT_BINS, histogram=None):
+    # the density histogram and fitted normal PDF of the finite values.
+    # histogram is an optional histogram_store.BinnedHistogram of the
+    # values, rebinned to the bin count closest to bins instead of binning the values.
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        empty = np.empty(0)
+        return ColumnDistribution(col, stage, 0, np.nan, np.nan, empty, empty, empty, empty)
+    if histogram is not None:
+        density, edges = histogram.rebin_closest(bins).density()
+    else:
+        density, edges = np.histogram(values, bins=bins, density=True)
+    mean, stddev = values.mean(), values.std(ddof=1) if len(values) > 1 else 0.0
+    pdf_x = np.linspace(values.min(), values.max(), NUM_PDF_POINTS)
+    pdf_y = stats.norm.pdf(pdf_x, mean, stddev) if stddev > 0 else np.zeros(NUM_PDF_POINTS)
+    return ColumnDistribution(col, stage, len(values), mean, stddev, edges, density, pdf_x, pdf_y)
+
+def get_file_stem(position, distribution):
+    name = re.sub(r'\W+', '_', f"{distribution.col}_{distribution.stage}").strip('_')
+    return f"{position:03d}_{name}"
+
+def write_html_figure(distribution, path):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    centers = (distribution.edges[:-1] + distribution.edges[1:]) / 2
+    fig.add_trace(go.Bar(x=centers, y=distribution.density, width=np.diff(distribution.edges), name='Histogram'))
+    fig.add_trace(go.Scatter(x=distribution.pdf_x, y=distribution.pdf_y, mode='lines', name='PDF'))
+    fig.update_layout(title_text=distribution.title, bargap=0)
+    fig.write_html(path, include_plotlyjs='cdn', full_html=True)
+
+def write_png_figure(distribution, path):
+    # the Agg canvas directly, pyplot and its interactive backends are not needed
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(6, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if len(distribution.edges) > 0:
+        ax.stairs(distribution.density, distribution.edges, fill=True, alpha=0.6, label='Histogram')
+        ax.plot(distribution.pdf_x, distribution.pdf_y, label='PDF')
+        ax.legend()
+    ax.set_title(distribution.title, fontsize=10)
+    fig.savefig(path)
+
+def render_distribution(position, distribution, output_dir, formats=REPORT_FORMATS):
+    # worker: write the figures of one distribution, return their file names
+    stem = get_file_stem(position, distribution)
+    files = {}
+    if 'html' in formats:
+        files['html'] = f"{stem}.html"
+        write_html_figure(distribution, os.path.join(output_dir, files['html']))
+    if 'png' in formats:
+        files['png'] = f"{stem}.png"
+        write_png_figure(distribution, os.path.join(output_dir, files['png']))
+    return files
+
+def format_index_cell(distribution, files):
+    summary = f"n={distribution.count} mean={distribution.mean:.4g} std={distribution.stddev:.4g}"
+    image = f'<img src="{files["png"]}" width="360">' if 'png' in files else html.escape(distribution.title)
+    link = f'<a href="{files["html"]}">{image}</a>' if 'html' in files else image
+    return f"<td>{link}<br>{html.escape(summary)}</td>"
+
+def write_index_page(path, distributions, rendered, title="Column distributions"):
+    # one row per column, one cell per stage in the order they were added
+    stages = list(dict.fromkeys(d.stage for d in distributions))
+    cols = list(dict.fromkeys(d.col for d in distributions))
+    cells = {(d.col, d.stage): format_index_cell(d, files) for d, files in zip(distributions, rendered)}
+    with open(path, 'w') as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head><body>\n")
+        f.write(f"<h1>{html.escape(title)}</h1>\n<table>\n<tr><th>column</th>")
+        f.write(''.join(f"<th>{html.escape(stage)}</th>" for stage in stages))
+        f.write("</tr>\n")
+        for col in cols:
+            f.write(f"<tr><th>{html.escape(str(col))}</th>")
+            f.write(''.join(cells.get((col, stage), "<td></td>") for stage in stages))
+            f.write("</tr>\n")
+        f.write("</table>\n</body></html>\n")
+
+class DistributionReport:
+    """Collects column distributions and renders them to a static report in parallel."""
+
+    def __init__(self, output_dir, formats=REPORT_FORMATS, bins=DEFAULT_REPORT_BINS, title="Column distributions", store=None):
+        unknown = set(formats) - set(REPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"unknown report formats:{sorted(unknown)}")
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.bins = bins
+        self.title = title
+        self.store = store
+        self.distributions = []
+
+    def add(self, df, col, stage=""):
+        # computed now, since the column may be changed in place afterwards
+        histogram = None
+        if self.store is not None:
+            histogram = self.store.get(df[col], name=f"{col} {stage}".strip())
+        distribution = compute_distribution(df[col], col, stage=stage, bins=self.bins, histogram=histogram)
+        self.distributions.append(distribution)
+        return distribution
+
+    def write(self, max_workers=None):
+        # render every figure, in a pool of max_workers processes unless
+        # max_workers is 1, and return the path of the index page
+        os.makedirs(self.output_dir, exist_ok=True)
+        positions = range(len(self.distributions))
+        args = (positions, self.distributions, [self.output_dir] * len(self.distributions),
+                [self.formats] * len(self.distributions))
+        if max_workers == 1 or len(self.distributions) <= 1:
+            rendered = list(map(render_distribution, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                rendered = list(executor.map(render_distribution, *args))
+        index_path = os.path.join(self.output_dir, "index.html")
+        write_index_page(index_path, self.distributions, rendered, title=self.title)
+        return index_path
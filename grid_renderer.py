@@ -0,0 +1,155 @@
+# A fixed-width grid table renderer that reproduces the output of
+# tabulate's 'grid' format, written row by row to a stream.
+#
+# usage:
+# from grid_renderer import write_grid
+# write_grid(headers, [head_rows, tail_rows])              # to stdout
+# write_grid(headers, [head_rows, tail_rows], out=f, colalign=['left', 'right'])
+# write_grid(headers, blocks, keep_padding=[0])            # column 0 cells used as given
+#
+# As in tabulate, cells are stripped before they are aligned, headers
+# are not, and every column is at least MIN_HEADER_PADDING wider than
+# its header. The cells of a column that all parse as numbers are
+# reformatted the way tabulate does: floats with format 'g', ints and
+# booleans as given. Column widths are computed once from the headers
+# and all the rows, then each row is written cell by cell, so a wide
+# table is never held as one string. The blocks of rows are separated
+# by an ellipsis row, for head/ellipsis/tail previews of long frames.
+#
+# +-------+-------+
+# |  id   | title |
+# +=======+=======+
+# |  862  | Toy S…|
+# +-------+-------+
+# |  ...  |  ...  |
+# +-------+-------+
+
+import math
+import sys
+
+ELLIPSIS_CELL = '...'
+MIN_HEADER_PADDING = 2
+FLOAT_FORMAT = 'g'
+
+def is_int_cell(cell):
+    try:
+        int(cell)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def is_float_cell(cell):
+    # inf and nan count only when spelled exactly as float() names them
+    try:
+        value = float(cell)
+    except (TypeError, ValueError):
+        return False
+    if math.isinf(value) or math.isnan(value):
+        return cell.lower() in ['inf', '-inf', 'nan']
+    return True
+
+def get_column_type(cells):
+    # the least generic of 'bool', 'int', 'float' and 'str' that all of
+    # cells parse as, like the column types of tabulate. Booleans mixed
+    # with floats are left as strings.
+    column_type = 'bool'
+    has_bool = False
+    for cell in cells:
+        if cell in ['True', 'False']:
+            has_bool = True
+            continue
+        if is_int_cell(cell):
+            column_type = 'int' if column_type == 'bool' else column_type
+        elif is_float_cell(cell):
+            column_type = 'float'
+        else:
+            return 'str'
+    return 'str' if column_type == 'float' and has_bool else column_type
+
+def format_block(rows, keep_padding=(), typed_with=()):
+    # the cells of rows as they are aligned: stripped, and the floats of
+    # float columns in FLOAT_FORMAT. The column types include the cells
+    # of typed_with, rows that are typed with the block but not returned.
+    # The cells of the keep_padding columns are used as given.
+    rows = [[str(cell) for cell in row] for row in rows]
+    columns = [list(column) for column in zip(*(rows + [[str(cell) for cell in row] for row in typed_with]))]
+    for j, column in enumerate(columns):
+        if j in keep_padding:
+            continue
+        float_column = get_column_type(column) == 'float'
+        for row in rows:
+            row[j] = format(float(row[j]), FLOAT_FORMAT) if float_column else row[j].strip()
+    return rows
+
+def get_column_widths(headers, blocks):
+    # the widest cell of each column, and at least MIN_HEADER_PADDING
+    # more than a non-empty header
+    widths = [len(str(header)) + MIN_HEADER_PADDING if len(str(header)) > 0 else 0 for header in headers]
+    for rows in blocks:
+        for row in rows:
+            for j, cell in enumerate(row):
+                widths[j] = max(widths[j], len(str(cell)))
+    return widths
+
+def align_cell(cell, width, align):
+    cell = str(cell)
+    if align == 'left':
+        return f"{cell:<{width}}"
+    if align == 'right':
+        return f"{cell:>{width}}"
+    return f"{cell:^{width}}"
+
+class GridRenderer:
+    """Writes the rules and rows of a grid table with precomputed column widths."""
+
+    def __init__(self, widths, colalign=None, out=None):
+        self.widths = widths
+        if colalign is None or isinstance(colalign, str):
+            colalign = [colalign or 'center'] * len(widths)
+        if len(colalign) != len(widths):
+            raise ValueError(f"colalign of {len(colalign)} columns does not match {len(widths)} columns")
+        self.colalign = colalign
+        self.out = out if out is not None else sys.stdout
+
+    def write_rule(self, char='-'):
+        self.out.write('+')
+        for width in self.widths:
+            self.out.write(char * (width + 2))
+            self.out.write('+')
+        self.out.write('\n')
+
+    def write_row(self, cells):
+        if len(cells) != len(self.widths):
+            raise ValueError(f"row of {len(cells)} cells does not match {len(self.widths)} columns")
+        self.out.write('|')
+        for cell, width, align in zip(cells, self.widths, self.colalign):
+            self.out.write(' ')
+            self.out.write(align_cell(cell, width, align))
+            self.out.write(' |')
+        self.out.write('\n')
+
+def write_grid(headers, blocks, out=None, colalign=None, ellipsis_row=None, keep_padding=()):
+    # write a grid of the header row and the rows of each block, with
+    # ellipsis_row (default all ELLIPSIS_CELL) between the blocks.
+    # Empty blocks are skipped. Each block is typed together with the
+    # ellipsis row after it, as the head and the dotted row were one
+    # tabulate table, so only the last block has its numbers reformatted.
+    blocks = [rows for rows in blocks if len(rows) > 0]
+    if ellipsis_row is None:
+        ellipsis_row = [ELLIPSIS_CELL] * len(headers)
+    ellipsis_cells, = format_block([ellipsis_row], keep_padding)
+    blocks = [format_block(rows, keep_padding, typed_with=[ellipsis_row] if i < len(blocks) - 1 else [])
+              for i, rows in enumerate(blocks)]
+    widths = get_column_widths(headers, blocks + ([[ellipsis_cells]] if len(blocks) > 1 else []))
+    renderer = GridRenderer(widths, colalign=colalign, out=out)
+    renderer.write_rule('-')
+    renderer.write_row(headers)
+    renderer.write_rule('=')
+    for i, rows in enumerate(blocks):
+        if i > 0:
+            renderer.write_row(ellipsis_cells)
+            renderer.write_rule('-')
+        for row in rows:
+            renderer.write_row(row)
+            renderer.write_rule('-')
+    return widths
@@ -0,0 +1,308 @@
+# Binned histograms of numeric columns as a reusable artifact: each
+# column is binned once, the histograms are persisted, and plots, drift
+# checks and reports read their counts from the store instead of
+# re-binning the raw column.
+#
+# usage:
+# from histogram_store import HistogramStore, compare_stores
+# store = HistogramStore("outputs/histograms.npz")   # loaded if it exists
+# hist = store.get(df['budget'], name='budget')      # binned once per column content
+# density, edges = hist.rebin(50).density()          # at most 50 bins, no raw data
+# density, edges = hist.rebin_closest(50).density()  # the bin count nearest to 50
+# for chunk in pd.read_csv(path, chunksize=10000):   # or built chunk by chunk
+#     store.update('budget', pd.to_numeric(chunk['budget'], errors='coerce'))
+# store.save()
+# compare_stores(HistogramStore("baseline.npz"), store)   # psi and ks per column
+# cache = HistogramStore(max_histograms=32)          # in memory, least recently used evicted
+#
+# A BinnedHistogram has bins of width 2^exponent aligned on multiples of
+# the width, so two histograms always share their bin edges once the
+# finer one is coarsened to the wider width, and coarsening is an
+# integer division of the bin indexes. Histograms of chunks therefore
+# merge exactly, and rebin() gives any coarser resolution without the
+# raw values. The span of bins is kept within max_bins by doubling the
+# width as values arrive.
+
+import os
+import math
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from profile_cache import array_fingerprint, column_fingerprint
+
+DEFAULT_MAX_BINS = 1024
+# bin indexes stay well inside int64
+MAX_BIN_INDEX_BITS = 52
+
+def as_float_values(values):
+    if isinstance(values, pd.Series):
+        values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(values, dtype=np.float64).ravel()
+
+def aggregate_bins(bins, counts):
+    # sorted unique bin indexes and their summed counts
+    bins, inverse = np.unique(bins, return_inverse=True)
+    return bins, np.bincount(inverse, weights=counts, minlength=len(bins)).astype(np.int64)
+
+class BinnedHistogram:
+    """Counts of power-of-two width bins aligned on multiples of the width, mergeable and rebinnable."""
+
+    def __init__(self, max_bins=DEFAULT_MAX_BINS, exponent=None):
+        self.max_bins = max_bins
+        self.exponent = exponent
+        self.bins = np.empty(0, dtype=np.int64)  # sorted indexes of the non-empty bins
+        self.counts = np.empty(0, dtype=np.int64)
+        self.missing = 0  # NaN, infinite and non-numeric values
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def width(self):
+        return 2.0 ** self.exponent
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def num_bins(self):
+        # bins between the first and the last non-empty bin
+        return int(self.bins[-1] - self.bins[0] + 1) if len(self.bins) > 0 else 0
+
+    def copy(self):
+        other = BinnedHistogram(self.max_bins, self.exponent)
+        other.bins, other.counts = self.bins.copy(), self.counts.copy()
+        other.missing, other.min, other.max = self.missing, self.min, self.max
+        return other
+
+    def _initial_exponent(self, values):
+        # about max_bins / 2 bins over the first values, leaving room to grow
+        span = values.max() - values.min()
+        magnitude = np.abs(values).max()
+        if span > 0:
+            exponent = math.ceil(math.log2(span / max(self.max_bins // 2, 1)))
+        else:
+            exponent = math.floor(math.log2(magnitude)) - 8 if magnitude > 0 else 0
+        return exponent
+
+    def _fit_exponent(self, magnitude):
+        # the smallest coarsening that keeps |value| / width inside the index range
+        if magnitude > 0:
+            return max(self.exponent, math.ceil(math.log2(magnitude)) - MAX_BIN_INDEX_BITS)
+        return self.exponent
+
+    def update(self, values):
+        values = as_float_values(values)
+        finite = values[np.isfinite(values)]
+        self.missing += len(values) - len(finite)
+        if len(finite) == 0:
+            return self
+        if self.exponent is None:
+            self.exponent = self._initial_exponent(finite)
+        self.coarsen(self._fit_exponent(np.abs(finite).max()) - self.exponent)
+        self.min = min(self.min, finite.min())
+        self.max = max(self.max, finite.max())
+        new_bins = np.floor(finite / self.width).astype(np.int64)
+        self.bins, self.counts = aggregate_bins(np.concatenate([self.bins, new_bins]),
+                                                np.concatenate([self.counts, np.ones(len(new_bins), dtype=np.int64)]))
+        self._limit_bins()
+        return self
+
+    def coarsen(self, steps):
+        # double the width steps times, in place
+        if steps <= 0 or self.exponent is None:
+            return self
+        self.exponent += steps
+        if len(self.bins) > 0:
+            self.bins, self.counts = aggregate_bins(np.floor_divide(self.bins, 2 ** steps), self.counts)
+        return self
+
+    def _limit_bins(self):
+        while self.num_bins > self.max_bins:
+            self.coarsen(max(1, math.ceil(math.log2(self.num_bins / self.max_bins))))
+
+    def merge(self, other):
+        # add the counts of other, at the wider width of the two
+        if other.exponent is None:
+            self.missing += other.missing
+            return self
+        other = other.copy()
+        if self.exponent is None:
+            self.exponent = other.exponent
+        exponent = max(self.exponent, other.exponent)
+        self.coarsen(exponent - self.exponent)
+        other.coarsen(exponent - other.exponent)
+        self.bins, self.counts = aggregate_bins(np.concatenate([self.bins, other.bins]),
+                                                np.concatenate([self.counts, other.counts]))
+        self.missing += other.missing
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._limit_bins()
+        return self
+
+    def rebin(self, max_bins):
+        # a coarser copy with at most max_bins bins
+        other = self.copy()
+        other.max_bins = max_bins
+        other._limit_bins()
+        return other
+
+    def rebin_closest(self, num_bins):
+        # the coarser copy whose number of bins is closest to num_bins.
+        # rebin(num_bins) may give as few as about num_bins / 2, since
+        # each coarsening halves the bins; the coarsening before it has
+        # more than num_bins and is taken when it is closer.
+        coarse = self.rebin(num_bins)
+        if self.exponent is None or coarse.exponent <= self.exponent:
+            return coarse
+        finer = self.copy().coarsen(coarse.exponent - 1 - self.exponent)
+        if abs(finer.num_bins - num_bins) < abs(coarse.num_bins - num_bins):
+            finer.max_bins = finer.num_bins
+            return finer
+        return coarse
+
+    def dense(self):
+        # the counts of every bin between the first and the last
+        # non-empty bin, and their num_bins + 1 edges
+        if len(self.bins) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        counts = np.zeros(self.num_bins, dtype=np.int64)
+        counts[self.bins - self.bins[0]] = self.counts
+        edges = (self.bins[0] + np.arange(self.num_bins + 1)) * self.width
+        return counts, edges
+
+    def density(self):
+        # probability density of each dense bin, like np.histogram(density=True)
+        counts, edges = self.dense()
+        return counts / max(self.total, 1) / self.width, edges
+
+def fingerprint_values(values):
+    if isinstance(values, pd.Series):
+        return column_fingerprint(values)
+    return array_fingerprint(np.asarray(values))
+
+class HistogramStore:
+    """Named BinnedHistograms, computed once per column content and persisted in one npz file."""
+
+    # max_histograms bounds a store used as an in-memory cache: the
+    # least recently used histograms are evicted beyond it
+    def __init__(self, path=None, max_bins=DEFAULT_MAX_BINS, max_histograms=None):
+        self.path = path
+        self.max_bins = max_bins
+        self.max_histograms = max_histograms
+        self.histograms = {}
+        self.fingerprints = {}  # of the values a histogram was computed from, None when built by update
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __contains__(self, name):
+        return name in self.histograms
+
+    def __getitem__(self, name):
+        return self.histograms[name]
+
+    @property
+    def names(self):
+        return list(self.histograms)
+
+    def get(self, values, name=None):
+        # the histogram of values, binned only if the store has no
+        # histogram of the same content under name (the fingerprint by default)
+        fingerprint = fingerprint_values(values)
+        if name is None:
+            name = fingerprint
+        if self.fingerprints.get(name) != fingerprint or name not in self.histograms:
+            self.histograms[name] = BinnedHistogram(self.max_bins).update(as_float_values(values))
+            self.fingerprints[name] = fingerprint
+        return self._touch(name)
+
+    def update(self, name, values):
+        # add a chunk of values to the histogram of name
+        if name not in self.histograms:
+            self.histograms[name] = BinnedHistogram(self.max_bins)
+        self.fingerprints[name] = None
+        return self._touch(name).update(values)
+
+    def _touch(self, name):
+        # mark name as the most recently used, and evict the least
+        # recently used histograms beyond max_histograms
+        histogram = self.histograms.pop(name)
+        self.histograms[name] = histogram
+        if self.max_histograms is not None:
+            while len(self.histograms) > self.max_histograms:
+                evicted = next(iter(self.histograms))
+                del self.histograms[evicted]
+                self.fingerprints.pop(evicted, None)
+        return histogram
+
+    def merge(self, other):
+        # add the histograms of another store, e.g. of another partition
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = BinnedHistogram(self.max_bins)
+            self.histograms[name].merge(histogram)
+            self.fingerprints[name] = None
+        return self
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            raise ValueError("HistogramStore has no path to save to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        names = self.names
+        arrays = {
+            'names': np.asarray(names, dtype=str),
+            'fingerprints': np.asarray([self.fingerprints.get(name) or '' for name in names], dtype=str),
+            'exponents': np.asarray([h.exponent if h.exponent is not None else np.iinfo(np.int64).min
+                                     for h in self.histograms.values()], dtype=np.int64),
+            'missing': np.asarray([h.missing for h in self.histograms.values()], dtype=np.int64),
+            'mins': np.asarray([h.min for h in self.histograms.values()], dtype=np.float64),
+            'maxs': np.asarray([h.max for h in self.histograms.values()], dtype=np.float64),
+            'max_bins': np.asarray([h.max_bins for h in self.histograms.values()], dtype=np.int64),
+        }
+        for i, histogram in enumerate(self.histograms.values()):
+            arrays[f"bins_{i}"] = histogram.bins
+            arrays[f"counts_{i}"] = histogram.counts
+        np.savez(path, **arrays)
+
+    def load(self, path):
+        with np.load(path, allow_pickle=False) as saved:
+            for i, name in enumerate(saved['names'].tolist()):
+                histogram = BinnedHistogram(int(saved['max_bins'][i]))
+                exponent = int(saved['exponents'][i])
+                histogram.exponent = None if exponent == np.iinfo(np.int64).min else exponent
+                histogram.bins, histogram.counts = saved[f"bins_{i}"], saved[f"counts_{i}"]
+                histogram.missing = int(saved['missing'][i])
+                histogram.min, histogram.max = float(saved['mins'][i]), float(saved['maxs'][i])
+                self.histograms[name] = histogram
+                self.fingerprints[name] = str(saved['fingerprints'][i]) or None
+        return self
+
+HistogramDrift = namedtuple('HistogramDrift', ['psi', 'ks', 'total_variation'])
+
+def histogram_drift(reference, current, epsilon=1e-6):
+    # population stability index, Kolmogorov-Smirnov distance and total
+    # variation distance between two histograms, on their common bins
+    if reference.total == 0 or current.total == 0:
+        return HistogramDrift(np.nan, np.nan, np.nan)
+    exponent = max(reference.exponent, current.exponent)
+    reference = reference.copy().coarsen(exponent - reference.exponent)
+    current = current.copy().coarsen(exponent - current.exponent)
+    bins = np.union1d(reference.bins, current.bins)
+    p = np.zeros(len(bins))
+    q = np.zeros(len(bins))
+    p[np.searchsorted(bins, reference.bins)] = reference.counts / reference.total
+    q[np.searchsorted(bins, current.bins)] = current.counts / current.total
+    p_smoothed, q_smoothed = np.maximum(p, epsilon), np.maximum(q, epsilon)
+    psi = float(np.sum((q_smoothed - p_smoothed) * np.log(q_smoothed / p_smoothed)))
+    ks = float(np.abs(np.cumsum(p) - np.cumsum(q)).max())
+    return HistogramDrift(psi, ks, float(np.abs(p - q).sum() / 2))
+
+def compare_stores(reference, current, names=None):
+    # drift of each histogram found in both stores, largest psi first
+    if names is None:
+        names = [name for name in current.names if name in reference]
+    rows = {name: histogram_drift(reference[name], current[name])._asdict() for name in names}
+    drift = pd.DataFrame.from_dict(rows, orient='index', columns=list(HistogramDrift._fields))
+    return drift.sort_values('psi', ascending=False)
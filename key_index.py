@@ -0,0 +1,146 @@
+# Primary-key indexes of the id and imdb_id columns, mapping each key
+# to its row positions without scanning the DataFrame, persisted as
+# .npy files that are memory-mapped on load.
+#
+# usage:
+# from key_index import build_key_indexes, save_key_indexes, load_key_indexes
+# indexes = build_key_indexes(df)                # {'id': KeyIndex, 'imdb_id': KeyIndex}
+# df.iloc[indexes['id'].lookup(862)]
+# df.iloc[indexes['imdb_id'].lookup_many(['tt0114709', 'tt0113497'])]
+# indexes['id'].duplicate_keys()                 # keys found on more than one row
+# save_key_indexes(indexes, "outputs/key_index")
+# indexes = load_key_indexes("outputs/key_index")
+#
+# An index is the sorted array of the keys and the row position of
+# each sorted key, so a lookup is two binary searches and duplicate
+# keys are adjacent runs. Rows whose key is missing or does not parse
+# as the key type are recorded in invalid_positions.
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# the key type of each indexed column
+key_column_types = {
+    "id": "int",
+    "imdb_id": "str",
+}
+
+class KeyIndex:
+    """Sorted keys and their row positions, with the rows of missing or invalid keys."""
+
+    def __init__(self, name, sorted_keys, positions, invalid_positions, nrows):
+        self.name = name
+        self.sorted_keys = sorted_keys
+        self.positions = positions
+        self.invalid_positions = invalid_positions
+        self.nrows = nrows
+
+    @classmethod
+    def from_series(cls, series, key_type=None):
+        name = series.name
+        key_type = key_type or key_column_types.get(name, "str")
+        if key_type == "int":
+            numeric = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(numeric) & (numeric == np.floor(numeric))
+            keys = numeric[valid].astype(np.int64)
+        elif key_type == "str":
+            stripped = series.astype("string").str.strip()
+            valid = (stripped.notna() & (stripped != "")).to_numpy(dtype=bool, na_value=False)
+            # fixed width unicode, which can be memory-mapped
+            keys = np.asarray(stripped[valid].to_numpy(dtype=object), dtype=str)
+        else:
+            raise ValueError(f"unknown key type:{key_type} for column:{name}")
+        valid_positions = np.flatnonzero(valid)
+        order = np.argsort(keys, kind='stable')
+        return cls(name, keys[order], valid_positions[order], np.flatnonzero(~valid), len(series))
+
+    def __len__(self):
+        return len(self.sorted_keys)
+
+    def _ranges(self, keys):
+        # string keys are not cast to the indexed width, which would truncate them
+        keys = np.asarray(keys, dtype=str if self.sorted_keys.dtype.kind == 'U' else np.int64)
+        return (np.searchsorted(self.sorted_keys, keys, side='left'),
+                np.searchsorted(self.sorted_keys, keys, side='right'))
+
+    def lookup(self, key):
+        # sorted row positions of one key, empty if it is not indexed
+        lo, hi = self._ranges([key])
+        return np.sort(self.positions[lo[0]:hi[0]])
+
+    def lookup_many(self, keys):
+        # row positions of several keys, in the order of keys, each
+        # key's rows in row order
+        lo, hi = self._ranges(keys)
+        counts = hi - lo
+        if counts.sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        # sorted positions within each run of equal keys are stable,
+        # so they are already in row order
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        return np.asarray(self.positions[starts + np.arange(counts.sum())])
+
+    def contains(self, keys):
+        lo, hi = self._ranges(keys)
+        return hi > lo
+
+    def duplicate_keys(self):
+        # the keys found on more than one row, with their row counts
+        keys, counts = self._key_counts()
+        duplicated = counts > 1
+        return pd.Series(counts[duplicated], index=keys[duplicated], name='count')
+
+    def duplicate_positions(self):
+        # sorted row positions of every row with a duplicated key
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64)
+        same_as_next = self.sorted_keys[1:] == self.sorted_keys[:-1]
+        in_run = np.concatenate([same_as_next, [False]]) | np.concatenate([[False], same_as_next])
+        return np.sort(self.positions[in_run])
+
+    def _key_counts(self):
+        if len(self) == 0:
+            return self.sorted_keys[:0], np.empty(0, dtype=np.int64)
+        starts = np.flatnonzero(np.concatenate([[True], self.sorted_keys[1:] != self.sorted_keys[:-1]]))
+        counts = np.diff(np.concatenate([starts, [len(self)]]))
+        return np.asarray(self.sorted_keys[starts]), counts
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, f"{self.name}.keys.npy"), self.sorted_keys)
+        np.save(os.path.join(directory, f"{self.name}.positions.npy"), self.positions)
+        np.save(os.path.join(directory, f"{self.name}.invalid.npy"), self.invalid_positions)
+        with open(os.path.join(directory, f"{self.name}.json"), "w") as f:
+            json.dump({"name": self.name, "nrows": int(self.nrows)}, f)
+
+    @classmethod
+    def load(cls, directory, name, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(directory, f"{name}.json")) as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(directory, f"{name}.{part}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+                  for part in ["keys", "positions", "invalid"]]
+        return cls(name, *arrays, nrows=meta["nrows"])
+
+def build_key_indexes(df, cols=None):
+    if cols is None:
+        cols = [col for col in key_column_types if col in df.columns]
+    return {col: KeyIndex.from_series(df[col]) for col in cols}
+
+def save_key_indexes(indexes, directory):
+    for index in indexes.values():
+        index.save(directory)
+
+def load_key_indexes(directory, cols=None, mmap=True):
+    if cols is None:
+        cols = [col for col in key_column_types if os.path.exists(os.path.join(directory, f"{col}.json"))]
+    return {col: KeyIndex.load(directory, col, mmap=mmap) for col in cols}
+
+def show_key_index(index, max_output_lines=10):
+    duplicates = index.duplicate_keys()
+    print(f"Key index:[{index.name}] {len(index)} keys of {index.nrows} rows, "
+          f"{len(index.invalid_positions)} missing or invalid, {len(duplicates)} duplicated keys")
+    if len(duplicates) > 0:
+        print(duplicates.iloc[:max_output_lines].to_string())
@@ -0,0 +1,101 @@
+# Choice of the number of components of a 1-d Gaussian mixture by BIC
+# or AIC, instead of a hardcoded n_components.
+#
+# usage:
+# from mixture_selection import select_n_components
+# selection = select_n_components(data, k_range=range(1, 9), criterion='bic')
+# selection.n_components        # the k with the lowest criterion
+# selection.scores              # DataFrame of k, bic, aic, converged, n_iter
+# selection.means               # the means of the selected fit, e.g. a means_init
+#
+# The values of k are fitted in increasing order, in batches of
+# max_workers processes or of at most DEFAULT_BATCH_SIZE by default.
+# Every fit of a batch is warm started from the means of the largest
+# fit of the batch before it, with its widest components split in two
+# until there are k of them, so each fit starts close to a solution
+# instead of from a fresh k-means. The sweep stops once the criterion
+# has not improved for patience consecutive values of k.
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.mixture import GaussianMixture
+
+SELECTION_CRITERIA = ['bic', 'aic']
+DEFAULT_K_RANGE = range(1, 9)
+DEFAULT_PATIENCE = 2
+DEFAULT_BATCH_SIZE = 3
+
+OrderSelection = namedtuple('OrderSelection', ['n_components', 'criterion', 'scores', 'means'])
+
+def get_warm_start_means(means, weights, stddevs, k):
+    # k initial means: the previous means with the component of largest
+    # weight * stddev split into two, one stddev apart, until there are k
+    means, weights, stddevs = list(means), list(weights), list(stddevs)
+    while len(means) < k:
+        i = int(np.argmax(np.asarray(weights) * np.asarray(stddevs)))
+        mean, weight, stddev = means.pop(i), weights.pop(i), stddevs.pop(i)
+        means += [mean - stddev / 2, mean + stddev / 2]
+        weights += [weight / 2, weight / 2]
+        stddevs += [stddev / 2, stddev / 2]
+    return np.sort(np.asarray(means[:k])).reshape(-1, 1)
+
+def fit_mixture(data, k, means_init=None, random_state=0):
+    # worker: the scores and the components of one k
+    gmm = GaussianMixture(n_components=k, means_init=means_init, random_state=random_state)
+    gmm.fit(data.reshape(-1, 1))
+    return {
+        'k': k,
+        'bic': gmm.bic(data.reshape(-1, 1)),
+        'aic': gmm.aic(data.reshape(-1, 1)),
+        'converged': gmm.converged_,
+        'n_iter': gmm.n_iter_,
+        'means': gmm.means_[:, 0],
+        'weights': gmm.weights_,
+        'stddevs': np.sqrt(gmm.covariances_.reshape(k, -1)[:, 0]),
+    }
+
+# max_workers is the number of k fitted at once, os.cpu_count() up to
+# DEFAULT_BATCH_SIZE by default; with 1 the sweep runs in the calling
+# process, e.g. inside a worker of the multimodal analyses
+def select_n_components(data, k_range=DEFAULT_K_RANGE, criterion='bic', max_workers=None,
+                        patience=DEFAULT_PATIENCE, random_state=0):
+    if criterion not in SELECTION_CRITERIA:
+        raise ValueError(f"criterion:{criterion} is not one of {SELECTION_CRITERIA}")
+    data = np.asarray(data, dtype=np.float64).ravel()
+    ks = [k for k in k_range if k <= len(data)]
+    if len(ks) == 0:
+        raise ValueError(f"k_range:{k_range} has no k of at most {len(data)} rows")
+    batch_size = max_workers or min(os.cpu_count() or 1, DEFAULT_BATCH_SIZE)
+    executor = ProcessPoolExecutor(max_workers=batch_size) if batch_size > 1 else None
+    fits = []
+    best = None
+    since_best = 0
+    previous = None
+    try:
+        for start in range(0, len(ks), batch_size):
+            batch = ks[start:start + batch_size]
+            means_inits = [None] * len(batch)
+            if previous is not None:
+                means_inits = [get_warm_start_means(previous['means'], previous['weights'], previous['stddevs'], k)
+                               if k > previous['k'] else None for k in batch]
+            args = (([data] * len(batch)), batch, means_inits, [random_state] * len(batch))
+            batch_fits = list(executor.map(fit_mixture, *args)) if executor else list(map(fit_mixture, *args))
+            for fit in batch_fits:
+                fits.append(fit)
+                if best is None or fit[criterion] < best[criterion]:
+                    best, since_best = fit, 0
+                else:
+                    since_best += 1
+                if since_best >= patience:
+                    break
+            if since_best >= patience:
+                break
+            previous = batch_fits[-1]
+    finally:
+        if executor:
+            executor.shutdown()
+    scores = pd.DataFrame([{key: fit[key] for key in ['k', 'bic', 'aic', 'converged', 'n_iter']} for fit in fits])
+    return OrderSelection(best['k'], criterion, scores, best['means'])
@@ -0,0 +1,141 @@
+# Sparse multi-hot feature matrices of the list_of_dict columns, one
+# row per movie and one column per genre, company, country or language,
+# so per-term aggregates become sparse matrix products instead of
+# loops over parsed lists.
+#
+# usage:
+# from multi_hot import build_multi_hot, term_means, co_occurrence
+# genres = build_multi_hot(df['genres'], 'genres')
+# genre_revenue = term_means(genres, df['revenue'])    # indexed by genre name
+# pairs = co_occurrence(genres)                         # sparse genre x genre counts
+# pairs = co_occurrence(genres, as_frame=True)          # as a DataFrame, for small vocabularies
+# save_multi_hot(genres, "outputs/genres")
+# genres = load_multi_hot("outputs/genres")
+# languages = build_multi_hot(df['spoken_languages'], 'spoken_languages')
+# multilingual = (languages.row_counts() > 1).sum()
+#
+# The vocabulary is stable: a term keeps its column across runs when the
+# previous vocabulary is passed to build_multi_hot, and new terms are
+# appended after it in id order.
+
+import os
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from arrow_utils import list_of_dict_id_keys, to_arrow_list_array, explode_list_column
+
+# the largest vocabulary whose dense co-occurrence DataFrame is built
+MAX_FRAME_TERMS = 2000
+
+@dataclass
+class MultiHotMatrix:
+    column: str
+    matrix: sp.csr_matrix  # rows x terms, 1 where the row has the term
+    ids: np.ndarray  # the term id of each matrix column
+    names: np.ndarray  # the term name of each matrix column
+
+    @property
+    def vocabulary(self):
+        return pd.DataFrame({'id': self.ids, 'name': self.names})
+
+    def row_counts(self):
+        # number of terms of each row
+        return np.diff(self.matrix.indptr)
+
+    def term_counts(self):
+        return pd.Series(np.asarray(self.matrix.sum(axis=0)).ravel(), index=self.names, name='count')
+
+def as_arrow_values(values, col=None):
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.ArrowDtype):
+        return values
+    return to_arrow_list_array(values, id_key=list_of_dict_id_keys.get(col, "id"))
+
+def build_multi_hot(values, col=None, vocabulary=None):
+    # the MultiHotMatrix of a list_of_dict column, Arrow backed or
+    # parsed lists of dicts. vocabulary is a previous MultiHotMatrix or
+    # its vocabulary DataFrame, whose terms keep their columns.
+    arrow_values = as_arrow_values(values, col)
+    exploded = explode_list_column(arrow_values)
+    exploded = exploded[exploded['id'].notna()]
+    if isinstance(exploded['id'].dtype, pd.CategoricalDtype):
+        element_ids = exploded['id'].astype(object).to_numpy()
+    else:
+        element_ids = exploded['id'].to_numpy(dtype=np.int64)
+    element_names = exploded['name'].astype(object).to_numpy()
+
+    if isinstance(vocabulary, MultiHotMatrix):
+        vocabulary = vocabulary.vocabulary
+    if vocabulary is None:
+        vocabulary = pd.DataFrame({'id': element_ids[:0], 'name': element_names[:0]})
+    known_ids = np.asarray(vocabulary['id']).astype(element_ids.dtype)
+    # new terms in id order, named by their first occurrence
+    unique_ids, first_positions = np.unique(element_ids, return_index=True)
+    new = ~np.isin(unique_ids, known_ids)
+    ids = np.concatenate([known_ids, unique_ids[new]])
+    names = np.concatenate([np.asarray(vocabulary['name'], dtype=object), element_names[first_positions[new]]])
+
+    columns = pd.Index(ids).get_indexer(element_ids)
+    matrix = sp.csr_matrix((np.ones(len(columns), dtype=np.int8), (exploded['row'].to_numpy(), columns)),
+                           shape=(len(arrow_values), len(ids)))
+    # a term listed twice in a row is still one hit
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return MultiHotMatrix(column=col, matrix=matrix, ids=ids, names=names)
+
+def valid_target(y):
+    # float values of y with missing or non-numeric values as NaN
+    return pd.to_numeric(pd.Series(y), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+def term_sums(multi_hot, y):
+    # per-term sum of y over the rows having the term, ignoring NaN
+    values = valid_target(y)
+    sums = multi_hot.matrix.T @ np.nan_to_num(values, nan=0.0)
+    return pd.Series(sums, index=multi_hot.names, name='sum')
+
+def term_means(multi_hot, y):
+    # per-term mean of y over the rows having the term and a value of y
+    values = valid_target(y)
+    valid = ~np.isnan(values)
+    sums = multi_hot.matrix.T @ np.where(valid, values, 0.0)
+    counts = multi_hot.matrix.T @ valid.astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return pd.Series(means, index=multi_hot.names, name='mean')
+
+def co_occurrence(multi_hot, as_frame=False):
+    # terms x terms csr counts of rows having both terms; the diagonal
+    # holds the term counts. as_frame gives a dense DataFrame indexed by
+    # term name, for vocabularies of at most MAX_FRAME_TERMS terms.
+    num_terms = len(multi_hot.names)
+    if as_frame and num_terms > MAX_FRAME_TERMS:
+        raise ValueError(f"as_frame:{as_frame} of {num_terms} terms is more than MAX_FRAME_TERMS:{MAX_FRAME_TERMS}")
+    matrix = multi_hot.matrix.astype(np.int32)
+    pairs = (matrix.T @ matrix).tocsr()
+    if not as_frame:
+        return pairs
+    return pd.DataFrame(pairs.toarray(), index=multi_hot.names, columns=multi_hot.names)
+
+def save_multi_hot(multi_hot, path_stem):
+    # path_stem.npz holds the matrix, path_stem_vocabulary.csv the terms
+    directory = os.path.dirname(path_stem)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    sp.save_npz(f"{path_stem}.npz", multi_hot.matrix)
+    vocabulary = multi_hot.vocabulary
+    vocabulary['column'] = multi_hot.column
+    vocabulary.to_csv(f"{path_stem}_vocabulary.csv", index=False)
+
+def load_multi_hot(path_stem):
+    matrix = sp.load_npz(f"{path_stem}.npz").tocsr()
+    vocabulary = pd.read_csv(f"{path_stem}_vocabulary.csv", keep_default_na=False)
+    ids = vocabulary['id'].to_numpy()
+    column = vocabulary['column'].iloc[0] if len(vocabulary) > 0 else None
+    return MultiHotMatrix(column=column, matrix=matrix, ids=ids, names=vocabulary['name'].to_numpy(dtype=object))
+
+def show_term_summary(multi_hot, y, title="", max_output_lines=20):
+    # count, sum and mean of y per term, most frequent terms first
+    summary = pd.concat([multi_hot.term_counts(), term_sums(multi_hot, y), term_means(multi_hot, y)], axis=1)
+    summary = summary.sort_values('count', ascending=False)
+    print(f"Column:[{multi_hot.column}] {title} {len(summary)} terms, {multi_hot.matrix.nnz} entries")
+    print(summary.iloc[:max_output_lines].to_string())
@@ -1,193 +1,307 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 from sklearn.mixture import GaussianMixture
-from sklearn.neighbors import KernelDensity
 from scipy.signal import find_peaks
-from scipy.stats import gaussian_kde
 from sklearn.cluster import KMeans, MeanShift, estimate_bandwidth, DBSCAN
 
-# from statsmodels.nonparametric.smoothers_lowess import lowess 
+# from statsmodels.nonparametric.smoothers_lowess import lowess
 from sklearn.cluster import AgglomerativeClustering
 from sklearn.mixture import BayesianGaussianMixture
 from sklearn.ensemble import IsolationForest
 from minisom import MiniSom
+from histogram_store import BinnedHistogram, HistogramStore
+from kde_utils import binned_kde
+from coreset_utils import assign_nearest_center, stratified_subsample, weighted_coreset
+from mixture_selection import select_n_components
+from profile_cache import ProfileCache, array_fingerprint
+
+# Each analysis is split into a fit step and a render step:
+#   <analysis>_fit(data) -> result       pure, no matplotlib, runs in a worker process
+#   <analysis>_render(ax, data, result)  draws the result onto ax in the calling process
+# The result is a dict of the few numbers and arrays the render step
+# needs. plot_all_functions runs all the fits concurrently in a process
+# pool and then renders them, so the grid takes about as long as the
+# slowest fit. The data is passed to render too, so the workers never
+# send the sample back and the histograms still come from one store.
+# <analysis>(data, ax) runs both steps in the calling process.
+# The results are cached, see FitCache.
+
+# the analysis functions all plot the same data, which is binned once;
+# the store only keeps the histograms of the latest few data sets
+PLOT_STORE_SIZE = 16
+histogram_store = HistogramStore(max_histograms=PLOT_STORE_SIZE)
+PLOT_BINS = 50
+NUM_CURVE_POINTS = 1000
 
 def plot_distribution(ax, data, title):
     """Helper function to plot the distribution of data."""
-    ax.hist(data, bins=50, density=True, alpha=0.7, label='Data Distribution')
+    density, edges = histogram_store.get(data).rebin_closest(PLOT_BINS).density()
+    ax.stairs(density, edges, fill=True, alpha=0.7, label='Data Distribution')
     ax.set_title(title)
     ax.set_xlabel('Value')
     ax.set_ylabel('Density')
 
-def gmm_analysis(data, ax, n_components=3):
+# Above max_exact_rows rows the methods whose cost or memory grows
+# faster than the number of rows fit a reduced representation of the
+# data and carry the result back to every row in a vectorized pass:
+#   mean shift, agglomerative - a stratified subsample, agglomerative
+#                               labels by the nearest cluster mean
+#   DBSCAN                    - a weighted coreset of bins of eps / 10,
+#                               widened to at most eps / 4; beyond
+#                               DBSCAN_MAX_BINS such bins a stratified
+#                               subsample, rows labelled by the nearest
+#                               sample row within eps
+#   isolation forest          - fitted on a stratified subsample and
+#                               scored on a coreset of bins
+# Their results record the approximation, shown in the plot titles.
+MAX_EXACT_ROWS = int(os.getenv('MULTIMODAL_MAX_EXACT_ROWS') or 10000)
+DBSCAN_BINS_PER_EPS = 10
+DBSCAN_MIN_BINS_PER_EPS = 4
+# a bin of eps / DBSCAN_BINS_PER_EPS has at most 2 * DBSCAN_BINS_PER_EPS
+# neighbouring bins, so DBSCAN of the coreset is linear in its bins
+DBSCAN_MAX_BINS = 200000
+
+def get_subsample(data, max_exact_rows):
+    # data itself or a stratified subsample, and the approximation used
+    if len(data) <= max_exact_rows:
+        return data, 'exact'
+    approximation = f"stratified subsample of {max_exact_rows} of {len(data)} rows"
+    print(f"Fitting a {approximation}")
+    return data[stratified_subsample(data, max_exact_rows)], approximation
+
+# n_components of the mixture models may be 'auto', the k of
+# MIXTURE_K_RANGE with the lowest MIXTURE_CRITERION, see mixture_selection.
+# fit_all_analyses selects it once per data, cached with the fits, and
+# passes the MixtureSelection to every mixture fit, which starts from
+# the means of the selected fit. The sweep runs in the calling process,
+# since the fits themselves already run in the worker processes.
+MIXTURE_K_RANGE = range(1, 9)
+MIXTURE_CRITERION = 'bic'
+
+MixtureSelection = namedtuple('MixtureSelection', ['n_components', 'means', 'note'])
+
+def select_mixture(data):
+    sample, _ = get_subsample(data, MAX_EXACT_ROWS)
+    selection = select_n_components(sample, k_range=MIXTURE_K_RANGE, criterion=MIXTURE_CRITERION, max_workers=1)
+    print(f"Selected {selection.n_components} components by {selection.criterion.upper()}")
+    return MixtureSelection(selection.n_components, np.sort(selection.means).reshape(-1, 1),
+                            f"k={selection.n_components} by {selection.criterion.upper()}")
+
+def get_n_components(data, n_components):
+    # the number of components to fit, the initial means if they were
+    # selected and how they were selected
+    if n_components == 'auto':
+        n_components = select_mixture(data)
+    if isinstance(n_components, MixtureSelection):
+        return n_components
+    return MixtureSelection(n_components, None, None)
+
+def get_title(title, result):
+    notes = [note for note in [result.get('selection'), result.get('approximation')] if note and note != 'exact']
+    return f"{title}\n({', '.join(notes)})" if notes else title
+
+def get_curve_x(data):
+    return np.linspace(data.min(), data.max(), NUM_CURVE_POINTS)
+
+def plot_cluster_points(ax, data, labels, names=None):
+    # the points of each cluster as markers along the x axis
+    unique_labels = set(labels)
+    colors = [plt.cm.Spectral(each) for each in np.linspace(0, 1, len(unique_labels))]
+    for k, col in zip(unique_labels, colors):
+        xy = data[labels == k]
+        label = names[k] if names else f'Cluster {k}'
+        ax.plot(xy, np.zeros_like(xy) + 0.01, 'o', markerfacecolor=tuple(col),
+                markeredgecolor='k', markersize=6, label=label)
+
+def plot_vertical_lines(ax, values, name):
+    for value in values:
+        ax.axvline(value, color='r', linestyle='--')
+        ax.text(value, ax.get_ylim()[1], f'{name}: {value:.2f}',
+                rotation=90, verticalalignment='top')
+
+def gmm_analysis_fit(data, n_components=3):
     print("Analyzing data using Gaussian Mixture Model.")
-    gmm = GaussianMixture(n_components=n_components)
+    n_components, means_init, selection = get_n_components(data, n_components)
+    gmm = GaussianMixture(n_components=n_components, means_init=means_init)
     gmm.fit(data.reshape(-1, 1))
-    x = np.linspace(data.min(), data.max(), 1000).reshape(-1, 1)
-    logprob = gmm.score_samples(x)
-    responsibilities = gmm.predict_proba(x)
-    
-    plot_distribution(ax, data, 'Gaussian Mixture Model')
-    ax.plot(x, np.exp(logprob), 'r-', label='GMM')
-    for i in range(n_components):
-        ax.plot(x, responsibilities[:, i] * gmm.weights_[i] * np.exp(logprob),
-                '--', label=f'Component {i+1}')
+    x = get_curve_x(data)
+    density = np.exp(gmm.score_samples(x.reshape(-1, 1)))
+    responsibilities = gmm.predict_proba(x.reshape(-1, 1))
+    return {'x': x, 'density': density, 'components': (responsibilities * gmm.weights_ * density[:, None]).T,
+            'selection': selection}
+
+def gmm_analysis_render(ax, data, result):
+    plot_distribution(ax, data, get_title('Gaussian Mixture Model', result))
+    ax.plot(result['x'], result['density'], 'r-', label='GMM')
+    for i, component in enumerate(result['components']):
+        ax.plot(result['x'], component, '--', label=f'Component {i+1}')
     ax.legend()
 
-analysis_function_1 = gmm_analysis
-
-def kde_analysis(data, ax):
+# the KDE fits use the FFT binned_kde, whose cost does not grow with
+# the number of curve points, see kde_utils
+def kde_analysis_fit(data, bandwidth=0.5):
     print("Analyzing data using Kernel Density Estimation.")
-    kde = KernelDensity(bandwidth=0.5, kernel='gaussian')
-    kde.fit(data[:, None])
-    x = np.linspace(data.min(), data.max(), 1000)[:, None]
-    log_dens = kde.score_samples(x)
-    
+    x, density = binned_kde(data, bandwidth=bandwidth, x=get_curve_x(data))
+    return {'x': x, 'density': density}
+
+def kde_analysis_render(ax, data, result):
     plot_distribution(ax, data, 'Kernel Density Estimation')
-    ax.plot(x, np.exp(log_dens), 'r-', label='KDE')
+    ax.plot(result['x'], result['density'], 'r-', label='KDE')
     ax.legend()
 
-analysis_function_2 = kde_analysis
-
-def histogram_analysis(data, ax):
+def histogram_analysis_fit(data):
     print("Analyzing data using histogram analysis with peak detection.")
-    counts, bins, _ = ax.hist(data, bins=50, density=True, alpha=0.7)
+    # binned the same way as the histogram_store histograms of the plots
+    counts, bins = BinnedHistogram(histogram_store.max_bins).update(data).rebin_closest(PLOT_BINS).density()
+    peak_indices, _ = find_peaks(counts)
+    return {'counts': counts, 'bins': bins, 'peak_indices': peak_indices}
+
+def histogram_analysis_render(ax, data, result):
+    counts, bins = result['counts'], result['bins']
+    ax.stairs(counts, bins, fill=True, alpha=0.7)
     ax.set_title('Histogram Analysis')
     ax.set_xlabel('Value')
     ax.set_ylabel('Density')
-    
-    peak_indices, _ = find_peaks(counts)
-    for peak in peak_indices:
+
+    for peak in result['peak_indices']:
         ax.axvline(bins[peak], color='r', linestyle='--')
-        ax.text(bins[peak], counts[peak], f'Peak: {bins[peak]:.2f}', 
+        ax.text(bins[peak], counts[peak], f'Peak: {bins[peak]:.2f}',
                 rotation=90, verticalalignment='bottom')
 
-analysis_function_3 = histogram_analysis
-
-def mode_finding(data, ax):
+def mode_finding_fit(data, bandwidth='scott'):
     print("Analyzing data using mode-finding algorithm based on KDE.")
-    kde = gaussian_kde(data)
-    x = np.linspace(data.min(), data.max(), 1000)
-    y = kde(x)
-    
+    x, y = binned_kde(data, bandwidth=bandwidth, x=get_curve_x(data))
     peak_indices, _ = find_peaks(y)
-    modes = x[peak_indices]
-    
+    return {'x': x, 'density': y, 'modes': x[peak_indices], 'mode_densities': y[peak_indices]}
+
+def mode_finding_render(ax, data, result):
     plot_distribution(ax, data, 'Mode-finding Algorithm')
-    ax.plot(x, y, 'r-', label='KDE')
-    for mode in modes:
+    ax.plot(result['x'], result['density'], 'r-', label='KDE')
+    for mode, mode_density in zip(result['modes'], result['mode_densities']):
         ax.axvline(mode, color='g', linestyle='--')
-        ax.text(mode, kde(mode), f'Mode: {mode:.2f}', 
+        ax.text(mode, mode_density, f'Mode: {mode:.2f}',
                 rotation=90, verticalalignment='bottom')
     ax.legend()
 
-analysis_function_4 = mode_finding
-
-def em_algorithm(data, ax, n_components=3):
+def em_algorithm_fit(data, n_components=3):
     print("Analyzing data using Expectation-Maximization algorithm (via GMM).")
-    gmm = GaussianMixture(n_components=n_components, n_init=5)
+    n_components, means_init, selection = get_n_components(data, n_components)
+    # restarts from the same selected means would repeat the same fit
+    gmm = GaussianMixture(n_components=n_components, n_init=5 if means_init is None else 1, means_init=means_init)
     gmm.fit(data.reshape(-1, 1))
-    x = np.linspace(data.min(), data.max(), 1000).reshape(-1, 1)
-    logprob = gmm.score_samples(x)
-    
-    plot_distribution(ax, data, 'Expectation-Maximization Algorithm (GMM)')
-    ax.plot(x, np.exp(logprob), 'r-', label='EM (GMM)')
-    for i, (mean, covar) in enumerate(zip(gmm.means_, gmm.covariances_)):
-        ax.axvline(mean[0], color='g', linestyle='--')
-        ax.text(mean[0], np.exp(logprob.max()), f'μ{i+1}: {mean[0]:.2f}\nσ{i+1}: {np.sqrt(covar[0][0]):.2f}', 
+    x = get_curve_x(data)
+    return {'x': x, 'density': np.exp(gmm.score_samples(x.reshape(-1, 1))),
+            'means': gmm.means_[:, 0], 'stddevs': np.sqrt(gmm.covariances_[:, 0, 0]), 'selection': selection}
+
+def em_algorithm_render(ax, data, result):
+    plot_distribution(ax, data, get_title('Expectation-Maximization Algorithm (GMM)', result))
+    ax.plot(result['x'], result['density'], 'r-', label='EM (GMM)')
+    for i, (mean, stddev) in enumerate(zip(result['means'], result['stddevs'])):
+        ax.axvline(mean, color='g', linestyle='--')
+        ax.text(mean, result['density'].max(), f'μ{i+1}: {mean:.2f}\nσ{i+1}: {stddev:.2f}',
                 rotation=90, verticalalignment='top')
     ax.legend()
 
-analysis_function_5 = em_algorithm
-
-def finite_mixture_model(data, ax, n_components=3):
+def finite_mixture_model_fit(data, n_components=3):
     print("Analyzing data using Finite Mixture Model (using GMM as an example).")
-    gmm = GaussianMixture(n_components=n_components, covariance_type='full')
+    n_components, means_init, selection = get_n_components(data, n_components)
+    gmm = GaussianMixture(n_components=n_components, covariance_type='full', means_init=means_init)
     gmm.fit(data.reshape(-1, 1))
-    x = np.linspace(data.min(), data.max(), 1000).reshape(-1, 1)
-    logprob = gmm.score_samples(x)
-    
-    plot_distribution(ax, data, 'Finite Mixture Model')
-    ax.plot(x, np.exp(logprob), 'r-', label='FMM')
-    ax.legend()
+    x = get_curve_x(data)
+    return {'x': x, 'density': np.exp(gmm.score_samples(x.reshape(-1, 1))), 'selection': selection}
 
-analysis_function_6 = finite_mixture_model
+def finite_mixture_model_render(ax, data, result):
+    plot_distribution(ax, data, get_title('Finite Mixture Model', result))
+    ax.plot(result['x'], result['density'], 'r-', label='FMM')
+    ax.legend()
 
-def non_parametric_mixture(data, ax):
+def non_parametric_mixture_fit(data, bandwidth='scott'):
     print("Analyzing data using Non-parametric Mixture Model (using KDE).")
-    kde = gaussian_kde(data)
-    x = np.linspace(data.min(), data.max(), 1000)
-    y = kde(x)
-    
+    x, density = binned_kde(data, bandwidth=bandwidth, x=get_curve_x(data))
+    return {'x': x, 'density': density}
+
+def non_parametric_mixture_render(ax, data, result):
     plot_distribution(ax, data, 'Non-parametric Mixture Model')
-    ax.plot(x, y, 'r-', label='NPM')
+    ax.plot(result['x'], result['density'], 'r-', label='NPM')
     ax.legend()
 
-analysis_function_7 = non_parametric_mixture
-
-def mean_shift_clustering(data, ax):
+def mean_shift_clustering_fit(data, max_exact_rows=MAX_EXACT_ROWS):
     print("Analyzing data using Mean Shift Clustering.")
-    bandwidth = estimate_bandwidth(data.reshape(-1, 1), quantile=0.2)
+    sample, approximation = get_subsample(data, max_exact_rows)
+    bandwidth = estimate_bandwidth(sample.reshape(-1, 1), quantile=0.2)
     ms = MeanShift(bandwidth=bandwidth, bin_seeding=True)
-    ms.fit(data.reshape(-1, 1))
-    
-    plot_distribution(ax, data, 'Mean Shift Clustering')
-    for center in ms.cluster_centers_:
-        ax.axvline(center[0], color='r', linestyle='--')
-        ax.text(center[0], ax.get_ylim()[1], f'Center: {center[0]:.2f}', 
-                rotation=90, verticalalignment='top')
+    ms.fit(sample.reshape(-1, 1))
+    return {'centers': ms.cluster_centers_[:, 0], 'approximation': approximation}
 
-analysis_function_8 = mean_shift_clustering
+def mean_shift_clustering_render(ax, data, result):
+    plot_distribution(ax, data, get_title('Mean Shift Clustering', result))
+    plot_vertical_lines(ax, result['centers'], 'Center')
 
-def kmeans_clustering(data, ax, n_clusters=3):
+def kmeans_clustering_fit(data, n_clusters=3):
     print("Analyzing data using K-Means Clustering.")
     kmeans = KMeans(n_clusters=n_clusters)
     kmeans.fit(data.reshape(-1, 1))
-    centers = kmeans.cluster_centers_
-    
-    plot_distribution(ax, data, 'K-Means Clustering')
-    for center in centers:
-        ax.axvline(center[0], color='r', linestyle='--')
-        ax.text(center[0], ax.get_ylim()[1], f'Center: {center[0]:.2f}', 
-                rotation=90, verticalalignment='top')
+    return {'centers': kmeans.cluster_centers_[:, 0]}
 
-analysis_function_9 = kmeans_clustering
+def kmeans_clustering_render(ax, data, result):
+    plot_distribution(ax, data, 'K-Means Clustering')
+    plot_vertical_lines(ax, result['centers'], 'Center')
 
-def dbscan_clustering(data, ax):
+def dbscan_clustering_fit(data, eps=0.5, min_samples=5, max_exact_rows=MAX_EXACT_ROWS):
     print("Analyzing data using DBSCAN clustering.")
-    
-    # Reshape data
-    data = data.reshape(-1, 1)
-    
-    # Perform DBSCAN clustering
-    db = DBSCAN(eps=0.5, min_samples=5).fit(data)
-    labels = db.labels_
-    
-    # Plot the results
-    unique_labels = set(labels)
-    colors = [plt.cm.Spectral(each) for each in np.linspace(0, 1, len(unique_labels))]
-    
-    for k, col in zip(unique_labels, colors):
-        class_member_mask = (labels == k)
-        
-        xy = data[class_member_mask]
-        ax.plot(xy[:, 0], np.zeros_like(xy[:, 0]) + 0.01, 'o', markerfacecolor=tuple(col),
-                markeredgecolor='k', markersize=6, label=f'Cluster {k}')
-    
-    plot_distribution(ax, data, 'DBSCAN Clustering')
-    
+    dbscan = DBSCAN(eps=eps, min_samples=min_samples)
+    if len(data) <= max_exact_rows:
+        return {'labels': dbscan.fit(data.reshape(-1, 1)).labels_, 'approximation': 'exact'}
+    # the bin means weighted by their counts, so the neighbourhood
+    # weights of the core point test are the row counts within eps.
+    # Bins wider than a fraction of eps would merge separate clusters.
+    coreset = weighted_coreset(data, DBSCAN_MAX_BINS, width=eps / DBSCAN_BINS_PER_EPS,
+                               max_width=eps / DBSCAN_MIN_BINS_PER_EPS)
+    if coreset is None:
+        return dbscan_subsample_fit(data, eps, min_samples, max_exact_rows)
+    dbscan.fit(coreset.points.reshape(-1, 1), sample_weight=coreset.weights)
+    approximation = f"weighted coreset of {len(coreset.points)} bins of width {coreset.width:.3g}"
+    print(f"DBSCAN clustering of {len(data)} rows approximated by a {approximation}")
+    return {'labels': dbscan.labels_[coreset.inverse], 'approximation': approximation}
+
+def dbscan_subsample_fit(data, eps, min_samples, max_exact_rows):
+    # DBSCAN of a stratified subsample with min_samples scaled to its
+    # size; every row takes the label of the nearest sample row, or is
+    # noise when that row is more than eps away
+    sample, approximation = get_subsample(data, max_exact_rows)
+    scaled_min_samples = max(1, round(min_samples * len(sample) / len(data)))
+    sample_labels = DBSCAN(eps=eps, min_samples=scaled_min_samples).fit(sample.reshape(-1, 1)).labels_
+    nearest = assign_nearest_center(data, sample)
+    labels = np.where(np.abs(data - sample[nearest]) <= eps, sample_labels[nearest], -1)
+    return {'labels': labels, 'approximation': approximation}
+
+def dbscan_clustering_render(ax, data, result):
+    plot_cluster_points(ax, data, result['labels'])
+    plot_distribution(ax, data, get_title('DBSCAN Clustering', result))
+
     # Set y-axis limits to match other plots
     ax.set_ylim(0, 0.5 / 3.25)
     ax.legend()
 
-analysis_function_10 = dbscan_clustering
-
-def agglomerative_clustering(data, ax, n_clusters=3):
+def agglomerative_clustering_fit(data, n_clusters=3, max_exact_rows=MAX_EXACT_ROWS):
     print("Analyzing data using Agglomerative Clustering.")
     agglo = AgglomerativeClustering(n_clusters=n_clusters)
-    labels = agglo.fit_predict(data.reshape(-1, 1))
-    
-    plot_distribution(ax, data, 'Agglomerative Clustering')
+    sample, approximation = get_subsample(data, max_exact_rows)
+    labels = agglo.fit_predict(sample.reshape(-1, 1))
+    if len(sample) < len(data):
+        # the ward clusters of 1-d values are intervals, so every row
+        # joins the cluster with the nearest mean
+        centers = np.bincount(labels, weights=sample) / np.bincount(labels)
+        labels = assign_nearest_center(data, centers)
+    return {'labels': labels, 'approximation': approximation}
+
+def agglomerative_clustering_render(ax, data, result):
+    labels = result['labels']
+    plot_distribution(ax, data, get_title('Agglomerative Clustering', result))
     unique_labels = set(labels)
     for label in unique_labels:
         color = plt.cm.Spectral(float(label) / len(unique_labels))
@@ -195,13 +309,11 @@ def agglomerative_clustering(data, ax, n_clusters=3):
         ax.hist(data[labels == label], bins=50, density=True, alpha=0.7, color=color, label=label_name)
     ax.legend()
 
-analysis_function_11 = agglomerative_clustering
-
 # def spectral_clustering(data, ax, n_clusters=3):
 #     print("Analyzing data using Spectral Clustering.")
 #     spectral = SpectralClustering(n_clusters=n_clusters, affinity='nearest_neighbors')
 #     labels = spectral.fit_predict(data.reshape(-1, 1))
-    
+
 #     plot_distribution(ax, data, 'Spectral Clustering')
 #     unique_labels = set(labels)
 #     for label in unique_labels:
@@ -210,155 +322,272 @@ analysis_function_11 = agglomerative_clustering
 #         ax.hist(data[labels == label], bins=50, density=True, alpha=0.7, color=color, label=label_name)
 #     ax.legend()
 
-def gmm_clustering_analysis(data, ax):
+def gmm_clustering_analysis_fit(data):
     print("Analyzing data using Gaussian Mixture Model (GMM).")
-    
-    # Reshape data
-    data = data.reshape(-1, 1)
-    
-    # Fit GMM
     gmm = GaussianMixture(n_components=3, random_state=42)
-    gmm.fit(data)
-    labels = gmm.predict(data)
-    
-    # Plot the results
-    unique_labels = set(labels)
-    colors = [plt.cm.Spectral(each) for each in np.linspace(0, 1, len(unique_labels))]
-    
-    for k, col in zip(unique_labels, colors):
-        class_member_mask = (labels == k)
-        
-        xy = data[class_member_mask]
-        ax.plot(xy[:, 0], np.zeros_like(xy[:, 0]) + 0.01, 'o', markerfacecolor=tuple(col),
-                markeredgecolor='k', markersize=6, label=f'Cluster {k}')
-    
+    gmm.fit(data.reshape(-1, 1))
+    return {'labels': gmm.predict(data.reshape(-1, 1))}
+
+def gmm_clustering_analysis_render(ax, data, result):
+    plot_cluster_points(ax, data, result['labels'])
     plot_distribution(ax, data, 'Gaussian Mixture Model (GMM)')
-    
+
     # Set y-axis limits to match other plots
     ax.set_ylim(0, 0.5/3.25)
     ax.legend()
-    
-analysis_function_12 = gmm_clustering_analysis
 
 # def gaussian_process_regression(data, ax):
 #     print("Analyzing data using Gaussian Process Regression.")
-    
+
 #     # Scale the data
 #     scaler = StandardScaler()
 #     data_scaled = scaler.fit_transform(data.reshape(-1, 1))
-    
+
 #     kernel = C(1.0, (1e-4, 1e1)) * RBF(1, (1e-4, 1e1))
 #     gpr = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=10)
-    
+
 #     x = np.linspace(data.min(), data.max(), 1000).reshape(-1, 1)
 #     x_scaled = scaler.transform(x)
-    
+
 #     gpr.fit(data_scaled, data)
 #     y_pred, sigma = gpr.predict(x_scaled, return_std=True)
-    
+
 #     plot_distribution(ax, data, 'Gaussian Process Regression')
 #     ax.plot(x, y_pred, 'r-', label='GPR')
 #     ax.fill_between(x.ravel(), y_pred - 1.96 * sigma, y_pred + 1.96 * sigma, alpha=0.2, color='r')
 #     ax.legend()
 
-def isolation_forest_analysis(data, ax):
+def isolation_forest_analysis_fit(data, max_exact_rows=MAX_EXACT_ROWS):
     print("Analyzing data using Isolation Forest.")
-    
-    # Reshape data
-    data = data.reshape(-1, 1)
-    
-    # Perform Isolation Forest analysis
     iso_forest = IsolationForest(contamination=0.1)
-    labels = iso_forest.fit_predict(data)
-    
-    # Plot the results
-    unique_labels = set(labels)
-    colors = [plt.cm.Spectral(each) for each in np.linspace(0, 1, len(unique_labels))]
-    
-    for k, col in zip(unique_labels, colors):
-        class_member_mask = (labels == k)
-        
-        xy = data[class_member_mask]
-        label = 'Outliers' if k == -1 else 'Inliers'
-        ax.plot(xy[:, 0], np.zeros_like(xy[:, 0]) + 0.01, 'o', markerfacecolor=tuple(col),
-                markeredgecolor='k', markersize=6, label=label)
-    
-    plot_distribution(ax, data, 'Isolation Forest Clustering')
+    if len(data) <= max_exact_rows:
+        return {'labels': iso_forest.fit_predict(data.reshape(-1, 1)), 'approximation': 'exact'}
+    # fitted on a subsample, its contamination threshold included, and
+    # scored once per bin of the rows instead of once per row
+    sample, approximation = get_subsample(data, max_exact_rows)
+    iso_forest.fit(sample.reshape(-1, 1))
+    coreset = weighted_coreset(data, max_exact_rows)
+    labels = iso_forest.predict(coreset.points.reshape(-1, 1))[coreset.inverse]
+    approximation = f"{approximation}, scored on {len(coreset.points)} bins"
+    return {'labels': labels, 'approximation': approximation}
+
+def isolation_forest_analysis_render(ax, data, result):
+    plot_cluster_points(ax, data, result['labels'], names={-1: 'Outliers', 1: 'Inliers'})
+    plot_distribution(ax, data, get_title('Isolation Forest Clustering', result))
     ax.legend()
 
-analysis_function_13 = isolation_forest_analysis
-
-def bayesian_mixture_model(data, ax, n_components=3):
+def bayesian_mixture_model_fit(data, n_components=3):
     print("Analyzing data using Bayesian Mixture Model.")
+    # BayesianGaussianMixture has no means_init, only the k is reused
+    n_components, _, selection = get_n_components(data, n_components)
     bgmm = BayesianGaussianMixture(n_components=n_components)
     bgmm.fit(data.reshape(-1, 1))
-    x = np.linspace(data.min(), data.max(), 1000).reshape(-1, 1)
-    logprob = bgmm.score_samples(x)
-    
-    plot_distribution(ax, data, 'Bayesian Mixture Model')
-    ax.plot(x, np.exp(logprob), 'r-', label='BMM')
-    ax.legend()
+    x = get_curve_x(data)
+    return {'x': x, 'density': np.exp(bgmm.score_samples(x.reshape(-1, 1))), 'selection': selection}
 
-analysis_function_14 = bayesian_mixture_model
+def bayesian_mixture_model_render(ax, data, result):
+    plot_distribution(ax, data, get_title('Bayesian Mixture Model', result))
+    ax.plot(result['x'], result['density'], 'r-', label='BMM')
+    ax.legend()
 
-def self_organizing_map(data, ax):
+def self_organizing_map_fit(data):
     print("Analyzing data using Self-Organizing Map.")
     som = MiniSom(1, 10, 1, sigma=0.3, learning_rate=0.5)
     som.random_weights_init(data.reshape(-1, 1))
     som.train_random(data.reshape(-1, 1), 100)
-    
-    plot_distribution(ax, data, 'Self-Organizing Map')
-    weights = som.get_weights().reshape(-1)
-    for weight in weights:
-        ax.axvline(weight, color='r', linestyle='--')
-        ax.text(weight, ax.get_ylim()[1], f'Weight: {weight:.2f}', 
-                rotation=90, verticalalignment='top')
-
-analysis_function_15 = self_organizing_map
+    return {'weights': som.get_weights().reshape(-1)}
 
-analysis_functions = [
-    analysis_function_1, analysis_function_2, analysis_function_3,
-    analysis_function_4, analysis_function_5, analysis_function_6,
-    analysis_function_7, analysis_function_8, analysis_function_9,
-    analysis_function_10, analysis_function_11, analysis_function_12,
-    analysis_function_13, analysis_function_14, analysis_function_15
+def self_organizing_map_render(ax, data, result):
+    plot_distribution(ax, data, 'Self-Organizing Map')
+    plot_vertical_lines(ax, result['weights'], 'Weight')
+
+Analysis = namedtuple('Analysis', ['name', 'fit', 'render', 'params'])
+
+# in the order of the grid and of the zoom-in choices, params are the
+# keyword arguments of fit and part of the fit cache key
+analyses = [
+    Analysis('gmm_analysis', gmm_analysis_fit, gmm_analysis_render, {'n_components': 'auto'}),
+    Analysis('kde_analysis', kde_analysis_fit, kde_analysis_render, {'bandwidth': 0.5}),
+    Analysis('histogram_analysis', histogram_analysis_fit, histogram_analysis_render, {}),
+    Analysis('mode_finding', mode_finding_fit, mode_finding_render, {'bandwidth': 'scott'}),
+    Analysis('em_algorithm', em_algorithm_fit, em_algorithm_render, {'n_components': 'auto'}),
+    Analysis('finite_mixture_model', finite_mixture_model_fit, finite_mixture_model_render, {'n_components': 'auto'}),
+    Analysis('non_parametric_mixture', non_parametric_mixture_fit, non_parametric_mixture_render, {'bandwidth': 'scott'}),
+    Analysis('mean_shift_clustering', mean_shift_clustering_fit, mean_shift_clustering_render, {'max_exact_rows': MAX_EXACT_ROWS}),
+    Analysis('kmeans_clustering', kmeans_clustering_fit, kmeans_clustering_render, {'n_clusters': 3}),
+    Analysis('dbscan_clustering', dbscan_clustering_fit, dbscan_clustering_render, {'eps': 0.5, 'min_samples': 5, 'max_exact_rows': MAX_EXACT_ROWS}),
+    Analysis('agglomerative_clustering', agglomerative_clustering_fit, agglomerative_clustering_render, {'n_clusters': 3, 'max_exact_rows': MAX_EXACT_ROWS}),
+    Analysis('gmm_clustering_analysis', gmm_clustering_analysis_fit, gmm_clustering_analysis_render, {}),
+    Analysis('isolation_forest_analysis', isolation_forest_analysis_fit, isolation_forest_analysis_render, {'max_exact_rows': MAX_EXACT_ROWS}),
+    Analysis('bayesian_mixture_model', bayesian_mixture_model_fit, bayesian_mixture_model_render, {'n_components': 'auto'}),
+    Analysis('self_organizing_map', self_organizing_map_fit, self_organizing_map_render, {}),
 ]
 
-def plot_all_functions(data, width_in=7, height_in=7):
+def make_analysis_function(analysis):
+    # fit and render in the calling process, the original (data, ax) signature
+    def analysis_function(data, ax, **params):
+        analysis.render(ax, data, analysis.fit(data, **{**analysis.params, **params}))
+    analysis_function.__name__ = analysis.name
+    return analysis_function
+
+analysis_functions = [make_analysis_function(analysis) for analysis in analyses]
+(gmm_analysis, kde_analysis, histogram_analysis, mode_finding, em_algorithm,
+ finite_mixture_model, non_parametric_mixture, mean_shift_clustering, kmeans_clustering,
+ dbscan_clustering, agglomerative_clustering, gmm_clustering_analysis,
+ isolation_forest_analysis, bayesian_mixture_model, self_organizing_map) = analysis_functions
+
+# Fitted results are cached by the fingerprint of the data, the analysis
+# name and its params, in memory and, with a ProfileCache, on disk, so
+# switching views only redraws and a later session reuses the fits of
+# an unchanged column. Bump FIT_CACHE_VERSION when a fit or the layout
+# of its result changes.
+FIT_CACHE_KIND = "multimodal_fit"
+FIT_CACHE_VERSION = 8
+
+def get_fit_key(fingerprint, analysis):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{FIT_CACHE_VERSION}|{fingerprint}|{analysis.name}|{sorted(analysis.params.items())!r}".encode())
+    return digest.hexdigest()
+
+def get_selection_key(fingerprint):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{FIT_CACHE_VERSION}|{fingerprint}|mixture_selection|{list(MIXTURE_K_RANGE)}|{MIXTURE_CRITERION}".encode())
+    return digest.hexdigest()
+
+class FitCache:
+    """Fitted analysis results in memory, backed by an optional on-disk ProfileCache."""
+
+    # max_entries bounds the results held in memory: the least recently
+    # used are evicted beyond it, and are read from disk again if any
+    def __init__(self, disk_cache=None, max_entries=None):
+        self.disk_cache = disk_cache
+        self.max_entries = max_entries
+        self.results = {}
+
+    def get(self, key):
+        # the cached result or None
+        if key not in self.results and self.disk_cache is not None:
+            result = self.disk_cache.get(FIT_CACHE_KIND, key)
+            if result is not None:
+                self.results[key] = result
+        if key not in self.results:
+            return None
+        return self._touch(key)
+
+    def put(self, key, result):
+        self.results[key] = result
+        self._touch(key)
+        if self.disk_cache is not None:
+            self.disk_cache.put(FIT_CACHE_KIND, key, result)
+
+    def _touch(self, key):
+        # mark key as the most recently used, and evict the least
+        # recently used results beyond max_entries
+        result = self.results.pop(key)
+        self.results[key] = result
+        if self.max_entries is not None:
+            while len(self.results) > self.max_entries:
+                del self.results[next(iter(self.results))]
+        return result
+
+    def clear(self):
+        self.results.clear()
+
+# the fits of the current session, of the last two columns analysed:
+# every analysis and the mixture selection of each
+FIT_CACHE_ENTRIES = 2 * (len(analyses) + 1)
+fit_cache = FitCache(max_entries=FIT_CACHE_ENTRIES)
+
+def fit_analysis(fit, data, params):
+    # worker: one analysis fit
+    return fit(data, **params)
+
+def get_params(analysis, mixture_selection):
+    if analysis.params.get('n_components') == 'auto':
+        return {**analysis.params, 'n_components': mixture_selection}
+    return analysis.params
+
+def fit_all_analyses(data, max_workers=None, cache=None, indexes=None):
+    # the results of every analysis, or of the analyses at indexes,
+    # looked up in cache and the rest fitted in a pool of max_workers
+    # processes unless max_workers is 1 or only one fit is missing.
+    # The 'auto' n_components of the missing fits is selected once.
+    data = np.asarray(data, dtype=np.float64)
+    if indexes is None:
+        indexes = range(len(analyses))
+    selected = [analyses[index] for index in indexes]
+    keys = [None] * len(selected)
+    results = [None] * len(selected)
+    if cache is not None:
+        fingerprint = array_fingerprint(data)
+        keys = [get_fit_key(fingerprint, analysis) for analysis in selected]
+        results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    mixture_selection = None
+    if any(selected[i].params.get('n_components') == 'auto' for i in missing):
+        selection_key = get_selection_key(fingerprint) if cache is not None else None
+        mixture_selection = cache.get(selection_key) if cache is not None else None
+        if mixture_selection is None:
+            mixture_selection = select_mixture(data)
+            if cache is not None:
+                cache.put(selection_key, mixture_selection)
+    args = ([selected[i].fit for i in missing], [data] * len(missing),
+            [get_params(selected[i], mixture_selection) for i in missing])
+    if max_workers == 1 or len(missing) <= 1:
+        fitted = list(map(fit_analysis, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            fitted = list(executor.map(fit_analysis, *args))
+    for i, result in zip(missing, fitted):
+        results[i] = result
+        if cache is not None:
+            cache.put(keys[i], result)
+    return results
+
+def render_all_analyses(data, results, axes):
+    for analysis, result, ax in zip(analyses, results, axes):
+        analysis.render(ax, data, result)
+
+def plot_all_functions(data, width_in=7, height_in=7, max_workers=None, cache=fit_cache):
     """Plot all 15 functions in a 4x4 grid with the top-left subplot showing the legend."""
+    results = fit_all_analyses(data, max_workers=max_workers, cache=cache)
     plt.close('all')  # Close previous plots
     fig, axes = plt.subplots(4, 4, figsize=(width_in, height_in))
     axes = axes.flatten()
-    
+
     # Top-left subplot for the legend
     axes[0].axis('off')
-    
-    for i, (func, ax) in enumerate(zip(analysis_functions, axes[1:])):
-        func(data, ax)
-    
+
+    render_all_analyses(data, results, axes[1:])
+
     # Create a dummy plot for the legend
     handles, labels = axes[1].get_legend_handles_labels()
     axes[0].legend(handles, labels, loc='center')
-    
+
     plt.tight_layout()
     plt.show()
 
-def plot_single_function(data, index, width_in=7, height_in=7):
+def plot_single_function(data, index, width_in=7, height_in=7, cache=fit_cache):
     """Plot a single function based on the provided index."""
     plt.figure(figsize=(width_in, height_in))
-    analysis_functions[index](data, plt.gca())
+    result, = fit_all_analyses(data, cache=cache, indexes=[index])
+    analyses[index].render(plt.gca(), data, result)
     plt.tight_layout()
     plt.show()
 
-def analyze_multimodal_distribution(data):
+# cache is the FitCache of the fitted results, the in-memory fit_cache
+# by default, FitCache(ProfileCache()) to keep them across sessions
+def analyze_multimodal_distribution(data, cache=None):
     print("Analyze multimodal distribution using 15 different approaches.")
+    if cache is None:
+        cache = fit_cache
     
     # Enable interactive mode
     plt.ion()
 
     # Initial plot of all functions
     print("plotting all functions")
-    plot_all_functions(data)
+    plot_all_functions(data, cache=cache)
     print("all functions plotted")
 
     while True:
@@ -370,15 +599,15 @@ def analyze_multimodal_distribution(data):
         elif choice == 'z':
             # Zoom-out to print all 15 plots at once (default view)
             plt.close('all')  # Close previous plots
-            plot_all_functions(data)
+            plot_all_functions(data, cache=cache)
         elif choice.isdigit() and 1 <= int(choice) <= 9:
             # Zoom-in to plot only the selected analysis function
             plt.close('all')  # Close previous plots
-            plot_single_function(data, int(choice) - 1)
+            plot_single_function(data, int(choice) - 1, cache=cache)
         elif choice in 'abcdef':
             # Zoom-in to plot only the selected analysis function
             plt.close('all')  # Close previous plots
-            plot_single_function(data, ord(choice) - ord('a') + 9)
+            plot_single_function(data, ord(choice) - ord('a') + 9, cache=cache)
         else:
             print("Invalid input. Please enter a number between 1 and 9 or a-f.")
 
@@ -391,6 +620,6 @@ if __name__ == "__main__":
         np.random.normal(5, 0.5, 500)
     ])
 
-    analyze_multimodal_distribution(data)
+    analyze_multimodal_distribution(data, cache=FitCache(ProfileCache()))
     
     # a needs to be scaled vertically to match the other plots.
\ No newline at end of file
@@ -0,0 +1,176 @@
+# Near-duplicate movie detection: re-releases and the same movie under
+# another id, which df.duplicated(subset=['id', 'title']) cannot see.
+#
+# usage:
+# from near_duplicates import find_near_duplicates, show_near_duplicates
+# pairs, clusters = find_near_duplicates(df, threshold=0.7)
+# show_near_duplicates(clusters, df)
+#
+# The title and overview of each movie are normalized to lowercase
+# words and cut into overlapping word shingles. MinHash signatures are
+# computed with numpy for batches of movies, each permutation mixing
+# the 64-bit shingle hashes xor its seed with the splitmix64 finalizer.
+# LSH banding groups the movies whose signatures agree on every row of
+# a band, so candidate pairs come from the bucket collisions in roughly
+# linear time instead of comparing all pairs. Candidates are verified with the
+# signature agreement, an estimate of the Jaccard similarity of their
+# shingle sets, and connected components of the verified pairs are the
+# duplicate clusters.
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+EMPTY_SIGNATURE = np.iinfo(np.uint64).max
+TOKEN_PATTERN = r"\w+"
+NEAR_DUPLICATE_TEXT_COLUMNS = ['title', 'overview']
+
+def get_document_texts(df, text_cols=NEAR_DUPLICATE_TEXT_COLUMNS):
+    # the text columns of each row joined by a space, missing values as ''
+    texts = pd.Series('', index=df.index)
+    for col in text_cols:
+        if col in df.columns:
+            texts = texts + ' ' + df[col].fillna('').astype(str)
+    return texts.reset_index(drop=True)
+
+def shingle_hashes(texts, shingle_size=2):
+    # 64-bit hashes of the word shingles of each text and the text
+    # position of each shingle. A text shorter than a shingle is one shingle.
+    texts = texts.reset_index(drop=True)
+    tokens = texts.str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+    docs = tokens.index.to_numpy(dtype=np.int64)
+    token_hashes = pd.util.hash_array(tokens.to_numpy(dtype=object))
+    ntokens = np.bincount(docs, minlength=len(texts))
+    positions = np.arange(len(docs)) - np.repeat(np.cumsum(ntokens) - ntokens, ntokens)
+    doc_lengths = ntokens[docs]
+    shingles = token_hashes.copy()
+    for j in range(1, shingle_size):
+        within = positions + j < doc_lengths
+        following = np.zeros_like(token_hashes)
+        following[:-j] = token_hashes[j:]
+        shingles = np.where(within, shingles * np.uint64(1_000_003) ^ following, shingles)
+    starts = positions <= np.maximum(doc_lengths - shingle_size, 0)
+    return shingles[starts], docs[starts]
+
+def mix64(values):
+    # the splitmix64 finalizer, in place on a uint64 array
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+class MinHasher:
+    """MinHash signatures of word shingle sets, computed in numpy batches."""
+
+    def __init__(self, num_perm=128, shingle_size=2, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.seeds = rng.integers(0, EMPTY_SIGNATURE, num_perm, dtype=np.uint64, endpoint=True)
+
+    def signatures(self, texts, batch_size=2000, perm_block=32):
+        # (texts, num_perm) signatures; texts without any word get the
+        # maximum value everywhere and are excluded from the candidates
+        texts = pd.Series(texts).reset_index(drop=True)
+        signatures = np.full((len(texts), self.num_perm), EMPTY_SIGNATURE, dtype=np.uint64)
+        for start in range(0, len(texts), batch_size):
+            shingles, docs = shingle_hashes(texts.iloc[start:start + batch_size], self.shingle_size)
+            if len(shingles) == 0:
+                continue
+            # shingles are in document order, so each document is a run
+            run_starts = np.flatnonzero(np.concatenate([[True], docs[1:] != docs[:-1]]))
+            run_docs = docs[run_starts] + start
+            for p in range(0, self.num_perm, perm_block):
+                # permutations x shingles, so that reduceat runs along contiguous rows
+                hashes = mix64(self.seeds[p:p + perm_block, None] ^ shingles[None, :])
+                signatures[run_docs, p:p + perm_block] = np.minimum.reduceat(hashes, run_starts, axis=1).T
+        return signatures
+
+def lsh_candidate_pairs(signatures, bands=32, max_bucket_size=100):
+    # pairs (i, j), i < j, of rows whose signatures agree on all the
+    # rows of at least one band. Buckets larger than max_bucket_size,
+    # e.g. of boilerplate overviews, are skipped.
+    n, num_perm = signatures.shape
+    if num_perm % bands != 0:
+        raise ValueError(f"num_perm:{num_perm} is not a multiple of bands:{bands}")
+    rows_per_band = num_perm // bands
+    valid = np.flatnonzero((signatures != EMPTY_SIGNATURE).any(axis=1))
+    pairs = []
+    for band in range(bands):
+        band_values = signatures[valid, band * rows_per_band:(band + 1) * rows_per_band]
+        keys = np.zeros(len(valid), dtype=np.uint64)
+        for j in range(rows_per_band):
+            keys = keys * np.uint64(0x9E3779B97F4A7C15) ^ band_values[:, j]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1], [True]]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if 1 < hi - lo <= max_bucket_size:
+                members = valid[order[lo:hi]]
+                i, j = np.triu_indices(len(members), k=1)
+                pairs.append(np.stack([members[i], members[j]], axis=1))
+    if len(pairs) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0)
+
+def estimated_similarity(signatures, pairs):
+    # fraction of agreeing signature values, the MinHash estimate of
+    # the Jaccard similarity of each pair
+    if len(pairs) == 0:
+        return np.empty(0)
+    return (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+def cluster_pairs(pairs, nrows):
+    # connected components of the pair graph, as cluster labels of the
+    # rows in some pair; unpaired rows are labeled -1
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(nrows, nrows))
+    _, components = connected_components(graph, directed=False)
+    paired = np.zeros(nrows, dtype=bool)
+    paired[pairs.ravel()] = True
+    labels = np.full(nrows, -1, dtype=np.int64)
+    # numbered by the first row of each cluster
+    labels[paired] = np.unique(components[paired], return_inverse=True)[1]
+    return labels
+
+def find_near_duplicates(df, text_cols=NEAR_DUPLICATE_TEXT_COLUMNS, threshold=0.7,
+                         num_perm=128, bands=32, shingle_size=2, max_bucket_size=100, seed=1):
+    # returns the verified pairs (row_a, row_b, similarity) and the
+    # clusters (cluster, row, score) of near duplicate rows, by row
+    # position, where the score of a row is its best pair similarity
+    texts = get_document_texts(df, text_cols)
+    hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+    signatures = hasher.signatures(texts)
+    candidates = lsh_candidate_pairs(signatures, bands=bands, max_bucket_size=max_bucket_size)
+    similarity = estimated_similarity(signatures, candidates)
+    verified = similarity >= threshold
+    pairs = pd.DataFrame({
+        'row_a': candidates[verified, 0],
+        'row_b': candidates[verified, 1],
+        'similarity': similarity[verified],
+    })
+    if len(pairs) == 0:
+        return pairs, pd.DataFrame({'cluster': [], 'row': [], 'score': []})
+    labels = cluster_pairs(candidates[verified], len(df))
+    rows = np.flatnonzero(labels >= 0)
+    scores = np.zeros(len(df))
+    np.maximum.at(scores, candidates[verified, 0], similarity[verified])
+    np.maximum.at(scores, candidates[verified, 1], similarity[verified])
+    clusters = pd.DataFrame({'cluster': labels[rows], 'row': rows, 'score': scores[rows]})
+    clusters = clusters.sort_values(['cluster', 'row'], ignore_index=True)
+    return pairs, clusters
+
+def show_near_duplicates(clusters, df=None, max_output_lines=20):
+    # print the clusters, with the id and title of each row when the
+    # scanned DataFrame is given
+    print(f"Found {clusters['cluster'].nunique()} near duplicate clusters of {len(clusters)} rows")
+    clusters = clusters.iloc[:max_output_lines].copy()
+    if df is not None and len(clusters) > 0:
+        rows = clusters['row'].to_numpy(dtype=np.int64)
+        for extra in ['id', 'title']:
+            if extra in df.columns:
+                clusters[extra] = df[extra].iloc[rows].to_numpy()
+    print(clusters.to_string(index=False))
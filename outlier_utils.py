@@ -0,0 +1,276 @@
+# Vectorized outlier detection for all numeric columns at once,
+# keeping only a sparse index of the flagged (row, column, score)
+# entries instead of dense N-length score arrays.
+#
+# usage:
+# from outlier_utils import find_outliers, show_column_outliers
+# outliers = find_outliers(df, ['budget', 'revenue'])
+# show_column_outliers(outliers, 'budget', df=df)
+#
+# streaming, with two passes over the chunks:
+# detector = OutlierDetector(['budget', 'revenue'])
+# detector.fit(pd.read_csv(path, dtype=str, chunksize=10000))
+# for chunk in pd.read_csv(path, dtype=str, chunksize=10000):
+#     detector.scan(chunk)
+# outliers = detector.index
+#
+# Methods, each flagging |score| > its threshold:
+#   zscore  (x - mean) / std, with the population std like scipy.stats.zscore
+#   mad     0.6745 * (x - median) / MAD, the modified z-score of Iglewicz and Hoaglin
+#   iqr     distance beyond the Tukey fences q1 - k*IQR and q3 + k*IQR, in units
+#           of IQR, so any value outside the fences is flagged
+# Columns whose scale is zero for a method (e.g. mostly-zero budgets
+# have MAD = IQR = 0) are not scored by that method.
+
+import warnings
+import numpy as np
+import pandas as pd
+from sketch_utils import TDigest
+from stat_utils import get_numeric_values, compute_column_moments, is_numeric_stats_column
+
+OUTLIER_METHODS = ('zscore', 'mad', 'iqr')
+MAD_SCALE = 0.6745
+
+class OutlierIndex:
+    """Sparse index of outlier entries: row position, column, method and score."""
+
+    def __init__(self, columns, methods=OUTLIER_METHODS):
+        self.columns = list(columns)
+        self.methods = list(methods)
+        self._parts = []
+        self._arrays = None
+
+    def append(self, rows, col_positions, method, scores):
+        if len(rows) == 0:
+            return
+        method_positions = np.full(len(rows), self.methods.index(method), dtype=np.int8)
+        self._parts.append((np.asarray(rows, dtype=np.int64), np.asarray(col_positions, dtype=np.int32),
+                            method_positions, np.asarray(scores, dtype=np.float64)))
+        self._arrays = None
+
+    def merge(self, other):
+        # combine with the index of another partition, whose row
+        # positions must already be global
+        if other.columns != self.columns or other.methods != self.methods:
+            raise ValueError("cannot merge outlier indexes of different columns or methods")
+        self._parts.extend(other._parts)
+        self._arrays = None
+        return self
+
+    def _concatenated(self):
+        if self._arrays is None:
+            if len(self._parts) == 0:
+                self._arrays = (np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int8), np.empty(0))
+            else:
+                self._arrays = tuple(np.concatenate(arrays) for arrays in zip(*self._parts))
+                self._parts = [self._arrays]
+        return self._arrays
+
+    def __len__(self):
+        return len(self._concatenated()[0])
+
+    def to_frame(self, index=None):
+        # one row per outlier entry; with the index of the scanned
+        # DataFrame the row positions are mapped to its labels
+        rows, col_positions, method_positions, scores = self._concatenated()
+        frame = pd.DataFrame({
+            'row': rows if index is None else np.asarray(index)[rows],
+            'column': pd.Categorical.from_codes(col_positions, self.columns),
+            'method': pd.Categorical.from_codes(method_positions, self.methods),
+            'score': scores,
+        })
+        return frame
+
+    def for_column(self, col, method=None, index=None):
+        # entries of one column, largest |score| first
+        rows, col_positions, method_positions, scores = self._concatenated()
+        mask = col_positions == self.columns.index(col)
+        if method is not None:
+            mask &= method_positions == self.methods.index(method)
+        order = np.argsort(-np.abs(scores[mask]), kind='stable')
+        selected = np.flatnonzero(mask)[order]
+        return pd.DataFrame({
+            'row': rows[selected] if index is None else np.asarray(index)[rows[selected]],
+            'method': pd.Categorical.from_codes(method_positions[selected], self.methods),
+            'score': scores[selected],
+        })
+
+    def counts(self):
+        # number of outliers per column and method
+        rows, col_positions, method_positions, _ = self._concatenated()
+        counts = np.zeros((len(self.columns), len(self.methods)), dtype=np.int64)
+        np.add.at(counts, (col_positions, method_positions), 1)
+        return pd.DataFrame(counts, index=self.columns, columns=self.methods)
+
+    def outlier_rows(self, method='zscore', cols=None):
+        # sorted unique row positions flagged by method in any of cols
+        rows, col_positions, method_positions, _ = self._concatenated()
+        mask = method_positions == self.methods.index(method)
+        if cols is not None:
+            mask &= np.isin(col_positions, [self.columns.index(col) for col in cols])
+        return np.unique(rows[mask])
+
+class OutlierDetector:
+    """Scores numeric columns chunk by chunk and records the outliers in an OutlierIndex."""
+
+    def __init__(self, cols, threshold=3.0, mad_threshold=3.5, iqr_factor=1.5,
+                 methods=OUTLIER_METHODS, compression=200):
+        self.cols = list(cols)
+        self.threshold = threshold
+        self.mad_threshold = mad_threshold
+        self.iqr_factor = iqr_factor
+        self.methods = list(methods)
+        k = len(self.cols)
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.digests = [TDigest(compression) for _ in self.cols]
+        self.params = None
+        self.rows_scanned = 0
+        self.index = OutlierIndex(self.cols, self.methods)
+
+    def update_stats(self, chunk):
+        # merge the moments and quantile digests of a chunk, using
+        # Chan's parallel update of the count, mean and M2
+        values = get_numeric_values(chunk, self.cols)
+        moments = compute_column_moments(values)
+        count_b = moments['count'].astype(np.float64)
+        total = self.count + count_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = np.where(count_b > 0, moments['mean'] - self.mean, 0.0)
+            weight_b = np.where(total > 0, count_b / total, 0.0)
+        self.m2 = self.m2 + np.where(count_b > 0, moments['m2'], 0.0) + delta**2 * self.count * weight_b
+        self.mean = self.mean + delta * weight_b
+        self.count = total
+        for j, digest in enumerate(self.digests):
+            digest.update(values[:, j])
+        self.params = None
+        return self
+
+    def fit(self, chunks):
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        for chunk in chunks:
+            self.update_stats(chunk)
+        return self.finalize()
+
+    def finalize(self):
+        # derive the center and scale of every method from the merged
+        # moments and digests. MAD is the d that solves
+        # cdf(median + d) - cdf(median - d) = 0.5 on each digest.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / self.count)
+        median = np.array([d.quantile(0.5) for d in self.digests])
+        q1 = np.array([d.quantile(0.25) for d in self.digests])
+        q3 = np.array([d.quantile(0.75) for d in self.digests])
+        mad = np.array([digest_mad(d, m) for d, m in zip(self.digests, median)])
+        return self.set_params(self.mean, std, median, mad, q1, q3)
+
+    def fit_exact(self, df):
+        # exact in-memory statistics of a whole DataFrame
+        values = get_numeric_values(df, self.cols)
+        moments = compute_column_moments(values)
+        with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+            # all-NaN columns get NaN statistics and are never scored
+            warnings.simplefilter('ignore', RuntimeWarning)
+            std = np.sqrt(moments['m2'] / moments['count'])
+            median = np.nanmedian(values, axis=0)
+            mad = np.nanmedian(np.abs(values - median), axis=0)
+            q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+        return self.set_params(moments['mean'], std, median, mad, q1, q3)
+
+    def set_params(self, mean, std, median, mad, q1, q3):
+        iqr = q3 - q1
+        self.params = {
+            'mean': mean, 'std': std, 'median': median, 'mad': mad,
+            'q1': q1, 'q3': q3, 'iqr': iqr,
+        }
+        return self
+
+    def score(self, values, method):
+        # 2-D scores of a 2-D float array; NaN where a value is missing
+        # or the column has no usable scale for the method
+        p = self.params
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if method == 'zscore':
+                return (values - p['mean']) / np.where(p['std'] > 0, p['std'], np.nan)
+            if method == 'mad':
+                return MAD_SCALE * (values - p['median']) / np.where(p['mad'] > 0, p['mad'], np.nan)
+            if method == 'iqr':
+                iqr = np.where(p['iqr'] > 0, p['iqr'], np.nan)
+                above = (values - (p['q3'] + self.iqr_factor * iqr)) / iqr
+                below = (values - (p['q1'] - self.iqr_factor * iqr)) / iqr
+                return np.where(above > 0, above, np.where(below < 0, below, 0.0))
+        raise ValueError(f"unknown outlier method:{method}")
+
+    def is_outlier(self, scores, method):
+        if method == 'zscore':
+            return np.abs(scores) > self.threshold
+        if method == 'mad':
+            return np.abs(scores) > self.mad_threshold
+        return scores != 0
+
+    def scan(self, chunk, row_offset=None):
+        # append the outliers of a chunk to the index. Row positions
+        # continue from the previous scan unless row_offset is given.
+        if self.params is None:
+            raise ValueError("call fit, fit_exact or finalize before scan")
+        if row_offset is None:
+            row_offset = self.rows_scanned
+        values = get_numeric_values(chunk, self.cols)
+        for method in self.methods:
+            scores = self.score(values, method)
+            with np.errstate(invalid='ignore'):
+                rows, col_positions = np.nonzero(self.is_outlier(scores, method))
+            self.index.append(rows + row_offset, col_positions, method, scores[rows, col_positions])
+        self.rows_scanned = row_offset + len(values)
+        return self
+
+def digest_mad(digest, median, iterations=60):
+    # median absolute deviation of the distribution summarized by a TDigest
+    if digest.total == 0 or np.isnan(median):
+        return np.nan
+    lo, hi = 0.0, max(digest.max - median, median - digest.min)
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        if digest.cdf(median + mid) - digest.cdf(median - mid) < 0.5:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+def find_outliers(df, cols=None, threshold=3.0, mad_threshold=3.5, iqr_factor=1.5, methods=OUTLIER_METHODS):
+    # exact outliers of the numeric columns of an in-memory DataFrame
+    if cols is None:
+        cols = [col for col in df.columns if is_numeric_stats_column(df, col)]
+    detector = OutlierDetector(cols, threshold=threshold, mad_threshold=mad_threshold,
+                               iqr_factor=iqr_factor, methods=methods)
+    detector.fit_exact(df)
+    detector.scan(df, row_offset=0)
+    return detector.index
+
+def find_outliers_in_chunks(make_chunks, cols, threshold=3.0, mad_threshold=3.5, iqr_factor=1.5, methods=OUTLIER_METHODS):
+    # approximate outliers of a column set too large for memory.
+    # make_chunks is called twice and must return a fresh iterable
+    # of DataFrame chunks each time, e.g.
+    # lambda: pd.read_csv(path, dtype=str, chunksize=10000)
+    detector = OutlierDetector(cols, threshold=threshold, mad_threshold=mad_threshold,
+                               iqr_factor=iqr_factor, methods=methods)
+    detector.fit(make_chunks())
+    for chunk in make_chunks():
+        detector.scan(chunk)
+    return detector.index
+
+def show_column_outliers(outliers, col, df=None, method='zscore', max_output_lines=10):
+    # print the largest outliers of a column, with their id and title
+    # when the scanned DataFrame is given
+    entries = outliers.for_column(col, method=method)
+    print(f"Column:[{col}] has {len(entries)} {method} outliers")
+    entries = entries.iloc[:max_output_lines]
+    if df is not None and len(entries) > 0:
+        rows = entries['row'].to_numpy()
+        for extra in ['id', 'title']:
+            if extra in df.columns:
+                entries[extra] = df[extra].iloc[rows].to_numpy()
+        entries['value'] = df[col].iloc[rows].to_numpy()
+    print(entries.to_string(index=False))
@@ -8,31 +8,90 @@ from column_types import get_numeric_columns, get_column_type_extractor
 from sklearn.preprocessing import StandardScaler
 
 
-# Show a matrix of histograms for pairs of numeric columns
-def show_scatter_and_density(df):
+DEFAULT_PAIR_BINS = 50
+DEFAULT_SCATTER_SAMPLE_SIZE = 5000
+SCATTER_MATRIX_MODES = ['heatmap', 'scattergl', 'scatter']
+
+# The bin edges of the finite values of a column and the bin index of
+# every value, -1 for missing and infinite values. Each column is binned
+# once and the bin indexes are shared by all the pairs it is part of.
+def get_column_bins(values, bins=DEFAULT_PAIR_BINS):
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    edges = np.histogram_bin_edges(values[finite], bins=bins)
+    indexes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    return edges, np.where(finite, indexes, -1)
+
+# bins x bins counts of the rows where both columns have a value,
+# indexed [y_bin, x_bin] as a heatmap expects
+def get_pair_counts(x_indexes, y_indexes, bins):
+    valid = (x_indexes >= 0) & (y_indexes >= 0)
+    counts = np.bincount(y_indexes[valid] * bins + x_indexes[valid], minlength=bins * bins)
+    return counts.reshape(bins, bins)
+
+def get_bin_centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
+
+# Build the matrix of pairs of numeric columns: density histograms on
+# the diagonal and, off the diagonal, by mode:
+#   'heatmap'   - 2-D binned counts of each pair, bounded by bins x bins
+#   'scattergl' - WebGL markers of a sample of sample_size rows
+#   'scatter'   - SVG markers of every row, for small frames only
+# The histograms are bar charts of the binned counts in every mode, so
+# the figure size does not depend on the number of rows.
+# store is an optional HistogramStore the diagonal densities are read from.
+def build_scatter_and_density_figure(df, mode='heatmap', bins=DEFAULT_PAIR_BINS,
+                                     sample_size=DEFAULT_SCATTER_SAMPLE_SIZE, seed=0, store=None):
+    if mode not in SCATTER_MATRIX_MODES:
+        raise ValueError(f"mode:{mode} is not one of {SCATTER_MATRIX_MODES}")
     numeric_df = df.select_dtypes(include=[np.number])
     numeric_cols = numeric_df.columns
     num_cols = len(numeric_cols)
 
     # Create a grid layout
-    fig = make_subplots(rows=num_cols, cols=num_cols, 
+    fig = make_subplots(rows=num_cols, cols=num_cols,
                         subplot_titles=[
                             f'{x} vs {y}' for x in numeric_cols for y in numeric_cols],
                         shared_xaxes=True, shared_yaxes=True)
 
-    for i, col1 in enumerate(numeric_cols):
-        for j, col2 in enumerate(numeric_cols):
+    binned = [get_column_bins(numeric_df.iloc[:, i], bins=bins) for i in range(num_cols)]
+    if mode == 'scattergl' and len(numeric_df) > sample_size:
+        rng = np.random.default_rng(seed)
+        sample_df = numeric_df.iloc[np.sort(rng.choice(len(numeric_df), sample_size, replace=False))]
+    else:
+        sample_df = numeric_df
+
+    for i in range(num_cols):
+        y_edges, y_indexes = binned[i]
+        for j in range(num_cols):
+            x_edges, x_indexes = binned[j]
             if i == j:
-                # Add density plot on the diagonal
-                fig.add_trace(go.Histogram(
-                    x=numeric_df[col1], nbinsx=20, histnorm='probability density'), row=i + 1, col=j + 1)
+                # probability density of each bin on the diagonal
+                if store is not None:
+                    density, x_edges = store.get(numeric_df.iloc[:, i], name=numeric_cols[i]).rebin_closest(bins).density()
+                else:
+                    counts = np.bincount(x_indexes[x_indexes >= 0], minlength=bins)
+                    density = counts / max(counts.sum(), 1) / np.diff(x_edges)
+                fig.add_trace(go.Bar(x=get_bin_centers(x_edges), y=density, width=np.diff(x_edges),
+                                     showlegend=False), row=i + 1, col=j + 1)
+            elif mode == 'heatmap':
+                counts = get_pair_counts(x_indexes, y_indexes, bins)
+                # empty bins are left transparent
+                z = np.where(counts > 0, counts, np.nan)
+                fig.add_trace(go.Heatmap(x=get_bin_centers(x_edges), y=get_bin_centers(y_edges), z=z,
+                                         colorscale='Viridis', showscale=False), row=i + 1, col=j + 1)
             else:
-                # Add scatter plot on the off-diagonal
-                fig.add_trace(go.Scatter(
-                    x=numeric_df[col2], y=numeric_df[col1], mode='markers'), row=i + 1, col=j + 1)
+                scatter = go.Scattergl if mode == 'scattergl' else go.Scatter
+                fig.add_trace(scatter(x=sample_df.iloc[:, j], y=sample_df.iloc[:, i], mode='markers',
+                                      marker=dict(size=3), showlegend=False), row=i + 1, col=j + 1)
 
     fig.update_layout(height=800, width=800,
                       title_text="Scatter Plots and Density Plots")
+    return fig
+
+# Show a matrix of histograms for pairs of numeric columns
+def show_scatter_and_density(df, mode='heatmap', bins=DEFAULT_PAIR_BINS, sample_size=DEFAULT_SCATTER_SAMPLE_SIZE):
+    fig = build_scatter_and_density_figure(df, mode=mode, bins=bins, sample_size=sample_size)
     fig.show()
     
     # allow keyboard entry while figure is displayed
@@ -43,11 +102,17 @@ def show_scatter_and_density(df):
         print("Quitting...")
         return
 
-def plot_column_distribution(df, col, title="", mean=None, stddev=None, scale_factor=1):
+# store is an optional HistogramStore the histogram is read from,
+# binned to at most bins bins
+def plot_column_distribution(df, col, title="", mean=None, stddev=None, scale_factor=1, store=None, bins=DEFAULT_PAIR_BINS):
     fig = go.Figure()
     
     # Add histogram
-    fig.add_trace(go.Histogram(x=df[col], histnorm='probability density', name='Histogram'))
+    if store is not None:
+        density, edges = store.get(df[col], name=col).rebin_closest(bins).density()
+        fig.add_trace(go.Bar(x=get_bin_centers(edges), y=density, width=np.diff(edges), name='Histogram'))
+    else:
+        fig.add_trace(go.Histogram(x=df[col], histnorm='probability density', name='Histogram'))
     
     # Calculate PDF
     if mean is None:
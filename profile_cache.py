@@ -0,0 +1,140 @@
+# A persistent on-disk cache of column profiles, keyed by a cheap
+# content fingerprint of each column, so that profiling an unchanged
+# column in a later session is a lookup instead of a recomputation.
+#
+# usage:
+# from profile_cache import ProfileCache
+# cache = ProfileCache()    # PROFILE_CACHE_PATH or ./.profile_cache
+# all_stats = compute_column_stats(df, cache=cache)
+# catalog = ColumnCatalog(df, cache=cache)
+# cache.show_stats()
+#
+# Entries are pickle files named by profile kind and fingerprint.
+# The total size of the cache is capped at max_bytes; when it is
+# exceeded the least recently used entries are evicted first.
+
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+DEFAULT_PROFILE_CACHE_PATH = "./.profile_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def array_fingerprint(values):
+    # hash of the dtype, the shape and the data buffer of an array.
+    # Arrays of python objects have no stable buffer, so their
+    # vectorized pandas value hashes are fingerprinted instead.
+    values = np.asarray(values)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(values.dtype).encode())
+    digest.update(str(values.shape).encode())
+    if values.dtype == object:
+        try:
+            hashes = pd.util.hash_array(values.ravel())
+        except TypeError:
+            hashes = pd.util.hash_array(pd.Series(values.ravel()).astype(str).to_numpy(dtype=object))
+        digest.update(hashes.tobytes())
+    else:
+        digest.update(np.ascontiguousarray(values).view(np.uint8).tobytes())
+    return digest.hexdigest()
+
+def column_fingerprint(series):
+    # the dtype of the series plus the fingerprint of its values,
+    # independent of the column name and of the index
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(series.dtype).encode())
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        values = series.to_numpy(dtype=object)
+    else:
+        values = series.to_numpy()
+    digest.update(array_fingerprint(values).encode())
+    return digest.hexdigest()
+
+class ProfileCache:
+    """Size capped, least recently used, on-disk cache of pickled profiles."""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if path is None:
+            path = os.getenv('PROFILE_CACHE_PATH') or DEFAULT_PROFILE_CACHE_PATH
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def _entry_path(self, kind, fingerprint):
+        return os.path.join(self.path, f"{kind}-{fingerprint}.pkl")
+
+    def get(self, kind, fingerprint):
+        # return the cached profile or None
+        entry_path = self._entry_path(kind, fingerprint)
+        try:
+            with open(entry_path, "rb") as f:
+                profile = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        # the modification time records the last use for eviction
+        os.utime(entry_path)
+        self.hits += 1
+        return profile
+
+    def put(self, kind, fingerprint, profile):
+        entry_path = self._entry_path(kind, fingerprint)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(profile, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.path, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def evict(self):
+        # remove the least recently used entries until the cache fits in max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.path, name))
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+    def show_stats(self):
+        stats = self.stats()
+        print(f"profile cache {self.path}: {stats['hits']} hits, {stats['misses']} misses, "
+              f"hit rate {100 * stats['hit_rate']:.1f}%, {stats['evictions']} evictions, "
+              f"{stats['entries']} entries, {stats['bytes']}/{stats['max_bytes']} bytes")
@@ -0,0 +1,258 @@
+# Declarative data-quality rules per column, compiled once into
+# vectorized violation masks and evaluated in a single pass per
+# column, so the same rules can check every chunk of a streaming run.
+#
+# usage:
+# from quality_rules import compile_rules, check_quality, show_rule_report
+# rules = compile_rules()          # or compile_rules(my_quality_rules)
+# report = check_quality(df, rules)
+# show_rule_report(report)
+#
+# streaming, with one report merged across the chunks:
+# report = None
+# for chunk in pd.read_csv(path, dtype=str, chunksize=10000):
+#     report = check_quality(chunk, rules, report=report)
+#
+# Rule kinds, each declared as a dict with a 'rule' key:
+#   required  the value is not missing or blank
+#   type      the value can be extracted as the column type of column_types,
+#             or of the 'column_type' key
+#   regex     the stripped value fully matches 'pattern'
+#   range     the numeric value lies within 'min' and/or 'max', inclusive
+#   in_set    the stripped value is one of 'values'
+# Except for required, missing and blank values never violate a rule,
+# and range ignores values that are not numeric, which the type rule
+# reports instead. The dict and list_of_dict types are checked for
+# their bracket structure only; full parsing is left to process_columns.
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable
+import numpy as np
+import pandas as pd
+from column_types import column_types, column_type_extractors, status_categories
+
+quality_rules = {
+    "adult": [{"rule": "type"}],
+    "budget": [{"rule": "type"}, {"rule": "range", "min": 0}],
+    "id": [{"rule": "required"}, {"rule": "type"}],
+    "imdb_id": [{"rule": "regex", "pattern": r"tt\d+"}],
+    "original_language": [{"rule": "regex", "pattern": r"[a-z]{2}"}],
+    "popularity": [{"rule": "type"}, {"rule": "range", "min": 0}],
+    "release_date": [{"rule": "regex", "pattern": r"\d{4}-\d{2}-\d{2}"}, {"rule": "type"}],
+    "revenue": [{"rule": "type"}, {"rule": "range", "min": 0}],
+    "runtime": [{"rule": "type"}, {"rule": "range", "min": 0, "max": 1000}],
+    "status": [{"rule": "in_set", "values": status_categories}],
+    "title": [{"rule": "required"}],
+    "video": [{"rule": "type"}],
+    "vote_average": [{"rule": "type"}, {"rule": "range", "min": 0, "max": 10}],
+    "vote_count": [{"rule": "type"}, {"rule": "range", "min": 0}],
+}
+
+@dataclass
+class QualityRule:
+    name: str
+    column: str
+    kind: str
+    check: Callable  # ColumnView -> boolean numpy mask of the violating rows
+
+class ColumnView:
+    """Lazily derived forms of one column, shared by all the rules of the column."""
+
+    def __init__(self, series):
+        self.series = series
+
+    @cached_property
+    def is_numeric_dtype(self):
+        return pd.api.types.is_numeric_dtype(self.series.dtype) and not pd.api.types.is_bool_dtype(self.series.dtype)
+
+    @cached_property
+    def text(self):
+        # stripped string form, with '' for missing values
+        text = self.series.astype(str).str.strip()
+        return text.where(self.series.notna().to_numpy(), '')
+
+    @cached_property
+    def present(self):
+        return (self.series.notna() & (self.text != '')).to_numpy()
+
+    @cached_property
+    def numeric(self):
+        if self.is_numeric_dtype:
+            return self.series.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = pd.to_numeric(self.text.where(self.present, None), errors='coerce')
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def fullmatch_mask(view, pattern):
+    # True where a present value does not fully match pattern
+    matches = view.text.str.fullmatch(pattern).to_numpy(dtype=bool, na_value=False)
+    return view.present & ~matches
+
+def extractor_mask(view, extractor):
+    # True where extractor returns None for a present value, calling it
+    # once per distinct value instead of once per row
+    codes, uniques = pd.factorize(view.series[view.present])
+    extracted = pd.Series(uniques).map(lambda x: extractor(x) is not None).to_numpy(dtype=bool)
+    mask = np.zeros(len(view.series), dtype=bool)
+    mask[view.present] = ~extracted[codes]
+    return mask
+
+def type_violations(view, column_type):
+    if column_type == "string":
+        return np.zeros(len(view.series), dtype=bool)
+    if column_type == "float":
+        return view.present & np.isnan(view.numeric)
+    if column_type == "integer":
+        # extract_integer itself, since what it accepts (unsigned digits,
+        # a stripped value with a zero fraction) has no simple regex
+        return extractor_mask(view, column_type_extractors[column_type])
+    if column_type == "boolean":
+        if pd.api.types.is_bool_dtype(view.series.dtype):
+            return np.zeros(len(view.series), dtype=bool)
+        return view.present & ~view.text.str.lower().isin(["true", "false"]).to_numpy()
+    if column_type == "status_category":
+        return view.present & ~view.text.isin(status_categories).to_numpy()
+    if column_type == "ymd_datetime":
+        if pd.api.types.is_datetime64_any_dtype(view.series.dtype):
+            return np.zeros(len(view.series), dtype=bool)
+        text = view.text.where(view.text.str.len() == 10, None)
+        dates = pd.to_datetime(text, format="%Y-%m-%d", errors='coerce')
+        return view.present & dates.isna().to_numpy()
+    if column_type == "dict":
+        return fullmatch_mask(view, r"(?s)\{.*\}")
+    if column_type == "list_of_dict":
+        return fullmatch_mask(view, r"(?s)\[\s*\{.*\}\s*\]")
+    raise ValueError(f"no type rule for column_type:{column_type}")
+
+def range_violations(view, min_val=None, max_val=None):
+    values = view.numeric
+    violations = np.zeros(len(values), dtype=bool)
+    # comparisons with NaN are False, so non-numeric values never violate
+    with np.errstate(invalid='ignore'):
+        if min_val is not None:
+            violations |= values < min_val
+        if max_val is not None:
+            violations |= values > max_val
+    return violations
+
+def compile_rule(col, spec):
+    kind = spec.get("rule")
+    if kind == "required":
+        check = lambda view: ~view.present
+    elif kind == "type":
+        column_type = spec.get("column_type") or column_types.get(col)
+        if column_type is None:
+            raise ValueError(f"no column type found for type rule of column:{col}")
+        if column_type not in column_type_extractors:
+            raise ValueError(f"no type rule for column_type:{column_type}")
+        check = lambda view: type_violations(view, column_type)
+    elif kind == "regex":
+        pattern = spec.get("pattern")
+        if pattern is None:
+            raise ValueError(f"regex rule of column:{col} has no pattern")
+        check = lambda view: fullmatch_mask(view, pattern)
+    elif kind == "range":
+        min_val, max_val = spec.get("min"), spec.get("max")
+        if min_val is None and max_val is None:
+            raise ValueError(f"range rule of column:{col} has neither min nor max")
+        check = lambda view: range_violations(view, min_val, max_val)
+    elif kind == "in_set":
+        values = spec.get("values")
+        if values is None:
+            raise ValueError(f"in_set rule of column:{col} has no values")
+        allowed = list(values)
+        check = lambda view: view.present & ~view.text.isin(allowed).to_numpy()
+    else:
+        raise ValueError(f"unknown rule:{kind} for column:{col}")
+    name = spec.get("name") or f"{col}:{kind}"
+    return QualityRule(name=name, column=col, kind=kind, check=check)
+
+def compile_rules(config=None):
+    # the list of QualityRules of a {column: [rule spec, ...]} config,
+    # by default the quality_rules above
+    if config is None:
+        config = quality_rules
+    rules = []
+    for col, specs in config.items():
+        for spec in specs:
+            rules.append(compile_rule(col, spec))
+    names = [rule.name for rule in rules]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if len(duplicates) > 0:
+        raise ValueError(f"duplicate rule names:{duplicates}, give them a 'name'")
+    return rules
+
+class RuleReport:
+    """Violation counts and violating row ids of each rule, mergeable across chunks."""
+
+    def __init__(self, rule_names):
+        self.rule_names = list(rule_names)
+        self.rows_checked = 0
+        self.missing_columns = set()
+        self._row_ids = {name: [] for name in self.rule_names}
+
+    def add(self, name, row_ids):
+        if len(row_ids) > 0:
+            self._row_ids[name].append(np.asarray(row_ids))
+
+    def merge(self, other):
+        if other.rule_names != self.rule_names:
+            raise ValueError("cannot merge reports of different rules")
+        for name in self.rule_names:
+            self._row_ids[name].extend(other._row_ids[name])
+        self.rows_checked += other.rows_checked
+        self.missing_columns |= other.missing_columns
+        return self
+
+    def violations(self, name):
+        # the row ids violating a rule
+        parts = self._row_ids[name]
+        if len(parts) == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) > 1:
+            self._row_ids[name] = parts = [np.concatenate(parts)]
+        return parts[0]
+
+    def counts(self):
+        return pd.Series({name: len(self.violations(name)) for name in self.rule_names},
+                         dtype=np.int64, name="violations")
+
+    def violating_rows(self, names=None):
+        # sorted unique row ids that violate any of the named rules
+        names = self.rule_names if names is None else names
+        parts = [self.violations(name) for name in names]
+        parts = [part for part in parts if len(part) > 0]
+        if len(parts) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+def check_quality(df, rules=None, report=None, row_offset=None):
+    # evaluate the rules on a DataFrame or chunk and add the violations
+    # to report. Row ids are the index labels of df, which continue
+    # across the chunks of pd.read_csv, or row positions plus row_offset.
+    if rules is None:
+        rules = compile_rules()
+    if report is None:
+        report = RuleReport([rule.name for rule in rules])
+    row_ids = df.index.to_numpy() if row_offset is None else np.arange(len(df)) + row_offset
+    rules_by_column = {}
+    for rule in rules:
+        rules_by_column.setdefault(rule.column, []).append(rule)
+    for col, column_rules in rules_by_column.items():
+        if col not in df.columns:
+            report.missing_columns.add(col)
+            continue
+        view = ColumnView(df[col])
+        for rule in column_rules:
+            report.add(rule.name, row_ids[rule.check(view)])
+    report.rows_checked += len(df)
+    return report
+
+def show_rule_report(report, max_row_ids=5):
+    print(f"Quality rules checked on {report.rows_checked} rows")
+    for name, count in report.counts().items():
+        row_ids = report.violations(name)[:max_row_ids].tolist()
+        more = " ..." if count > max_row_ids else ""
+        print(f"{name:<32} {count:>8} violations {row_ids if count > 0 else ''}{more}")
+    if len(report.missing_columns) > 0:
+        print(f"Columns not checked, not in the data: {sorted(report.missing_columns)}")
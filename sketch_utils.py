@@ -0,0 +1,259 @@
+# Mergeable streaming sketches for column statistics that do not
+# fit in memory or are computed chunk by chunk or in worker processes.
+#
+# usage:
+# from sketch_utils import ColumnSketch
+# sketch = ColumnSketch('budget', numeric=True)
+# for chunk in pd.read_csv("movies.csv", dtype=str, chunksize=10000):
+#     sketch.update(chunk['budget'])
+# sketch.quantile(0.5), sketch.nunique(), sketch.value_counts(10)
+#
+# Every sketch uses constant memory per column and supports merge(),
+# so sketches built on separate partitions combine into the sketch
+# of the whole column. Error bounds:
+#   TDigest      quantile rank error of at most about
+#                2*pi*sqrt(q*(1-q))/compression, i.e. ~3% at the median
+#                and much less towards the tails for compression=200;
+#                interpolation between centroids is usually 10x better.
+#                min and max are exact.
+#   HyperLogLog  relative standard error of 1.04/sqrt(2**precision),
+#                i.e. ~0.8% for precision=14 (16 KiB of registers).
+#   MisraGries   each reported count undercounts the true count by at
+#                most total/(k+1); every value more frequent than
+#                total/(k+1) is guaranteed to be reported.
+
+import math
+import numpy as np
+import pandas as pd
+
+def hash_values(values):
+    # 64-bit hashes of the non-null values, stable across processes
+    # and runs. Numeric values are hashed as float64 so that the same
+    # number hashes alike whether it arrived as an int or a float.
+    values = pd.Series(values).dropna()
+    if len(values) == 0:
+        return np.empty(0, dtype=np.uint64)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.util.hash_array(values.to_numpy(dtype=np.float64))
+    return pd.util.hash_array(values.to_numpy(dtype=object))
+
+class TDigest:
+    """Merging t-digest of a numeric column, using the k1 scale function."""
+
+    def __init__(self, compression=200, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or 20 * compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.total += len(values)
+        self._buffer.append(values)
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+        return self
+
+    def merge(self, other):
+        other._flush()
+        self._flush()
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.total += other.total
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _flush(self):
+        if self._buffered == 0:
+            return
+        values = np.concatenate(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _compress(self, means, weights):
+        # sort all centroids and group neighbours whose left quantile
+        # falls in the same unit interval of the k1 scale function
+        # k(q) = compression/(2*pi) * asin(2q-1), which keeps centroids
+        # small near the tails and larger around the median
+        if len(means) == 0:
+            return
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+        cum_weights = np.cumsum(weights)
+        q_left = (cum_weights - weights) / cum_weights[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_left - 1)
+        groups = np.floor(k - k[0]).astype(np.intp)
+        group_weights = np.bincount(groups, weights=weights)
+        group_sums = np.bincount(groups, weights=means * weights)
+        nonempty = group_weights > 0
+        self.weights = group_weights[nonempty]
+        self.means = group_sums[nonempty] / self.weights
+
+    def _interpolation_points(self):
+        # centroid means placed at the midpoint of their cumulative weight,
+        # anchored by the exact min and max at ranks 0 and total
+        centers = np.cumsum(self.weights) - self.weights / 2
+        ranks = np.concatenate(([0.0], centers, [self.total]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        return ranks, values
+
+    def quantile(self, q):
+        self._flush()
+        if self.total == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        ranks, values = self._interpolation_points()
+        result = np.interp(np.asarray(q, dtype=np.float64) * self.total, ranks, values)
+        return result if np.ndim(q) else float(result)
+
+    def cdf(self, x):
+        self._flush()
+        if self.total == 0:
+            return np.full(np.shape(x), np.nan) if np.ndim(x) else np.nan
+        ranks, values = self._interpolation_points()
+        result = np.interp(x, values, ranks) / self.total
+        return result if np.ndim(x) else float(result)
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit value hashes."""
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision:{precision} must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        return self.update_hashes(hash_values(values))
+
+    def update_hashes(self, hashes):
+        if len(hashes) == 0:
+            return self
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # rank is the position of the leftmost 1-bit among the next 50 bits,
+        # which are exactly representable as float64 for frexp
+        rest = (hashes << p) >> np.uint64(14)
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 51, 51 - exponent).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"cannot merge precision:{other.precision} into precision:{self.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+class MisraGries:
+    """Misra-Gries summary of the k most frequent values."""
+
+    def __init__(self, k=100):
+        self.k = k
+        self.counts = pd.Series(dtype=np.float64)
+        self.total = 0
+
+    def update(self, values):
+        value_counts = pd.Series(values).value_counts(dropna=True)
+        self.total += int(value_counts.sum())
+        return self._add_counts(value_counts.astype(np.float64))
+
+    def merge(self, other):
+        self.total += other.total
+        return self._add_counts(other.counts)
+
+    def _add_counts(self, counts):
+        # add the counts and, when more than k values remain, subtract
+        # the (k+1)-th largest count from all of them and drop the rest
+        combined = self.counts.add(counts, fill_value=0) if len(self.counts) > 0 else counts
+        if len(combined) > self.k:
+            combined = combined.sort_values(ascending=False, kind='stable')
+            combined = combined.iloc[:self.k] - combined.iloc[self.k]
+            combined = combined[combined > 0]
+        self.counts = combined
+        return self
+
+    def top(self, n=None):
+        top = self.counts.sort_values(ascending=False, kind='stable').astype(np.int64)
+        return top if n is None else top.iloc[:n]
+
+    @property
+    def error_bound(self):
+        return self.total / (self.k + 1)
+
+class ColumnSketch:
+    """Constant memory summary of one column: counts, quantiles, distinct count and top values."""
+
+    def __init__(self, column, numeric, compression=200, precision=14, top_k=100):
+        self.column = column
+        self.numeric = numeric
+        self.count = 0
+        self.missing_count = 0
+        self.digest = TDigest(compression) if numeric else None
+        self.distinct = HyperLogLog(precision)
+        self.top_values = MisraGries(top_k)
+
+    def update(self, series):
+        # values that fail numeric conversion in a numeric column
+        # are counted as missing, like compute_column_stats does
+        series = pd.Series(series)
+        if self.numeric:
+            series = pd.to_numeric(series, errors='coerce')
+        valid = series.dropna()
+        self.count += len(valid)
+        self.missing_count += len(series) - len(valid)
+        if self.digest is not None:
+            self.digest.update(valid.to_numpy(dtype=np.float64))
+        self.distinct.update(valid)
+        self.top_values.update(valid)
+        return self
+
+    def merge(self, other):
+        if other.column != self.column or other.numeric != self.numeric:
+            raise ValueError(f"cannot merge sketch of column:{other.column} into column:{self.column}")
+        self.count += other.count
+        self.missing_count += other.missing_count
+        if self.digest is not None:
+            self.digest.merge(other.digest)
+        self.distinct.merge(other.distinct)
+        self.top_values.merge(other.top_values)
+        return self
+
+    def quantile(self, q):
+        if self.digest is None:
+            raise ValueError(f"column:{self.column} is not numeric")
+        return self.digest.quantile(q)
+
+    def nunique(self):
+        return self.distinct.count()
+
+    def value_counts(self, n=None):
+        return self.top_values.top(n)
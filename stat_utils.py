@@ -1,17 +1,14 @@
 import pandas as pd
 import numpy as np
-import re
-from scipy import stats
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from column_types import get_column_type, is_numeric_column, get_column_dtype
-from tabulate import tabulate
-from decorators import char_decoder
-from string_utils import format_value, Justify
+from dataclasses import dataclass, replace
+from column_types import get_column_type, is_numeric_column, get_column_dtype, column_types
+from string_utils import format_value, format_values, Justify
+from sketch_utils import ColumnSketch
+from column_catalog import ColumnCatalog
+from grid_renderer import write_grid
+from profile_cache import column_fingerprint
 # from string_utils import print_wrapped_list
 
-TABULATE_CHAR_UNCODED = ' '
-TABULETE_CHAR_ENCODED = 'ψ'
-
 def show_dataframe_stats(df, title=""):
     print(f"{'='*80}")
     if title and len(title.strip()) > 0:
@@ -35,20 +32,24 @@ def show_dataframe_stats(df, title=""):
     
     print("----after drop_duplicate rows")
     show_df_grid(df, N=3, val_size=8, col_width=10)
+
+    # profile all columns once for the column tables below
+    catalog = ColumnCatalog(df)
         
     # drop columns with more than 85% NaN values
     threshold_perc = 80
-    droppable_columns = get_droppable_columns(df, threshold_perc)
+    droppable_columns = get_droppable_columns(df, threshold_perc, catalog=catalog)
     print(f"droppable_columns: {droppable_columns}\n")
     
     print(f"----before dropping {len(droppable_columns)} columns with NaNs > {threshold_perc}%")
-    show_df_columns_table(df)
+    show_df_columns_table(df, catalog=catalog)
     
     # Drop the specified columns
     df = df.drop(columns=droppable_columns)
+    catalog.rebind(df)
     
     print(f"-----after dropping {len(droppable_columns)} columns with NaNs > {threshold_perc}%")
-    show_df_columns_table(df)
+    show_df_columns_table(df, catalog=catalog)
 
 def show_duplicates(df):
     
@@ -69,119 +70,77 @@ def show_duplicates(df):
     print("\nkeeping only rows with rank=1 and dropping rank column")
     print(df)
 
-# uses  
-# TABULATE_CHAR_ENCODED in place of 
-# TABULATE_CHAR_UNCODED to work with
-# tabulate_plus which is decorated with @char_decoder
+# return a center justified index value; write_grid keeps the padding
 def format_index_value(index_value, idx_size, idx_width):
-    # debug break when index_value is an int
-    if isinstance(index_value, int):
-        pass
-    # return a center justified index value with 'char_encoded' for padding
-    index_value = format_value(str(index_value).strip(), idx_size, idx_width, justify=Justify.CENTER)
-    pattern = r'^(\s*)(\w*)(\s*)$'
-    encoder = tabulate_encoder
-    def replace_whitespace(match):
-        replaced = encoder(match.group(1)) + match.group(2) + encoder(match.group(3))
-        return replaced
-    index_value = re.sub(pattern, replace_whitespace, str(index_value))
-    return index_value
-
-def tabulate_encoder(input_char):
-    return input_char.replace(TABULATE_CHAR_UNCODED, TABULETE_CHAR_ENCODED)
-
-@char_decoder(TABULETE_CHAR_ENCODED, TABULATE_CHAR_UNCODED)
-def tabulate_plus(*args, **kwargs):
-    return tabulate(*args, **kwargs)
+    return format_value(str(index_value).strip(), idx_size, idx_width, justify=Justify.CENTER)
+
+# Slice the first and last N rows of the first and last N columns
+# by position, before anything is formatted, so that the cost of a
+# preview depends only on N and not on the size of the DataFrame
+def get_df_grid_preview(df, N):
+    ncols = len(df.columns)
+    col_positions = list(range(min(N, ncols))) + list(range(max(ncols - N, 0), ncols))
+    # rows are sliced before columns, taking a list of columns
+    # first would copy those columns in full
+    head_df = df.iloc[:N].iloc[:, col_positions]
+    tail_df = df.iloc[len(df) - min(N, len(df)):].iloc[:, col_positions]
+    return head_df, tail_df
 
 # Show the first and last N rows and columns of the DataFrame
 # format columns, indexes, and values using val_size and col_width.
-# format index values using idx_size and idx_width
-def show_df_grid(df, N=5, val_size=8, col_width=10, show_index=True):
-
-    # Make a copy of the DataFrame to avoid modifying the original
-    dff = df.copy()
-    
-    # rename the column names to fit within the specified column width
-    cols = dff.columns.tolist()
-    for col in dff.columns:
-        dff.rename(columns={col: format_value(col, val_size, col_width, justify=Justify.CENTER)}, inplace=True)
-    cols = dff.columns.tolist()
-
-    # Select the first N columns and the last N columns
-    first_cols = list(dff.columns[:N])
-    last_cols = list(dff.columns[-N:])
-    # print(f"DEBUG: first {N} cols: {first_cols}")
-    # print(f"DEBUG: last {N} cols: {last_cols}")
-
-    # Create a column of dots
-    dots_col = pd.Series(['...' for _ in range(len(dff))], name='dots_col')
-    dots_col.index = dff.index  # Ensure the index matches
-
-    # Insert the dots column in the middle of the selected columns
-    # print_wrapped_list(title=f"DEBUG: {len(dff.columns.tolist())} cols before concat dots:",list=dff.columns.to_list())
-    dff = pd.concat([dff[first_cols], dots_col, dff[last_cols]], axis=1)
-    # print_wrapped_list(title=f"DEBUG: {len(dff.columns.tolist())} cols after concat dots:",list=dff.columns.to_list())
-
-    # if this little check is not included, the dots_col 
-    # is not found and KeyError will be raised
-    _ = True if 'dots_col' in dff.columns else False
-    dff.columns.values[N] = '...'
-        
-    # Update the cols list to include the dots column
-    cols = dff.columns.tolist()
-    # print_wrapped_list(title=f"DEBUG: {len(dff.columns.tolist())} cols after set dots:", list=dff.columns.to_list())
-
-    # Define column alignment (center alignment for all columns)
-    # plus one if the showIndex is true
-    # format the index values if applicable
-    num_cols = len(cols)
-    if show_index:
-        if isinstance(dff.index, (pd.MultiIndex)):
-            raise ValueError("MultiIndex not supported")
-        # index values are allowed to take up the entire col_width
-        dff.index = dff.index.map(lambda x: format_index_value(x, col_width, col_width))
-        num_cols += 1 # add a column for the index
-    
-    # Set the column alignment to center for all columns (including the index)
-    colalign = ['center'] * num_cols
-    
-    # get the selected cols from the first N+1 rows
-    top_half_df = dff[cols].head(N+1)
-    
-    # set row N to have dots in all values
-    top_half_df.iloc[N] = '...'
-    
-    # set the index of row N to be a string with col_width dashes
-    top_half_df.index = top_half_df.index.map(lambda x: '-'*col_width if x == top_half_df.index[N] else x)
-    
-    # format values only (index values for the entire df are already formatted)
-    top_half_df = top_half_df.map(lambda x: format_value(x, val_size, col_width))
-
-    # tabulate top_half_df with column names in header and a dotted row at the bottom
-    top_half_table = tabulate_plus(top_half_df, headers='keys', tablefmt='grid', showindex=show_index, colalign=colalign)
-    print(top_half_table)
-
-    # get the selected cols of the lasat N rows
-    btm_half_df = dff[cols].tail(N)
-    
-    # format values only (index values for the entire df are already formatted)
-    btm_half_df = btm_half_df.map(lambda x: format_value(x, val_size, col_width))
-
-    # tabulate btm_half_df with column names in header 
-    btm_half_pre_table = tabulate_plus(btm_half_df, headers='keys', tablefmt='grid', showindex=show_index, colalign=colalign)
-
-    # Remove the header row and the top and bottom divider lines
-    btm_half_lines = btm_half_pre_table.split('\n')
-    btm_half_table = '\n'.join(btm_half_lines[3:]) 
-    print(btm_half_table)
-
-    
-def find_df_duplicate_rows(df):
+# index values may take up the entire col_width.
+# Only the cells of the preview are ever formatted.
+# out is the stream to write the grid to, stdout by default.
+def show_df_grid(df, N=5, val_size=8, col_width=10, show_index=True, out=None):
+    if show_index and isinstance(df.index, (pd.MultiIndex)):
+        raise ValueError("MultiIndex not supported")
+
+    head_df, tail_df = get_df_grid_preview(df, N)
+
+    # the dots column goes between the first N and the last N columns
+    dots_pos = min(N, len(df.columns))
+    dots_value = format_value('...', val_size, col_width)
+    headers = [format_value(col, val_size, col_width, justify=Justify.CENTER) for col in head_df.columns]
+    headers.insert(dots_pos, '...')
+
+    def format_rows(part_df):
+        # formatted a column at a time, by position for duplicate column names
+        columns = [format_values(part_df.iloc[:, j], val_size, col_width) for j in range(len(part_df.columns))]
+        columns.insert(dots_pos, [dots_value] * len(part_df))
+        return [list(row) for row in zip(*columns)]
+
+    def format_index(part_df):
+        return [format_index_value(x, col_width, col_width) for x in part_df.index]
+
+    # the first N rows, a dotted row whose index is col_width dashes,
+    # and the last N rows, written straight to out. A named index
+    # keeps its name as the header of the index column.
+    index_name = '' if df.index.name is None else str(df.index.name)
+    index_headers = [index_name] if show_index else []
+    ellipsis_row = (['-' * col_width] if show_index else []) + [dots_value] * len(headers)
+    blocks = []
+    for part_df in [head_df, tail_df]:
+        rows = format_rows(part_df)
+        if show_index:
+            rows = [[index] + row for index, row in zip(format_index(part_df), rows)]
+        blocks.append(rows)
+    write_grid(index_headers + headers, blocks, out=out, colalign='center', ellipsis_row=ellipsis_row,
+               keep_padding=[0] if show_index else [])
+
+# key_index is an optional key_index.KeyIndex of the id column of df.
+# Only the rows with a duplicated or unparsable id can be duplicates,
+# so the search is limited to those rows instead of the whole frame.
+def find_df_duplicate_rows(df, key_index=None):
     
     if 'id' not in df.columns or 'title' not in df.columns:
         raise ValueError("DataFrame must contain 'id' and 'title' columns")
 
+    if key_index is not None:
+        if key_index.nrows != len(df):
+            raise ValueError(f"key index of {key_index.nrows} rows does not match DataFrame of {len(df)} rows")
+        candidates = np.union1d(key_index.duplicate_positions(), key_index.invalid_positions)
+        df = df.iloc[candidates]
+
     # Find duplicate rows and keep the id and title columns
     dups_mask = df.duplicated(subset=['id', 'title'], keep=False)
 
@@ -201,7 +160,12 @@ def find_df_duplicate_rows(df):
     
     return dup_rows_df
 
-def show_df_columns_table(df):
+# catalog is an optional ColumnCatalog of df, built when not given
+# using the optional profile_cache.ProfileCache
+def show_df_columns_table(df, catalog=None, cache=None):
+    if catalog is None:
+        catalog = ColumnCatalog(df, cache=cache)
+
     # Define column widths
     col_width = 24
     dtype_width = 10
@@ -218,8 +182,9 @@ def show_df_columns_table(df):
         #  natural_dtype = str(df[col].dtype)
         dtype = get_column_dtype(col)
         col_type = get_column_type(col)
-        nunique_cnt = df[col].nunique(dropna=True)
-        nan_percent = get_column_nan_percent(df, col)
+        profile = catalog.get(col)
+        nunique_cnt = profile.distinct_count
+        nan_percent = profile.null_percent
         print(f"{col:<{col_width}} {dtype:<{dtype_width}} {col_type:<{col_type_width}} {nunique_cnt:>{unique_cnt_width}}  {nan_percent:>{nan_perc_width}} ")
     print('-' * total_width)
     print()
@@ -230,89 +195,472 @@ def get_dtype_spec(df):
         dtype_spec[col] = get_column_dtype(col)
     return dtype_spec
 
-def get_column_nan_percent(df, col):
+def get_column_nan_percent(df, col, catalog=None):
+    if catalog is not None:
+        return catalog.get(col).null_percent
     nrows = len(df)
     nan_percent = round(100 * df[col].isna().sum()/nrows)
     return nan_percent
 
-def get_droppable_columns(df, threshold_perc=75):
-    droppable_columns = []
-    for col in df.columns:
-        nan_percent = get_column_nan_percent(df,col)
-        if nan_percent >= threshold_perc:
-            droppable_columns.append(col)
-    return droppable_columns
-
-def show_column_stats(df, col, title="", max_output_lines=10):
+def get_droppable_columns(df, threshold_perc=75, catalog=None, cache=None):
+    if catalog is None:
+        catalog = ColumnCatalog(df, cache=cache)
+    return catalog.columns_with_null_percent_at_least(threshold_perc)
+
+# Summary statistics of one numeric column, computed by
+# compute_column_stats and only formatted by print_column_stats
+@dataclass
+class ColumnStats:
+    column: str
+    count: int
+    missing_count: int
+    unique_count: int
+    mean: float
+    median: float
+    mode: float
+    std_dev: float
+    variance: float
+    skew: float
+    kurtosis: float
+    min_val: float
+    max_val: float
+    q1: float
+    q3: float
+    max_abs_zscore: float
+    zscore_outlier_count: int
+
+    @property
+    def range_val(self):
+        return self.max_val - self.min_val
+
+    @property
+    def iqr(self):
+        return self.q3 - self.q1
+
+def is_numeric_stats_column(df, col):
+    # known movie columns use their declared column type,
+    # any other column (e.g. scaled copies) uses its dtype
+    if col in column_types:
+        return is_numeric_column(col)
+    return pd.api.types.is_numeric_dtype(df[col])
+
+def get_numeric_values(df, cols):
+    # return a 2-D float64 array with one column per col,
+    # with missing and non-numeric values as NaN
+    if all(pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]) for col in cols):
+        return df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    values = np.empty((len(df), len(cols)), dtype=np.float64)
+    for j, col in enumerate(cols):
+        values[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+def compute_column_moments(values):
+    # count, mean, min, max and the central moment sums m2, m3, m4
+    # of every column of a 2-D float array, ignoring NaNs.
+    # The central moments are summed over deviations from the
+    # mean rather than from raw power sums to stay accurate for
+    # large valued columns like budget and revenue.
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, values, 0.0).sum(axis=0) / count
+    dev = np.where(valid, values - mean, 0.0)
+    dev2 = dev * dev
+    return {
+        'count': count,
+        'mean': mean,
+        'min': np.where(valid, values, np.inf).min(axis=0, initial=np.inf),
+        'max': np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf),
+        'm2': dev2.sum(axis=0),
+        'm3': (dev2 * dev).sum(axis=0),
+        'm4': (dev2 * dev2).sum(axis=0),
+    }
+
+def merge_column_moments(a, b):
+    # the moments of the rows of both a and b from the moments of each,
+    # by the pairwise update of the central moment sums (Chan, Pebay)
+    na, nb = a['count'].astype(np.float64), b['count'].astype(np.float64)
+    n = na + nb
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where((na > 0) & (nb > 0), b['mean'] - a['mean'], 0.0)
+        mean = np.where(nb > 0, np.where(na > 0, a['mean'] + delta * nb / n, b['mean']), a['mean'])
+        m2a, m2b = np.where(na > 0, a['m2'], 0.0), np.where(nb > 0, b['m2'], 0.0)
+        m3a, m3b = np.where(na > 0, a['m3'], 0.0), np.where(nb > 0, b['m3'], 0.0)
+        m4a, m4b = np.where(na > 0, a['m4'], 0.0), np.where(nb > 0, b['m4'], 0.0)
+        n = np.where(n > 0, n, 1.0)
+        m2 = m2a + m2b + delta**2 * na * nb / n
+        m3 = (m3a + m3b + delta**3 * na * nb * (na - nb) / n**2
+              + 3 * delta * (na * m2b - nb * m2a) / n)
+        m4 = (m4a + m4b + delta**4 * na * nb * (na * na - na * nb + nb * nb) / n**3
+              + 6 * delta**2 * (na * na * m2b + nb * nb * m2a) / n**2
+              + 4 * delta * (na * m3b - nb * m3a) / n)
+    return {
+        'count': a['count'] + b['count'],
+        'mean': mean,
+        'min': np.minimum(a['min'], b['min']),
+        'max': np.maximum(a['max'], b['max']),
+        'm2': m2,
+        'm3': m3,
+        'm4': m4,
+    }
+
+def moments_to_stats(moments):
+    # derive variance, standard deviation, skewness and excess kurtosis
+    # using the same bias corrections as pandas Series.var/std/skew/kurt
+    n = moments['count'].astype(np.float64)
+    m2, m3, m4 = moments['m2'], moments['m3'], moments['m4']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = np.where(n > 1, m2 / (n - 1), np.nan)
+        skew = np.where(n > 2, n * np.sqrt(n - 1) / (n - 2) * m3 / m2**1.5, np.nan)
+        skew = np.where((n > 2) & (m2 == 0), 0.0, skew)
+        kurtosis = np.where(
+            n > 3,
+            n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2**2) - 3 * (n - 1)**2 / ((n - 2) * (n - 3)),
+            np.nan)
+        kurtosis = np.where((n > 3) & (m2 == 0), 0.0, kurtosis)
+    return {
+        'variance': variance,
+        'std_dev': np.sqrt(variance),
+        'skew': skew,
+        'kurtosis': kurtosis,
+    }
+
+def sorted_quantiles(sorted_values, count, q):
+    # linearly interpolated quantile q of every column of a
+    # column-wise sorted 2-D array whose NaNs are sorted last
+    pos = q * np.maximum(count - 1, 0)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.ceil(pos).astype(np.intp)
+    lo_vals = np.take_along_axis(sorted_values, lo[None, :], axis=0)[0]
+    hi_vals = np.take_along_axis(sorted_values, hi[None, :], axis=0)[0]
+    return np.where(count > 0, lo_vals + (hi_vals - lo_vals) * (pos - lo), np.nan)
+
+def compute_column_stats(df, cols=None, zscore_threshold=3, cache=None):
+    # compute the ColumnStats of every numeric column in a single
+    # vectorized sweep over a 2-D float array: one moments kernel
+    # for count/mean/min/max/var/skew/kurtosis and one column-wise
+    # sort that yields median, quartiles, mode and unique count.
+    # cache is an optional profile_cache.ProfileCache, unchanged
+    # columns found in it are not computed again.
+    # returns a dict of ColumnStats keyed by column name
+    if cols is None:
+        cols = [col for col in df.columns if is_numeric_stats_column(df, col)]
+    cols = list(cols)
+    if len(cols) == 0:
+        return {}
+    if cache is not None:
+        kind = f"column_stats_z{zscore_threshold}"
+        fingerprints = {col: column_fingerprint(df[col]) for col in cols}
+        cached_stats = {}
+        for col in cols:
+            column_stats = cache.get(kind, fingerprints[col])
+            if column_stats is not None:
+                cached_stats[col] = replace(column_stats, column=col)
+        missing_cols = [col for col in cols if col not in cached_stats]
+        computed_stats = compute_column_stats(df, missing_cols, zscore_threshold=zscore_threshold)
+        for col, column_stats in computed_stats.items():
+            cache.put(kind, fingerprints[col], column_stats)
+        return {col: cached_stats.get(col) or computed_stats[col] for col in cols}
+    values = get_numeric_values(df, cols)
+    nrows = values.shape[0]
+
+    moments = compute_column_moments(values)
+    derived = moments_to_stats(moments)
+    count = moments['count']
+    mean = moments['mean']
+
+    # z-scores use the population standard deviation like scipy.stats.zscore,
+    # so their extremes and the count beyond the threshold need no dense array
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pop_std = np.sqrt(moments['m2'] / count)
+        max_abs_zscore = np.maximum(moments['max'] - mean, mean - moments['min']) / pop_std
+        zscore_outlier_count = (np.abs(values - mean) > zscore_threshold * pop_std).sum(axis=0)
+
+    # NaNs sort last, so the first count rows of each column are its valid values
+    sorted_values = np.sort(values, axis=0)
+    median = sorted_quantiles(sorted_values, count, 0.5)
+    q1 = sorted_quantiles(sorted_values, count, 0.25)
+    q3 = sorted_quantiles(sorted_values, count, 0.75)
+    in_range = np.arange(1, nrows)[:, None] < count[None, :]
+    changes = (sorted_values[1:] != sorted_values[:-1]) & in_range
+    unique_count = changes.sum(axis=0) + (count > 0)
+
+    column_stats = {}
+    for j, col in enumerate(cols):
+        # mode is the smallest of the most frequent values, like Series.mode().iloc[0]
+        mode = np.nan
+        if count[j] > 0:
+            run_starts = np.concatenate(([0], np.flatnonzero(changes[:, j]) + 1))
+            run_lengths = np.diff(np.append(run_starts, count[j]))
+            mode = sorted_values[run_starts[np.argmax(run_lengths)], j]
+        column_stats[col] = ColumnStats(
+            column=col,
+            count=int(count[j]),
+            missing_count=int(nrows - count[j]),
+            unique_count=int(unique_count[j]),
+            mean=float(mean[j]),
+            median=float(median[j]),
+            mode=float(mode),
+            std_dev=float(derived['std_dev'][j]),
+            variance=float(derived['variance'][j]),
+            skew=float(derived['skew'][j]),
+            kurtosis=float(derived['kurtosis'][j]),
+            min_val=float(moments['min'][j]) if count[j] > 0 else np.nan,
+            max_val=float(moments['max'][j]) if count[j] > 0 else np.nan,
+            q1=float(q1[j]),
+            q3=float(q3[j]),
+            max_abs_zscore=float(max_abs_zscore[j]),
+            zscore_outlier_count=int(zscore_outlier_count[j]))
+    return column_stats
+
+def print_column_stats(column_stats, zscore_threshold=3):
+    print("Stats:")
+    print(f"  Mean: {column_stats.mean}")
+    print(f"  Median: {column_stats.median}")
+    print(f"  Mode: {column_stats.mode}")
+    print(f"  Standard Deviation: {column_stats.std_dev}")
+    print(f"  Skewness: {column_stats.skew}")
+    print(f"  Kurtosis: {column_stats.kurtosis}")
+    print(f"  Max |Z-score|: {column_stats.max_abs_zscore}")
+    print(f"  Z-score outliers (|z| > {zscore_threshold}): {column_stats.zscore_outlier_count}")
+    print(f"  Minimum: {column_stats.min_val}")
+    print(f"  Maximum: {column_stats.max_val}")
+    print(f"  Range: {column_stats.range_val}")
+    print(f"  Variance: {column_stats.variance}")
+    print(f"  Interquartile Range (IQR): {column_stats.iqr}")
+    print(f"  Missing Values Count: {column_stats.missing_count}")
+    print(f"  Unique Values Count: {column_stats.unique_count}")
+
+# column_stats may be passed in when it was already computed
+# for many columns at once by compute_column_stats, and catalog
+# is an optional ColumnCatalog of df that the value counts and
+# the stats are read from.
+# cache is an optional profile_cache.ProfileCache for the stats and
+# outliers an optional outlier_utils.OutlierIndex of df whose counts
+# are shown instead of per-row scores
+def show_column_stats(df, col, title="", max_output_lines=10, column_stats=None, catalog=None, cache=None,
+                      outliers=None):
     print(f"{'-'*80}")
+    if title and len(title.strip()) > 0:
+        print(title)
     dtype = df[col].dtype
-    col_type = get_column_type(col)
+    col_type = get_column_type(col) if col in column_types else str(dtype)
     print(f"Column:[{col}] dtype:[{dtype}] column_type[{col_type}]")
-    top_col_value_counts = df[col].value_counts()[:max_output_lines]
+    if catalog is not None:
+        top_col_value_counts = catalog.value_counts(col, max_output_lines)
+    else:
+        top_col_value_counts = df[col].value_counts()[:max_output_lines]
     print(top_col_value_counts)
 
-    if is_numeric_column(col):
-        mean = df[col].mean()
-        median = df[col].median()
-        mode = df[col].mode().iloc[0]
-        std_dev = df[col].std()
-        skew = df[col].skew()
-        kurtosis = df[col].kurtosis()
-        z_scores = np.abs(stats.zscore(df[col]))
-        min_val = df[col].min()
-        max_val = df[col].max()
-        range_val = max_val - min_val
-        variance = df[col].var()
-        iqr = df[col].quantile(0.75) - df[col].quantile(0.25)
-        missing_count = df[col].isnan().sum()
-        unique_count = df[col].nunique()
-
+    if is_numeric_stats_column(df, col):
+        if column_stats is None and catalog is not None:
+            column_stats = catalog.get_stats(col)
+        elif column_stats is None:
+            column_stats = compute_column_stats(df, [col], cache=cache)[col]
+        print_column_stats(column_stats)
+        if outliers is not None and col in outliers.columns:
+            counts = outliers.counts().loc[col]
+            print(f"  Outlier Counts: {', '.join(f'{method}: {count}' for method, count in counts.items())}")
+    elif catalog is not None:
+        profile = catalog.get(col)
         print("Stats:")
-        print(f"  Mean: {mean}")
+        print(f"  Missing Values Count: {profile.null_count}")
+        print(f"  Unique Values Count: {profile.distinct_count}")
+
+# Build mergeable ColumnSketches of the given columns from a DataFrame
+# or from an iterable of DataFrame chunks, e.g. pd.read_csv(..., chunksize=N).
+# Sketches built on separate partitions or in worker processes
+# combine with merge_column_sketches. Returns a dict keyed by column.
+def sketch_column_stats(chunks, cols=None, compression=200, precision=14, top_k=100):
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    sketches = {}
+    for chunk in chunks:
+        if len(sketches) == 0:
+            if cols is None:
+                cols = list(chunk.columns)
+            for col in cols:
+                sketches[col] = ColumnSketch(col, is_numeric_stats_column(chunk, col),
+                                             compression=compression, precision=precision, top_k=top_k)
+        for col in cols:
+            sketches[col].update(chunk[col])
+    return sketches
+
+def merge_column_sketches(sketches, other_sketches):
+    for col, sketch in other_sketches.items():
+        if col in sketches:
+            sketches[col].merge(sketch)
+        else:
+            sketches[col] = sketch
+    return sketches
+
+# the streaming counterpart of show_column_stats, showing
+# approximate statistics from a ColumnSketch
+def show_column_sketch(sketch, title="", max_output_lines=10):
+    print(f"{'-'*80}")
+    if title and len(title.strip()) > 0:
+        print(title)
+    print(f"Column:[{sketch.column}] (approximate)")
+    print(sketch.value_counts(max_output_lines))
+    print("Stats:")
+    if sketch.digest is not None:
+        q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
         print(f"  Median: {median}")
-        print(f"  Mode: {mode}")
-        print(f"  Standard Deviation: {std_dev}")
-        print(f"  Skewness: {skew}")
-        print(f"  Kurtosis: {kurtosis}")
-        print(f"  Z-scores: {z_scores}")
-        print(f"  Minimum: {min_val}")
-        print(f"  Maximum: {max_val}")
-        print(f"  Range: {range_val}")
-        print(f"  Variance: {variance}")
-        print(f"  Interquartile Range (IQR): {iqr}")
-        print(f"  Missing Values Count: {missing_count}")
-        print(f"  Unique Values Count: {unique_count}")
-
-# Compare the effect of different scalers on the data of the given numeric column in the DataFrame
-def compare_numeric_scalers(df, col, threshold=3):
-    # Step 1: Apply StandardScaler
-    standard_scaler = StandardScaler()
-    df_standard_scaled = pd.DataFrame(
-        standard_scaler.fit_transform(df), columns=df.columns)
-
-    # Step 2: Apply Clamp or Drop Outliers
-    df_standard_scaled_clamped = df_standard_scaled.clip(
-        lower=-threshold, upper=threshold)
-    df_standard_scaled_dropped = df_standard_scaled[(
-        df_standard_scaled.abs() <= 3).all(axis=1)]
-
-    # Step 3: Apply MinMaxScaler
-    min_max_scaler = MinMaxScaler()
-    df_min_max_scaled_clamped = pd.DataFrame(min_max_scaler.fit_transform(
-        df_standard_scaled_clamped), columns=df.columns)
-    df_min_max_scaled_dropped = pd.DataFrame(min_max_scaler.fit_transform(
-        df_standard_scaled_dropped), columns=df.columns)
-
-    # Print results
-    show_column_stats(df, col + ' (Original):')
-    show_column_stats(df_standard_scaled_clamped, col +
-                      " (Standard Scaled Data (Clamped):")
-    show_column_stats(df_min_max_scaled_clamped, col +
-                      " (MinMax Scaled Data (Clamped):")
-    show_column_stats(df_standard_scaled_dropped, col +
-                      " (Standard Scaled Data (Dropped):")
-    show_column_stats(df_min_max_scaled_dropped, col +
-                      " (MinMax Scaled Data (Dropped):")
+        print(f"  Minimum: {sketch.digest.min}")
+        print(f"  Maximum: {sketch.digest.max}")
+        print(f"  Interquartile Range (IQR): {q3 - q1}")
+    print(f"  Values Count: {sketch.count}")
+    print(f"  Missing Values Count: {sketch.missing_count}")
+    print(f"  Unique Values Count: ~{sketch.nunique()} (±{100 * sketch.distinct.relative_error:.1f}%)")
+
+def show_streaming_column_stats(chunks, cols=None, max_output_lines=10):
+    sketches = sketch_column_stats(chunks, cols=cols)
+    for sketch in sketches.values():
+        show_column_sketch(sketch, max_output_lines=max_output_lines)
+    return sketches
+
+# Moment summary of one column under one scaler variant
+@dataclass
+class ScalerSummary:
+    variant: str
+    count: int
+    mean: float
+    std_dev: float
+    min_val: float
+    max_val: float
+    skew: float
+    kurtosis: float
+
+SCALER_CHUNK_ROWS = 65536
+
+SCALER_VARIANTS = [
+    'original',
+    'standard',
+    'standard_clamped',
+    'minmax_clamped',
+    'standard_dropped',
+    'minmax_dropped',
+]
+
+def moments_to_summaries(variant, cols, moments):
+    derived = moments_to_stats(moments)
+    summaries = {}
+    for j, col in enumerate(cols):
+        has_values = moments['count'][j] > 0
+        summaries[col] = ScalerSummary(
+            variant=variant,
+            count=int(moments['count'][j]),
+            mean=float(moments['mean'][j]),
+            std_dev=float(derived['std_dev'][j]),
+            min_val=float(moments['min'][j]) if has_values else np.nan,
+            max_val=float(moments['max'][j]) if has_values else np.nan,
+            skew=float(derived['skew'][j]),
+            kurtosis=float(derived['kurtosis'][j]))
+    return summaries
+
+def affine_summary(summary, variant, scale, shift):
+    # the summary of scale * x + shift derived from the summary of x:
+    # skew flips sign with a negative scale, kurtosis is unchanged
+    lo, hi = summary.min_val * scale + shift, summary.max_val * scale + shift
+    return ScalerSummary(
+        variant=variant,
+        count=summary.count,
+        mean=summary.mean * scale + shift,
+        std_dev=summary.std_dev * abs(scale),
+        min_val=min(lo, hi),
+        max_val=max(lo, hi),
+        skew=summary.skew if scale >= 0 else -summary.skew,
+        kurtosis=summary.kurtosis)
+
+def minmax_affine(summary, variant):
+    # MinMaxScaler maps [min, max] onto [0, 1], a zero range keeps a scale of 1
+    value_range = summary.max_val - summary.min_val
+    scale = 1.0 / value_range if value_range > 0 else 1.0
+    return affine_summary(summary, variant, scale, -summary.min_val * scale)
+
+# Compare the effect of different scalers on the numeric columns of
+# the DataFrame: StandardScaler, then clamping or dropping rows with
+# any |z| > threshold, then MinMaxScaler.
+# The moments shared by all variants are computed once; the standard
+# and min-max variants are derived from them analytically and the
+# clamped and dropped variants need one extra pass over the z-scores,
+# chunk_rows rows at a time, so no full size array of z-scores is
+# allocated unless materialize is set.
+# Shows the summaries of col (or of all columns when col is None) and
+# returns a dict of {variant: {column: ScalerSummary}}, or with
+# materialize=True a dict of {variant: scaled DataFrame}.
+def compare_numeric_scalers(df, col=None, threshold=3, materialize=False, chunk_rows=SCALER_CHUNK_ROWS):
+    cols = [c for c in df.columns if is_numeric_stats_column(df, c)]
+    values = get_numeric_values(df, cols)
+
+    # shared moments; StandardScaler uses the population std
+    # and keeps a scale of 1 for constant columns
+    moments = compute_column_moments(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pop_std = np.sqrt(moments['m2'] / moments['count'])
+    scale = np.where(pop_std > 0, pop_std, 1.0)
+    original = moments_to_summaries('original', cols, moments)
+
+    # the one extra pass, a chunk of rows at a time: the moments of the
+    # clamped z-scores, and of the z-scores of the rows kept after
+    # dropping those with any |z| > threshold
+    k = len(cols)
+    clamped_moments = dropped_moments = compute_column_moments(np.empty((0, k)))
+    keep_rows = np.empty(len(values), dtype=bool)
+    for start in range(0, len(values), chunk_rows):
+        z_scores = (values[start:start + chunk_rows] - moments['mean']) / scale
+        with np.errstate(invalid='ignore'):
+            keep = ~(np.abs(z_scores) > threshold).any(axis=1)
+        keep_rows[start:start + chunk_rows] = keep
+        clamped_moments = merge_column_moments(clamped_moments,
+                                               compute_column_moments(np.clip(z_scores, -threshold, threshold)))
+        dropped_moments = merge_column_moments(dropped_moments, compute_column_moments(z_scores[keep]))
+    clamped_summaries = moments_to_summaries('standard_clamped', cols, clamped_moments)
+    dropped_summaries = moments_to_summaries('standard_dropped', cols, dropped_moments)
+
+    summaries = {
+        'original': original,
+        'standard': {c: affine_summary(original[c], 'standard', 1.0 / scale[j], -moments['mean'][j] / scale[j])
+                     for j, c in enumerate(cols)},
+        'standard_clamped': clamped_summaries,
+        'minmax_clamped': {c: minmax_affine(s, 'minmax_clamped') for c, s in clamped_summaries.items()},
+        'standard_dropped': dropped_summaries,
+        'minmax_dropped': {c: minmax_affine(s, 'minmax_dropped') for c, s in dropped_summaries.items()},
+    }
+
+    print(f"rows dropped with any |z| > {threshold}: {int((~keep_rows).sum())} of {len(keep_rows)}")
+    for c in ([col] if col is not None else cols):
+        show_scaler_comparison(summaries, c)
+
+    if not materialize:
+        return summaries
+
+    # full scaled copies, only when asked for
+    def minmax(variant_values, summaries_of_variant):
+        lo = np.array([summaries_of_variant[c].min_val for c in cols])
+        hi = np.array([summaries_of_variant[c].max_val for c in cols])
+        return (variant_values - lo) / np.where(hi - lo > 0, hi - lo, 1.0)
+
+    z_scores = (values - moments['mean']) / scale
+    clamped = np.clip(z_scores, -threshold, threshold)
+    kept = z_scores[keep_rows]
+    return {
+        'original': df[cols],
+        'standard': pd.DataFrame(z_scores, columns=cols, index=df.index),
+        'standard_clamped': pd.DataFrame(clamped, columns=cols, index=df.index),
+        'minmax_clamped': pd.DataFrame(minmax(clamped, clamped_summaries), columns=cols, index=df.index),
+        'standard_dropped': pd.DataFrame(kept, columns=cols, index=df.index[keep_rows]),
+        'minmax_dropped': pd.DataFrame(minmax(kept, dropped_summaries), columns=cols, index=df.index[keep_rows]),
+    }
+
+def show_scaler_comparison(summaries, col):
+    print(f"{'-'*80}")
+    print(f"Column:[{col}] scaler comparison")
+    print(f"{'Variant':<18} {'Count':>8} {'Mean':>11} {'Std':>11} {'Min':>11} {'Max':>11} {'Skew':>8} {'Kurt':>8}")
+    for variant in SCALER_VARIANTS:
+        s = summaries[variant][col]
+        print(f"{variant:<18} {s.count:>8} {s.mean:>11.4g} {s.std_dev:>11.4g} {s.min_val:>11.4g} "
+              f"{s.max_val:>11.4g} {s.skew:>8.3f} {s.kurtosis:>8.3f}")
 
 if __name__ == '__main__':
     df = pd.read_csv("movies.csv")
@@ -1,5 +1,7 @@
 import json
 from decimal import Decimal
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import math
 from enum import Enum
@@ -153,3 +155,155 @@ def format_value(value, val_size, fill_width, justify=None):
             value = json_str
         return format_string(value, val_size, fill_width, justify=(justify or Justify.RIGHT))
 
+
+# Column-level format_value.
+#
+# usage:
+# from string_utils import format_values
+# cells = format_values(df['budget'], val_size=8, fill_width=10)
+#
+# format_values(values, ...) returns the same strings as
+# [format_value(x, ...) for x in pd.Series(values).tolist()]
+# but picks the formatting branch once per dtype: numeric columns are
+# factorized so each distinct value is formatted once, their engineering
+# notation is computed with numpy log10/exponent math, and truncation and
+# justification are pandas string ops over the whole column. The few
+# values whose rounding numpy cannot reproduce exactly, and the cells of
+# mixed object columns, go through format_value with an lru cache.
+
+ENGINEERING_TIE_TOLERANCE = 1e-6
+FORMAT_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_cached_value(value_type, value, val_size, fill_width, justify):
+    # value_type is part of the key so that 1, 1.0 and True stay apart
+    return format_value(value, val_size, fill_width, justify=justify)
+
+def format_object_value(value, val_size, fill_width, justify=None):
+    try:
+        return format_cached_value(type(value), value, val_size, fill_width, justify)
+    except TypeError:
+        # unhashable lists and dicts
+        return format_value(value, val_size, fill_width, justify=justify)
+
+def fit_strings(strings, val_size, fill_width, justify, text=True):
+    # format_string over an array of str with numpy string ops: blank,
+    # truncate with an ellipsis and justify to fill_width. Formatted
+    # numbers (text=False) are never blank and have no line breaks.
+    strings = np.asarray(strings, dtype=str)
+    if len(strings) == 0:
+        return np.empty(0, dtype=object)
+    blank = np.zeros(len(strings), dtype=bool)
+    if text:
+        blank = np.char.str_len(np.char.strip(strings)) == 0
+        strings = np.char.replace(np.char.replace(strings, '\n', ' '), '\t', ' ')
+    long = np.char.str_len(strings) > val_size
+    if long.any():
+        # casting to a narrower unicode width truncates
+        heads = strings.astype(f"U{val_size - 1}") if val_size > 1 else np.full(len(strings), '')
+        strings = np.where(long, np.char.add(heads, SpecialChars.ELIPSIS_CHAR.value), strings)
+    if justify == Justify.LEFT:
+        strings = np.char.ljust(strings, fill_width)
+    elif justify == Justify.RIGHT:
+        strings = np.char.rjust(strings, fill_width)
+    else:
+        strings = np.char.center(strings, fill_width)
+    if blank.any():
+        strings = np.where(blank, ' ' * fill_width, strings)
+    return strings.astype(object)
+
+def format_engineering_values(values):
+    # format_engineering_value of an array of finite non-zero numbers,
+    # and a mask of the values where the float math might round
+    # differently from Decimal, which are left for the scalar function
+    values = np.asarray(values, dtype=np.float64)
+    magnitudes = np.abs(values)
+    exponents = np.floor(np.log10(magnitudes)).astype(np.int64)
+    # log10 can be off by one next to a power of ten
+    exponents += magnitudes >= 10.0 ** (exponents + 1)
+    exponents -= magnitudes < 10.0 ** exponents
+    exponents_adjusted = exponents - exponents % 3
+    mantissas = values / 10.0 ** exponents_adjusted
+    scaled = np.abs(mantissas) * 1000
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < ENGINEERING_TIE_TOLERANCE
+    near_power = np.abs(magnitudes / 10.0 ** exponents - 1) < ENGINEERING_TIE_TOLERANCE
+    # the mantissa to 3 decimals with integer math, rounding ties are excluded
+    thousandths = np.rint(scaled).astype(np.int64)
+    signs = np.where(mantissas < 0, '-', '')
+    integer_parts = (thousandths // 1000).astype(str)
+    decimal_parts = np.char.zfill((thousandths % 1000).astype(str), 3)
+    formatted = np.char.add(np.char.add(signs, integer_parts), np.char.add('.', decimal_parts))
+    formatted = np.char.add(np.char.add(formatted, 'e'), exponents_adjusted.astype(str))
+    # an exponent of 0 returns the full Decimal mantissa
+    return formatted, ties | near_power | (exponents == 0)
+
+def format_numbers(values, val_size, fill_width, justify=None):
+    # format_value of an int64 or float64 array. Each distinct value is
+    # formatted once; floats are factorized by bit pattern to keep -0.0.
+    is_float = values.dtype.kind == 'f'
+    codes, uniques = pd.factorize(values.view(np.int64) if is_float else values)
+    uniques = np.asarray(uniques)
+    if is_float:
+        uniques = uniques.view(np.float64)
+    magnitudes = np.abs(uniques.astype(np.float64))
+    # numbers in [10^val_size, 10^15) print in fixed notation with more
+    # than val_size digits, only the others need their str to tell
+    surely_long = (magnitudes >= 10.0 ** val_size) & (magnitudes < 1e15)
+    natural = uniques[~surely_long].astype(str)
+    long = surely_long.copy()
+    long[~surely_long] = np.char.str_len(natural) > val_size
+    # wide enough to tell a truncated engineering value is still long
+    strings = np.empty(len(uniques), dtype=f"U{max(natural.dtype.itemsize // 4, val_size + 1, 16)}")
+    strings[~surely_long] = natural
+    long = np.flatnonzero(long)
+    if len(long) > 0:
+        long_values = uniques[long]
+        exact = np.isfinite(long_values) & (long_values != 0)
+        if not is_float:
+            # beyond 2^53 an int is not exact as a float
+            exact &= np.abs(long_values) < 2 ** 53
+        engineering = np.empty(len(long), dtype=strings.dtype)
+        fallback = ~exact
+        if exact.any():
+            engineering[exact], inexact = format_engineering_values(long_values[exact])
+            fallback[np.flatnonzero(exact)[inexact]] = True
+        for i in np.flatnonzero(fallback):
+            engineering[i] = format_engineering_value(long_values[i].item())
+        strings[long] = engineering
+    return fit_strings(strings, val_size, fill_width, justify or Justify.RIGHT, text=False)[codes]
+
+def format_strings(strings, val_size, fill_width, justify=None):
+    # format_value of an array of str. Numeric strings are parsed as
+    # ints by format_value and are formatted one by one.
+    strings = np.asarray(strings, dtype=str)
+    formatted = fit_strings(strings, val_size, fill_width, justify or Justify.LEFT)
+    for i in np.flatnonzero(np.char.isnumeric(strings)):
+        formatted[i] = format_object_value(str(strings[i]), val_size, fill_width, justify)
+    return formatted
+
+def format_values(values, val_size, fill_width, justify=None):
+    # format_value of every value of a Series or array, as an object array
+    series = pd.Series(values)
+    dtype = series.dtype
+    if dtype.kind == 'b':
+        # two distinct values
+        return np.where(series.to_numpy(), format_value(True, val_size, fill_width, justify),
+                        format_value(False, val_size, fill_width, justify)).astype(object)
+    if dtype.kind in 'iu' and isinstance(dtype, np.dtype) and dtype != np.uint64:
+        return format_numbers(series.to_numpy(dtype=np.int64), val_size, fill_width, justify)
+    if dtype.kind == 'f' and isinstance(dtype, np.dtype):
+        # float32 values are formatted as the python floats tolist returns
+        return format_numbers(series.to_numpy(dtype=np.float64), val_size, fill_width, justify)
+    items = series.tolist()
+    formatted = np.empty(len(items), dtype=object)
+    if dtype == object:
+        is_str = np.fromiter((isinstance(x, str) for x in items), dtype=bool, count=len(items))
+        if is_str.any():
+            positions = np.flatnonzero(is_str)
+            formatted[positions] = format_strings([items[i] for i in positions], val_size, fill_width, justify)
+        others = np.flatnonzero(~is_str)
+    else:
+        others = range(len(items))
+    for i in others:
+        formatted[i] = format_object_value(items[i], val_size, fill_width, justify)
+    return formatted
@@ -0,0 +1,68 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from arrow_utils import (to_arrow_columns, contains_id, contains_name, list_lengths, list_names,
+                         explode_list_column, write_parquet, read_parquet)
+
+class TestArrowUtils(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': [862, 8844, 15602, 31357],
+            'genres': [
+                [{'id': 16, 'name': 'Animation'}, {'id': 35, 'name': 'Comedy'}],
+                None,
+                [],
+                "[{'id': 35, 'name': 'Comedy'}, {'id': 18, 'name': 'Drama'}]",
+            ],
+            'spoken_languages': [
+                [{'iso_639_1': 'en', 'name': 'English'}],
+                [{'iso_639_1': 'fr', 'name': 'Français'}, {'iso_639_1': 'en', 'name': 'English'}],
+                None,
+                [],
+            ],
+        })
+        self.arrow_df = to_arrow_columns(self.df)
+
+    def test_types(self):
+        genres_type = self.arrow_df['genres'].dtype.pyarrow_dtype
+        self.assertEqual(str(genres_type), "list<item: struct<id: int32, name: dictionary<values=string, indices=int32, ordered=0>>>")
+        languages_type = self.arrow_df['spoken_languages'].dtype.pyarrow_dtype
+        self.assertTrue(pa.types.is_dictionary(languages_type.value_type.field('id').type), "Error iso codes should be dictionary ids")
+        self.assertEqual(list(self.arrow_df['id']), list(self.df['id']), "Error other columns should be unchanged")
+
+    def test_accessors(self):
+        genres = self.arrow_df['genres']
+        self.assertEqual(list(list_lengths(genres)), [2, 0, 0, 2])
+        self.assertEqual(list(contains_id(genres, 35)), [True, False, False, True])
+        self.assertEqual(list(contains_id(genres, 99)), [False] * 4)
+        self.assertEqual(list(contains_name(genres, 'Drama')), [False, False, False, True])
+        self.assertEqual(list(contains_id(self.arrow_df['spoken_languages'], 'fr')), [False, True, False, False])
+        self.assertEqual(list_names(genres).to_pylist(), [['Animation', 'Comedy'], None, [], ['Comedy', 'Drama']])
+
+        # sliced columns keep their own offsets
+        tail = genres.iloc[2:]
+        self.assertEqual(list(list_lengths(tail)), [0, 2])
+        self.assertEqual(list(contains_id(tail, 16)), [False, False])
+        self.assertEqual(list(contains_id(tail, 18)), [False, True])
+
+    def test_explode(self):
+        exploded = explode_list_column(self.arrow_df['spoken_languages'])
+        self.assertEqual(list(exploded['row']), [0, 1, 1])
+        self.assertEqual(list(exploded['id']), ['en', 'fr', 'en'])
+        self.assertEqual(list(exploded['name']), ['English', 'Français', 'English'])
+
+    def test_parquet_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            parquet_path = os.path.join(tmpdir, "movies.parquet")
+            write_parquet(self.arrow_df, parquet_path)
+            df = read_parquet(parquet_path)
+        self.assertIsInstance(df['genres'].dtype, pd.ArrowDtype)
+        self.assertEqual(len(df), 4)
+        self.assertEqual(list(contains_id(df['genres'], 35)), [True, False, False, True])
+        self.assertEqual(list_names(df['spoken_languages']).to_pylist(), [['English'], ['Français', 'English'], None, []])
+        np.testing.assert_array_equal(df['id'].to_numpy(), self.df['id'].to_numpy())
@@ -0,0 +1,75 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+from column_catalog import ColumnCatalog
+from stat_utils import get_droppable_columns, get_column_nan_percent
+
+class TestColumnCatalog(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': ['1', '2', '3', '4', '4'],
+            'homepage': [None, None, None, None, 'http://x'],
+            'tagline': [None, None, None, None, None],
+            'popularity': [1.5, np.nan, 2.5, 2.5, 3.0],
+            'genres': [[{'id': 1}], [{'id': 1}], None, [{'id': 2}], None],
+        })
+
+    def test_profiles(self):
+        catalog = ColumnCatalog(self.df)
+        self.assertEqual(catalog.profile_count, 5, "Error every column should be profiled once")
+        popularity = catalog.get('popularity')
+        self.assertEqual(popularity.null_count, 1)
+        self.assertEqual(popularity.distinct_count, 3)
+        self.assertEqual(popularity.column_type, 'float')
+        self.assertEqual(list(popularity.null_mask), [False, True, False, False, False])
+        self.assertEqual(catalog.get('id').distinct_count, 4)
+        self.assertEqual(catalog.get('genres').distinct_count, 2, "Error unhashable values should be counted")
+        self.assertGreater(catalog.memory_bytes(), 0)
+
+    def test_dropping_helpers(self):
+        catalog = ColumnCatalog(self.df)
+        self.assertEqual(catalog.blank_columns(), ['tagline'])
+        self.assertEqual(catalog.columns_with_null_fraction_above(0.5), ['homepage', 'tagline'])
+        self.assertEqual(get_droppable_columns(self.df, 80, catalog=catalog), ['homepage', 'tagline'])
+        self.assertEqual(get_droppable_columns(self.df, 80), ['homepage', 'tagline'])
+        self.assertEqual(get_column_nan_percent(self.df, 'genres', catalog=catalog), get_column_nan_percent(self.df, 'genres'))
+
+    def test_invalidation(self):
+        catalog = ColumnCatalog(self.df)
+        df = self.df.drop(columns=['tagline'])
+        catalog.rebind(df)
+        self.assertEqual(catalog.profile_count, 5, "Error dropping a column should keep the other profiles")
+
+        df['popularity'] = df['popularity'].fillna(0.0)
+        catalog.invalidate('popularity')
+        self.assertEqual(catalog.get('popularity').null_count, 0)
+        self.assertEqual(catalog.profile_count, 6, "Error only the changed column should be profiled again")
+
+        catalog.rebind(df.iloc[:3])
+        self.assertEqual(catalog.profile_count, 10, "Error dropping rows should profile every column again")
+        self.assertEqual(catalog.get('id').nrows, 3)
+
+    def test_rebind_profiles_changed_columns(self):
+        catalog = ColumnCatalog(self.df)
+        # values rewritten on the same index, as process_columns does
+        df = self.df.copy()
+        df['id'] = ['1', None, '3', None, '4']
+        catalog.rebind(df)
+        self.assertEqual(catalog.profile_count, 6, "Error only the rewritten column should be profiled again")
+        self.assertEqual(catalog.get('id').null_count, 2)
+        self.assertEqual(list(catalog.get('id').null_mask), [False, True, False, True, False])
+
+    def test_value_counts_and_stats(self):
+        catalog = ColumnCatalog(self.df)
+        self.assertEqual(catalog.value_counts('popularity', 1).to_dict(), {2.5: 2})
+        pd.testing.assert_series_equal(catalog.value_counts('id', 20), self.df['id'].value_counts())
+        self.assertEqual(catalog.value_counts('genres').iloc[0], 2, "Error unhashable values should be counted")
+        stats = catalog.get_stats('popularity')
+        self.assertIs(catalog.get_stats('popularity'), stats, "Error the stats should be computed once")
+        self.assertAlmostEqual(stats.mean, self.df['popularity'].mean())
+        self.df['popularity'] = self.df['popularity'] * 2
+        catalog.rebind(self.df)
+        self.assertAlmostEqual(catalog.get_stats('popularity').mean, self.df['popularity'].mean(),
+                               msg="Error the stats of a changed column should be computed again")
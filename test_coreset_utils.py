@@ -0,0 +1,37 @@
+from unittest import TestCase
+import numpy as np
+
+from coreset_utils import assign_nearest_center, stratified_subsample, weighted_coreset
+
+class TestCoresetUtils(TestCase):
+
+    def setUp(self):
+        self.values = np.random.default_rng(0).lognormal(0, 1, 100000)
+
+    def test_stratified_subsample(self):
+        indexes = stratified_subsample(self.values, 1000)
+        self.assertEqual(len(indexes), 1000)
+        self.assertEqual(len(np.unique(indexes)), 1000, "Error the subsample should be drawn without replacement")
+        # each decile of the values holds a tenth of the subsample
+        deciles = np.searchsorted(np.quantile(self.values, np.linspace(0.1, 0.9, 9)), self.values[indexes])
+        np.testing.assert_array_equal(np.bincount(deciles, minlength=10), [100] * 10)
+        np.testing.assert_array_equal(stratified_subsample(self.values[:50], 1000), np.arange(50))
+
+    def test_weighted_coreset(self):
+        coreset = weighted_coreset(self.values, 500)
+        self.assertLessEqual(len(coreset.points), 500)
+        self.assertEqual(coreset.weights.sum(), len(self.values))
+        self.assertAlmostEqual((coreset.points * coreset.weights).sum() / len(self.values), self.values.mean(),
+                               msg="Error the weighted bin means should keep the mean")
+        np.testing.assert_array_less(np.abs(coreset.points[coreset.inverse] - self.values), coreset.width)
+        # bins no wider than max_width, or None when they do not fit
+        capped = weighted_coreset(self.values, 5000, width=0.001, max_width=0.004)
+        self.assertLessEqual(capped.width, 0.004)
+        self.assertLessEqual(len(capped.points), 5000)
+        self.assertIsNone(weighted_coreset(self.values, 500, width=0.001, max_width=0.004),
+                          "Error the coreset should not widen past max_width")
+
+    def test_assign_nearest_center(self):
+        centers = np.array([5.0, -5.0, 0.0])
+        labels = assign_nearest_center(np.array([-7.0, -2.6, -2.4, 4.0, 100.0]), centers)
+        np.testing.assert_array_equal(labels, [1, 1, 2, 0, 0])
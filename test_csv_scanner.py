@@ -0,0 +1,109 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from csv_scanner import read_csv_scanned, frame_records
+
+HEADER = "adult,budget,id,overview,popularity,release_date,title\n"
+GOOD_ROWS = [
+    'False,30000000,862,"Led by Woody, toys live happily.",21.94,1995-10-30,Toy Story\n',
+    'False,65000000,8844,"When siblings Judy and Peter\ndiscover a game",17.01,1995-12-15,Jumanji\n',
+    'False,0,15602,A family wedding,11.71,1995-12-22,Grumpier Old Men\n',
+]
+
+class TestCsvScanner(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmpdir.name, "movies.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(HEADER + "".join(rows))
+        return path
+
+    def test_good_rows_match_read_csv(self):
+        path = self.write_csv(GOOD_ROWS)
+        df, report = read_csv_scanned(path, dtype=str)
+        pd.testing.assert_frame_equal(df, pd.read_csv(path, dtype=str))
+        self.assertEqual(report.records, 3, "Error a quoted line break should not split a record")
+        self.assertEqual(len(report.realigned) + len(report.quarantined), 0)
+        self.assertEqual(report.bytes_scanned, os.path.getsize(path))
+
+    def test_record_offsets(self):
+        data = (HEADER + "".join(GOOD_ROWS)).encode("utf-8")
+        starts, ends, counts, _, _ = frame_records(np.frombuffer(data, dtype=np.uint8), at_eof=True)
+        self.assertEqual(list(counts), [7, 7, 7, 7], "Error quoted commas and line breaks should not split fields")
+        self.assertEqual(list(starts[1:]), list(ends[:-1]))
+        self.assertEqual(ends[-1], len(data))
+        self.assertTrue(data[starts[2]:ends[2]].startswith(b'False,65000000,8844,"When siblings'))
+
+        # a last record without a line break, read in blocks smaller than a record
+        path = self.write_csv(GOOD_ROWS + ['False,0,1,x,1.0,1995-12-22,No Line Break'])
+        df, report = read_csv_scanned(path, dtype=str, block_size=16)
+        pd.testing.assert_frame_equal(df, pd.read_csv(path, dtype=str))
+        self.assertEqual(report.records, 4)
+
+    def test_split_row_is_rejoined(self):
+        # an unquoted overview broken by a bare line break shifts the
+        # tail of the row into the adult, budget and id columns
+        split_row = 'False,0,19730,Rune Balot goes to a casino\n - Written by Ørnås,0.06,1997-08-20,Midnight Man\n'
+        path = self.write_csv(GOOD_ROWS[:1] + [split_row] + GOOD_ROWS[1:])
+        self.assertEqual(pd.read_csv(path, dtype=str)['adult'].iloc[2], ' - Written by Ørnås', "Error the fixture should shift fields")
+        df, report = read_csv_scanned(path, dtype=str)
+        self.assertEqual(len(df), 4)
+        self.assertEqual(len(report.realigned), 1)
+        self.assertEqual(report.realigned[0].line, 3)
+        row = df.iloc[1]
+        self.assertEqual(row['id'], '19730')
+        self.assertEqual(row['overview'], 'Rune Balot goes to a casino\n - Written by Ørnås')
+        self.assertEqual(row['release_date'], '1997-08-20')
+        self.assertEqual(list(df['id']), ['862', '19730', '8844', '15602'])
+
+    def test_extra_fields_are_merged(self):
+        row = 'False,0,15603,A wedding, a funeral,11.71,1995-12-22,Four Weddings\n'
+        df, report = read_csv_scanned(self.write_csv([row] + GOOD_ROWS), dtype=str)
+        self.assertEqual(len(report.realigned), 1)
+        self.assertEqual(df['overview'].iloc[0], 'A wedding, a funeral')
+        self.assertEqual(df['popularity'].iloc[0], '11.71')
+
+    def test_unfixable_rows_are_quarantined(self):
+        bad_rows = [
+            'yes,0,1,an overview,1.0,1995-12-22,Bad Adult\n',
+            'False,0,2\n',
+        ]
+        path = self.write_csv(bad_rows[:1] + GOOD_ROWS + bad_rows[1:])
+        quarantine_path = os.path.join(self.tmpdir.name, "quarantined.csv")
+        df, report = read_csv_scanned(path, quarantine_path=quarantine_path, dtype=str)
+        self.assertEqual(list(df['id']), ['862', '8844', '15602'])
+        self.assertEqual([issue.line for issue in report.quarantined], [2, 7])
+        quarantined = pd.read_csv(quarantine_path, dtype=str)
+        self.assertEqual(list(quarantined['reason']), ['type signature mismatch', '3 fields, expected 7'])
+        with open(path, "rb") as f:
+            data = f.read()
+        for offset, record in zip(quarantined['offset'].astype(int), quarantined['record']):
+            self.assertEqual(data[offset:offset + len(record.encode("utf-8"))].decode("utf-8"), record)
+
+    def test_quote_inside_unquoted_field(self):
+        # the quote opens no quoted section to pandas or csv.reader, and
+        # the quoted commas and line breaks of the later rows still count
+        rows = [
+            'False,0,1,A 12" single,1.0,1995-12-22,One\n',
+            'False,0,2,A 7",1.0,1995-12-22,Two\n',
+            'False,0,3,"Said ""hi"", once" twice,1.0,1995-12-22,Three\n',
+            'False,0,4,"",1.0,1995-12-22,"""Four"""\n',
+        ]
+        rows = GOOD_ROWS[:1] + rows + GOOD_ROWS[1:] + GOOD_ROWS[:1]
+        path = self.write_csv(rows)
+        for block_size in [16, 64, 1024]:
+            df, report = read_csv_scanned(path, dtype=str, block_size=block_size)
+            pd.testing.assert_frame_equal(df, pd.read_csv(path, dtype=str))
+            self.assertEqual(report.records, 8, f"Error records with block_size:{block_size}")
+            # pandas reads the rows the same, so there is nothing to report
+            self.assertEqual(len(report.realigned) + len(report.quarantined), 0)
+        self.assertEqual(list(df['overview'].iloc[1:4]), ['A 12" single', 'A 7"', 'Said "hi", once twice'])
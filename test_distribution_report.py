@@ -0,0 +1,44 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from distribution_report import DistributionReport, compute_distribution
+
+class TestDistributionReport(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'budget': rng.lognormal(10, 1, 1000),
+            'runtime': np.where(rng.random(1000) < 0.1, np.nan, rng.normal(100, 20, 1000)),
+        })
+
+    def test_compute_distribution(self):
+        distribution = compute_distribution(self.df['runtime'], 'runtime', bins=20)
+        self.assertEqual(distribution.count, self.df['runtime'].notna().sum())
+        self.assertAlmostEqual(distribution.stddev, self.df['runtime'].std())
+        self.assertAlmostEqual((distribution.density * np.diff(distribution.edges)).sum(), 1.0)
+        empty = compute_distribution(pd.Series(['x', None]), 'title')
+        self.assertEqual(empty.count, 0, "Error non-numeric values should be ignored")
+
+    def test_write_report(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            report = DistributionReport(output_dir)
+            for col in self.df.columns:
+                report.add(self.df, col, stage='before scaling')
+                self.df[col] = (self.df[col] - self.df[col].mean()) / self.df[col].std()
+                report.add(self.df, col, stage='after scaling')
+            index_path = report.write(max_workers=2)
+            files = sorted(os.listdir(output_dir))
+            self.assertEqual(len(files), 9, "Error expected an html and a png per figure and the index page")
+            with open(index_path) as f:
+                index = f.read()
+            for name in files:
+                if name != 'index.html':
+                    self.assertIn(f'"{name}"', index, f"Error index should link {name}")
+            self.assertLess(index.index('before scaling'), index.index('after scaling'))
+
+        with self.assertRaises(ValueError):
+            DistributionReport(output_dir, formats=['svg'])
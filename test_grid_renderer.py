@@ -0,0 +1,94 @@
+from unittest import TestCase
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+
+from grid_renderer import GridRenderer, get_column_type, get_column_widths, write_grid
+from stat_utils import show_df_grid
+
+class TestGridRenderer(TestCase):
+
+    def test_write_grid(self):
+        out = io.StringIO()
+        widths = write_grid(['id', 'title'], [[['862', ' Toy ']], [['31357', 'Father']]], out=out,
+                            colalign=['right', 'left'])
+        self.assertEqual(widths, [5, 7])
+        expected = '\n'.join([
+            '+-------+---------+',
+            '|    id | title   |',
+            '+=======+=========+',
+            '|   862 | Toy     |',
+            '+-------+---------+',
+            '|   ... | ...     |',
+            '+-------+---------+',
+            '| 31357 | Father  |',
+            '+-------+---------+',
+            '',
+        ])
+        self.assertEqual(out.getvalue(), expected, "Error cells should be stripped and aligned like tabulate")
+
+    def test_numbers_like_tabulate(self):
+        out = io.StringIO()
+        write_grid(['n', 'x'], [[[' 1 ', '2.50']], [[' 2 ', ' 17.925e0 '], ['10', 'nan']]], out=out,
+                   keep_padding=[])
+        lines = out.getvalue().splitlines()
+        # the head block is typed with the ellipsis row, so it is kept as text
+        self.assertEqual(lines[3], '|  1  |  2.50  |')
+        self.assertEqual(lines[7], '|  2  | 17.925 |')
+        self.assertEqual(lines[9], '| 10  |  nan   |')
+        self.assertEqual(get_column_type(['True', '1']), 'int')
+        self.assertEqual(get_column_type(['1', '2.5e3']), 'float')
+        self.assertEqual(get_column_type(['1', ' nan ']), 'str')
+        out = io.StringIO()
+        write_grid(['', 'x'], [[['  a   ', 'b']]], out=out, keep_padding=[0])
+        self.assertEqual(out.getvalue().splitlines()[3], '|   a    |  b  |', "Error kept padding should be aligned as given")
+
+    def test_widths_and_errors(self):
+        self.assertEqual(get_column_widths(['a', 'bb', ''], [[['xyz', '', '1']], []]), [3, 4, 1])
+        renderer = GridRenderer([3, 2], out=io.StringIO())
+        with self.assertRaises(ValueError):
+            renderer.write_row(['only one'])
+        with self.assertRaises(ValueError):
+            GridRenderer([3, 2], colalign=['left'])
+
+    def test_show_df_grid_to_stream(self):
+        df = pd.DataFrame({col: [f"{col}{i}" for i in range(20)] for col in 'ABCDEFGH'})
+        out = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            show_df_grid(df, N=2, val_size=8, col_width=10, out=out)
+        self.assertEqual(stdout.getvalue(), '', "Error the grid should only be written to out")
+        lines = out.getvalue().splitlines()
+        # header, 2 head rows, the ellipsis row and 2 tail rows, each under a rule
+        self.assertEqual(len(lines), 13)
+        self.assertEqual(len(set(len(line) for line in lines)), 1, "Error all lines should have the same width")
+        self.assertIn('H19', lines[-2])
+
+    def test_show_df_grid_matches_tabulate(self):
+        # the output of the tabulate based show_df_grid for the same frame
+        df = pd.DataFrame({'adult': ['False', 'True', 'False', 'True', 'False', 'True'],
+                           'budget': [4204000.0, 0.0, 11767000.0, 21729000.0, 800130.0, 60000000.0],
+                           'title': ['Toy Story', 'Jumanji', 'Heat', 'Tom and Huck', 'Sudden Death', 'GoldenEye'],
+                           'popularity': [21.946943, 17.015539, 6.677277, 2.561161, 5.23158, 14.686036],
+                           'runtime': [81.0, 104.0, np.nan, 106.0, 130.0, 15.0],
+                           'vote_count': [5415, 2413, 1886, 45, 174, 1194]},
+                          index=pd.Index([10, 11, 12, 13, 14, 15], name='movie_idx'))
+        out = io.StringIO()
+        show_df_grid(df, N=2, val_size=8, col_width=10, out=out)
+        expected = '\n'.join([
+            '+-------------+--------------+--------------+-------+--------------+--------------+',
+            '|  movie_idx  |    adult     |    budget    |  ...  |   runtime    |   vote_co…   |',
+            '+=============+==============+==============+=======+==============+==============+',
+            '|     10      |    False     |   4.204e6    |  ...  |     81.0     |     5415     |',
+            '+-------------+--------------+--------------+-------+--------------+--------------+',
+            '|     11      |     True     |     0.0      |  ...  |    104.0     |     2413     |',
+            '+-------------+--------------+--------------+-------+--------------+--------------+',
+            '| ----------  |     ...      |     ...      |  ...  |     ...      |     ...      |',
+            '+-------------+--------------+--------------+-------+--------------+--------------+',
+            '|     14      |    False     |    800130    |  ...  |     130      |     174      |',
+            '+-------------+--------------+--------------+-------+--------------+--------------+',
+            '|     15      |     True     |    6e+07     |  ...  |      15      |     1194     |',
+            '+-------------+--------------+--------------+-------+--------------+--------------+',
+            '',
+        ])
+        self.assertEqual(out.getvalue(), expected)
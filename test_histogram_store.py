@@ -0,0 +1,83 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from histogram_store import BinnedHistogram, HistogramStore, compare_stores, histogram_drift
+from profile_cache import array_fingerprint
+
+class TestHistogramStore(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.values = rng.lognormal(10, 1, 20000)
+
+    def test_merged_chunks_equal_one_pass(self):
+        whole = BinnedHistogram(max_bins=256).update(self.values)
+        merged = BinnedHistogram(max_bins=256)
+        for chunk in np.array_split(self.values, 7):
+            merged.merge(BinnedHistogram(max_bins=256).update(chunk))
+        self.assertEqual(merged.exponent, whole.exponent)
+        np.testing.assert_array_equal(merged.bins, whole.bins)
+        np.testing.assert_array_equal(merged.counts, whole.counts)
+        self.assertLessEqual(whole.num_bins, 256, "Error the span of bins should be kept within max_bins")
+
+    def test_rebin(self):
+        histogram = BinnedHistogram().update(np.append(self.values, [np.nan, np.inf]))
+        self.assertEqual(histogram.missing, 2)
+        coarse = histogram.rebin(20)
+        self.assertLessEqual(coarse.num_bins, 20)
+        self.assertEqual(coarse.total, len(self.values), "Error rebinning should keep every count")
+        density, edges = coarse.density()
+        self.assertAlmostEqual((density * np.diff(edges)).sum(), 1.0)
+        self.assertLessEqual(edges[0], self.values.min())
+        self.assertGreater(edges[-1], self.values.max())
+        for num_bins in [20, 35, 50]:
+            closest = histogram.rebin_closest(num_bins)
+            counts = [histogram.rebin(num_bins).num_bins, closest.num_bins]
+            finer = histogram.copy().coarsen(histogram.rebin(num_bins).exponent - 1 - histogram.exponent)
+            self.assertEqual(abs(closest.num_bins - num_bins), min(abs(n - num_bins) for n in counts + [finer.num_bins]),
+                             f"Error {num_bins} bins should be approached from both sides")
+            self.assertEqual(closest.total, len(self.values))
+
+    def test_store_eviction(self):
+        store = HistogramStore(max_histograms=2)
+        first = store.get(self.values)
+        store.get(self.values + 1)
+        self.assertIs(store.get(self.values), first, "Error a recently used histogram should be kept")
+        store.get(self.values + 2)
+        self.assertEqual(len(store.names), 2)
+        self.assertNotIn(array_fingerprint(self.values + 1), store, "Error the least recently used should be evicted")
+        self.assertIn(array_fingerprint(self.values), store)
+
+    def test_store_get_save_and_load(self):
+        df = pd.DataFrame({'budget': self.values})
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = os.path.join(output_dir, "histograms.npz")
+            store = HistogramStore(path)
+            histogram = store.get(df['budget'], name='budget')
+            self.assertIs(store.get(df['budget'], name='budget'), histogram, "Error unchanged values should not be re-binned")
+            store.update('runtime', [90.0, 100.0, None])
+            store.save()
+            loaded = HistogramStore(path)
+            self.assertEqual(loaded.names, ['budget', 'runtime'])
+            np.testing.assert_array_equal(loaded['budget'].counts, histogram.counts)
+            self.assertEqual(loaded['runtime'].missing, 1)
+            self.assertIs(loaded.get(df['budget'], name='budget'), loaded['budget'])
+            df.loc[0, 'budget'] = 1.0
+            self.assertIsNot(loaded.get(df['budget'], name='budget'), histogram)
+
+    def test_drift(self):
+        reference = BinnedHistogram().update(self.values)
+        self.assertEqual(histogram_drift(reference, reference).psi, 0.0)
+        shifted = BinnedHistogram().update(self.values * 1.5)
+        drift = histogram_drift(reference, shifted)
+        self.assertGreater(drift.psi, 0.1)
+        self.assertGreater(drift.ks, 0.1)
+        reference_store, current_store = HistogramStore(), HistogramStore()
+        reference_store.update('budget', self.values)
+        reference_store.update('revenue', self.values)
+        current_store.update('budget', self.values)
+        current_store.update('revenue', self.values * 1.5)
+        self.assertEqual(list(compare_stores(reference_store, current_store).index), ['revenue', 'budget'])
@@ -0,0 +1,52 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from key_index import KeyIndex, build_key_indexes, save_key_indexes, load_key_indexes
+from stat_utils import find_df_duplicate_rows
+
+class TestKeyIndex(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': ['862', '8844', '15602', '862', '1997-08-20', None, '8844', '31357'],
+            'imdb_id': ['tt0114709', 'tt0113497', 'tt0113228', 'tt0114709', None, 'tt0114885', ' tt0113497 ', 'tt0113041'],
+            'title': ['Toy Story', 'Jumanji', 'Grumpier Old Men', 'Toy Story', 'Midnight Man', 'Waiting', 'Jumanji 2', 'Father'],
+        })
+        self.indexes = build_key_indexes(self.df)
+
+    def test_lookups(self):
+        ids = self.indexes['id']
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(list(ids.invalid_positions), [4, 5], "Error unparsable and missing ids should be recorded")
+        self.assertEqual(list(ids.lookup(862)), [0, 3])
+        self.assertEqual(list(ids.lookup(1)), [])
+        self.assertEqual(list(ids.lookup_many([8844, 1, 31357, 862])), [1, 6, 7, 0, 3])
+        self.assertEqual(list(ids.contains([15602, 2])), [True, False])
+
+        imdb_ids = self.indexes['imdb_id']
+        self.assertEqual(list(imdb_ids.lookup('tt0113497')), [1, 6], "Error keys should be stripped")
+        self.assertEqual(list(imdb_ids.lookup('tt01134970')), [], "Error longer keys should not be truncated")
+        self.assertEqual(self.df.iloc[imdb_ids.lookup_many(['tt0113041'])]['title'].tolist(), ['Father'])
+
+    def test_duplicates(self):
+        ids = self.indexes['id']
+        self.assertEqual(ids.duplicate_keys().to_dict(), {862: 2, 8844: 2})
+        self.assertEqual(list(ids.duplicate_positions()), [0, 1, 3, 6])
+        pd.testing.assert_frame_equal(find_df_duplicate_rows(self.df, key_index=ids), find_df_duplicate_rows(self.df))
+        with self.assertRaises(ValueError):
+            find_df_duplicate_rows(self.df.iloc[:3], key_index=ids)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            save_key_indexes(self.indexes, tmpdir)
+            loaded = load_key_indexes(tmpdir)
+            self.assertEqual(sorted(loaded), ['id', 'imdb_id'])
+            self.assertIsInstance(loaded['id'].positions, np.memmap, "Error the arrays should be memory-mapped")
+            self.assertEqual(list(loaded['id'].lookup_many([862, 8844])), [0, 3, 1, 6])
+            self.assertEqual(list(loaded['imdb_id'].lookup('tt0114885')), [5])
+            self.assertEqual(loaded['id'].nrows, 8)
+            self.assertEqual(list(loaded['id'].invalid_positions), [4, 5])
+            del loaded
@@ -0,0 +1,33 @@
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np
+
+from mixture_selection import get_warm_start_means, select_n_components
+
+class TestMixtureSelection(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.data = np.concatenate([rng.normal(-5, 1, 1000), rng.normal(0, 1.5, 1500), rng.normal(5, 0.5, 500)])
+
+    def test_select_n_components(self):
+        for max_workers in [1, 2]:
+            selection = select_n_components(self.data, k_range=range(1, 9), max_workers=max_workers, patience=2)
+            self.assertEqual(selection.n_components, 3, f"Error with max_workers:{max_workers}")
+            # the sweep stops within patience of the best k, before the end of the range
+            self.assertLess(selection.scores['k'].max(), 8, "Error the sweep should stop early")
+            self.assertEqual(selection.scores['bic'].idxmin(), selection.scores['k'].tolist().index(3))
+            np.testing.assert_allclose(np.sort(selection.means), [-5, 0, 5], atol=0.5)
+        # many cores still fit a few k at a time, so the sweep stops early
+        with patch('mixture_selection.os.cpu_count', return_value=16):
+            selection = select_n_components(self.data, k_range=range(1, 9), patience=2)
+        self.assertLess(selection.scores['k'].max(), 8, "Error the default batch should stop early")
+        selection = select_n_components(np.random.default_rng(0).normal(size=2000), criterion='aic', max_workers=1)
+        self.assertEqual(selection.n_components, 1)
+        with self.assertRaises(ValueError):
+            select_n_components(self.data, criterion='icl')
+
+    def test_warm_start_means(self):
+        means = get_warm_start_means([0.0, 10.0], [0.5, 0.5], [1.0, 4.0], 3)
+        np.testing.assert_allclose(means.ravel(), [0.0, 8.0, 12.0], err_msg="Error the widest component should be split")
+        self.assertEqual(get_warm_start_means([0.0], [1.0], [1.0], 5).shape, (5, 1))
@@ -0,0 +1,82 @@
+from unittest import TestCase
+import os
+import tempfile
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from arrow_utils import to_arrow_columns
+from multi_hot import build_multi_hot, term_sums, term_means, co_occurrence, save_multi_hot, load_multi_hot
+
+class TestMultiHot(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'genres': [
+                [{'id': 35, 'name': 'Comedy'}, {'id': 16, 'name': 'Animation'}],
+                [{'id': 18, 'name': 'Drama'}],
+                None,
+                [{'id': 35, 'name': 'Comedy'}, {'id': 18, 'name': 'Drama'}, {'id': 35, 'name': 'Comedy'}],
+            ],
+            'spoken_languages': [
+                [{'iso_639_1': 'en', 'name': 'English'}],
+                [{'iso_639_1': 'fr', 'name': 'Français'}, {'iso_639_1': 'en', 'name': 'English'}],
+                [],
+                None,
+            ],
+            'revenue': [100.0, 50.0, 10.0, np.nan],
+        })
+
+    def test_matrix(self):
+        genres = build_multi_hot(self.df['genres'], 'genres')
+        self.assertEqual(list(genres.ids), [16, 18, 35], "Error terms should be in id order")
+        self.assertEqual(list(genres.names), ['Animation', 'Drama', 'Comedy'])
+        np.testing.assert_array_equal(genres.matrix.toarray(), [[1, 0, 1], [0, 1, 0], [0, 0, 0], [0, 1, 1]])
+        self.assertEqual(list(genres.row_counts()), [2, 1, 0, 2], "Error a repeated term should count once")
+
+        arrow_genres = build_multi_hot(to_arrow_columns(self.df)['genres'], 'genres')
+        self.assertEqual((arrow_genres.matrix != genres.matrix).nnz, 0, "Error Arrow and parsed input should agree")
+
+        languages = build_multi_hot(self.df['spoken_languages'], 'spoken_languages')
+        self.assertEqual(list(languages.ids), ['en', 'fr'])
+        self.assertEqual(int((languages.row_counts() > 1).sum()), 1)
+
+    def test_aggregates(self):
+        genres = build_multi_hot(self.df['genres'], 'genres')
+        sums = term_sums(genres, self.df['revenue'])
+        self.assertEqual(sums['Comedy'], 100.0)
+        self.assertEqual(sums['Drama'], 50.0)
+        means = term_means(genres, self.df['revenue'])
+        self.assertEqual(means['Drama'], 50.0, "Error missing values should not count in the mean")
+        self.assertEqual(means['Animation'], 100.0)
+        pairs = co_occurrence(genres, as_frame=True)
+        self.assertEqual(pairs.loc['Comedy', 'Drama'], 1)
+        self.assertEqual(pairs.loc['Comedy', 'Comedy'], 2)
+        self.assertEqual(pairs.loc['Animation', 'Drama'], 0)
+        sparse_pairs = co_occurrence(genres)
+        self.assertTrue(sp.issparse(sparse_pairs), "Error the default should stay sparse")
+        np.testing.assert_array_equal(sparse_pairs.toarray(), pairs.to_numpy())
+        with patch('multi_hot.MAX_FRAME_TERMS', 2):
+            with self.assertRaises(ValueError):
+                co_occurrence(genres, as_frame=True)
+
+    def test_stable_vocabulary_and_persistence(self):
+        genres = build_multi_hot(self.df['genres'], 'genres')
+        more = [[{'id': 10, 'name': 'Western'}, {'id': 35, 'name': 'Comedy'}]]
+        extended = build_multi_hot(more, 'genres', vocabulary=genres)
+        self.assertEqual(list(extended.ids), [16, 18, 35, 10], "Error known terms should keep their columns")
+        np.testing.assert_array_equal(extended.matrix.toarray(), [[0, 0, 1, 1]])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path_stem = os.path.join(tmpdir, "features", "genres")
+            save_multi_hot(genres, path_stem)
+            loaded = load_multi_hot(path_stem)
+            languages = build_multi_hot(self.df['spoken_languages'], 'spoken_languages')
+            save_multi_hot(languages, os.path.join(tmpdir, "languages"))
+            loaded_languages = load_multi_hot(os.path.join(tmpdir, "languages"))
+        self.assertEqual(loaded.column, 'genres')
+        self.assertEqual(list(loaded.ids), [16, 18, 35])
+        self.assertEqual((loaded.matrix != genres.matrix).nnz, 0)
+        self.assertEqual(list(build_multi_hot(more, 'genres', vocabulary=loaded).ids), [16, 18, 35, 10])
+        self.assertEqual(list(loaded_languages.ids), ['en', 'fr'])
@@ -0,0 +1,121 @@
+from unittest import TestCase
+import tempfile
+from unittest.mock import patch
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score
+
+from multimodal_distribution_analysis import (analyses, fit_all_analyses, render_all_analyses, FitCache, get_fit_key,
+                                              agglomerative_clustering_fit, dbscan_clustering_fit, MixtureSelection,
+                                              isolation_forest_analysis_fit, mean_shift_clustering_fit)
+from mixture_selection import select_n_components
+from profile_cache import ProfileCache, array_fingerprint
+
+class TestMultimodalDistributionAnalysis(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.data = np.concatenate([rng.normal(-5, 1, 200), rng.normal(0, 1.5, 300), rng.normal(5, 0.5, 100)])
+
+    def test_pooled_fits_match_inline_fits(self):
+        pooled = fit_all_analyses(self.data, max_workers=2)
+        inline = fit_all_analyses(self.data, max_workers=1)
+        self.assertEqual(len(pooled), len(analyses))
+        for analysis, pooled_result, inline_result in zip(analyses, pooled, inline):
+            self.assertEqual(pooled_result.keys(), inline_result.keys(), f"Error {analysis.name} results differ")
+        # the deterministic fits give the same numbers in a worker
+        for name in ['kde_analysis', 'histogram_analysis', 'mode_finding']:
+            index = [analysis.name for analysis in analyses].index(name)
+            for key, value in inline[index].items():
+                np.testing.assert_allclose(pooled[index][key], value, err_msg=f"Error {name} {key}")
+        histogram = inline[[analysis.name for analysis in analyses].index('histogram_analysis')]
+        self.assertGreater(len(histogram['peak_indices']), 0, "Error the modes should be found as peaks")
+
+    def test_render_results(self):
+        results = fit_all_analyses(self.data, max_workers=1)
+        fig, axes = plt.subplots(4, 4)
+        render_all_analyses(self.data, results, axes.flatten()[1:])
+        titles = [ax.get_title() for ax in axes.flatten()[1:]]
+        self.assertNotIn('', titles, "Error every analysis should be rendered")
+        plt.close(fig)
+
+    def test_fit_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            disk_cache = ProfileCache(cache_dir)
+            results = fit_all_analyses(self.data, max_workers=1, cache=FitCache(disk_cache))
+            # every fit and the mixture selection
+            self.assertEqual(disk_cache.stats()['entries'], len(analyses) + 1)
+            # a later session reads every fit from disk, including the random ones
+            reloaded = fit_all_analyses(self.data, max_workers=1, cache=FitCache(disk_cache))
+            self.assertEqual(disk_cache.hits, len(analyses))
+            for result, reloaded_result in zip(results, reloaded):
+                for key, value in result.items():
+                    np.testing.assert_array_equal(reloaded_result[key], value)
+            cache = FitCache()
+            single, = fit_all_analyses(self.data, cache=cache, indexes=[8])
+            self.assertIs(fit_all_analyses(self.data, cache=cache, indexes=[8])[0], single, "Error the fit should be reused")
+            # the least recently used results are evicted, and read from disk again
+            bounded = FitCache(disk_cache, max_entries=2)
+            for i in range(3):
+                bounded.put(str(i), {'i': i})
+            bounded.get('1')
+            bounded.put('3', {'i': 3})
+            self.assertEqual(list(bounded.results), ['1', '3'])
+            self.assertEqual(bounded.get('0'), {'i': 0})
+            self.assertIsNone(FitCache(max_entries=2).get('0'))
+        fingerprint = array_fingerprint(self.data)
+        kmeans = analyses[8]
+        self.assertNotEqual(get_fit_key(fingerprint, kmeans), get_fit_key(fingerprint, kmeans._replace(params={'n_clusters': 4})))
+        self.assertNotEqual(get_fit_key(fingerprint, kmeans), get_fit_key(array_fingerprint(self.data + 1), kmeans))
+
+    def test_approximations_above_max_exact_rows(self):
+        exact = dbscan_clustering_fit(self.data, max_exact_rows=len(self.data))
+        self.assertEqual(exact['approximation'], 'exact')
+        for fit in [agglomerative_clustering_fit, dbscan_clustering_fit, isolation_forest_analysis_fit]:
+            result = fit(self.data, max_exact_rows=200)
+            self.assertNotEqual(result['approximation'], 'exact', f"Error {fit.__name__} should approximate")
+            self.assertEqual(len(result['labels']), len(self.data), f"Error {fit.__name__} should label every row")
+        # the three modes are intervals, so the subsample clusters them like the full data
+        labels = agglomerative_clustering_fit(self.data, max_exact_rows=200)['labels']
+        self.assertEqual(len(set(zip(labels, np.digitize(self.data, [-2.5, 2.5])))), 3)
+        centers = mean_shift_clustering_fit(self.data, max_exact_rows=200)['centers']
+        self.assertLess(np.abs(np.sort(centers)[[0, -1]] - [-5, 5]).max(), 1)
+
+    def test_dbscan_wide_range_matches_exact(self):
+        # tight clusters next to a range far wider than eps: the coreset
+        # bins must stay a fraction of eps or the clusters would merge
+        rng = np.random.default_rng(3)
+        data = np.concatenate([rng.normal(0, 0.3, 2000), rng.normal(4, 0.3, 2000),
+                               rng.normal(1e4, 1, 2000), rng.uniform(-2e4, 2e4, 3000)])
+        exact = DBSCAN(eps=0.5, min_samples=5).fit(data.reshape(-1, 1)).labels_
+        result = dbscan_clustering_fit(data, max_exact_rows=1000)
+        self.assertNotEqual(result['approximation'], 'exact')
+        self.assertEqual(len(set(result['labels']) - {-1}), len(set(exact) - {-1}), "Error the cluster count should match")
+        self.assertGreater(adjusted_rand_score(exact, result['labels']), 0.99)
+        # past the bin budget, the subsample fallback still separates the clusters
+        with patch('multimodal_distribution_analysis.DBSCAN_MAX_BINS', 100):
+            sampled = dbscan_clustering_fit(data, max_exact_rows=1000)
+        self.assertTrue(sampled['approximation'].startswith('stratified subsample'))
+        dense = np.abs(data) < 5
+        self.assertEqual(len(set(sampled['labels'][dense]) - {-1}), 2, "Error the two tight clusters should stay apart")
+
+    def test_mixture_selection_shared(self):
+        mixtures = [i for i, analysis in enumerate(analyses) if analysis.params.get('n_components') == 'auto']
+        self.assertEqual(len(mixtures), 4)
+        cache = FitCache()
+        with patch('multimodal_distribution_analysis.select_n_components', wraps=select_n_components) as sweep:
+            results = fit_all_analyses(self.data, max_workers=1, cache=cache, indexes=mixtures[:2])
+            results += fit_all_analyses(self.data, max_workers=1, cache=cache, indexes=mixtures[2:])
+        self.assertEqual(sweep.call_count, 1, "Error the components should be selected once per data")
+        self.assertEqual({result['selection'] for result in results}, {'k=3 by BIC'})
+        # the selected means start the fits
+        em = results[mixtures.index([analysis.name for analysis in analyses].index('em_algorithm'))]
+        np.testing.assert_allclose(np.sort(em['means']), [-5, 0, 5], atol=0.5)
+        selection = MixtureSelection(2, np.array([[-5.0], [5.0]]), 'given')
+        result = analyses[mixtures[0]].fit(self.data, n_components=selection)
+        self.assertEqual(len(result['components']), 2)
+        self.assertEqual(result['selection'], 'given')
@@ -0,0 +1,44 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+from near_duplicates import MinHasher, find_near_duplicates, lsh_candidate_pairs, shingle_hashes
+
+class TestNearDuplicates(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        words = np.array([f"word{i}" for i in range(5000)])
+        overviews = [" ".join(rng.choice(words, 40)) for _ in range(200)]
+        self.df = pd.DataFrame({
+            'id': np.arange(200),
+            'title': [f"Movie {i}" for i in range(200)],
+            'overview': overviews,
+        })
+        # a re-release with a slightly edited overview, an exact copy and two empty rows
+        self.df.loc[50, ['title', 'overview']] = ['Movie 7', self.df.loc[7, 'overview'] + ' Remastered.']
+        self.df.loc[90, ['title', 'overview']] = ['MOVIE 7', self.df.loc[7, 'overview']]
+        self.df.loc[120, ['title', 'overview']] = [np.nan, np.nan]
+        self.df.loc[121, ['title', 'overview']] = [np.nan, np.nan]
+
+    def test_shingles(self):
+        shingles, docs = shingle_hashes(pd.Series(["a b c", "Hi", "", "a b"]), shingle_size=2)
+        self.assertEqual(list(docs), [0, 0, 1, 3], "Error short texts should be one shingle, empty texts none")
+        self.assertEqual(shingles[0], shingles[3], "Error equal shingles should hash equally")
+
+    def test_signature_similarity(self):
+        texts = pd.Series([self.df.loc[7, 'overview'], self.df.loc[50, 'overview'], self.df.loc[8, 'overview'], ''])
+        signatures = MinHasher(num_perm=256).signatures(texts, batch_size=3)
+        self.assertGreater((signatures[0] == signatures[1]).mean(), 0.8)
+        self.assertLess((signatures[0] == signatures[2]).mean(), 0.1, "Error unrelated texts should rarely agree")
+        self.assertEqual(len(lsh_candidate_pairs(signatures[[3, 3]], bands=32)), 0,
+                         "Error empty texts should not be candidates")
+        with self.assertRaises(ValueError):
+            lsh_candidate_pairs(signatures, bands=30)
+
+    def test_find_near_duplicates(self):
+        pairs, clusters = find_near_duplicates(self.df, threshold=0.7)
+        self.assertEqual(pairs[['row_a', 'row_b']].values.tolist(), [[7, 50], [7, 90], [50, 90]])
+        self.assertEqual(clusters['row'].tolist(), [7, 50, 90])
+        self.assertEqual(clusters['cluster'].nunique(), 1)
+        self.assertEqual(clusters.set_index('row').loc[90, 'score'], 1.0, "Error the exact copy should score 1")
@@ -0,0 +1,68 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from outlier_utils import find_outliers, find_outliers_in_chunks, OutlierDetector
+
+class TestOutlierUtils(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 5000
+        self.df = pd.DataFrame({
+            'id': np.arange(n),
+            'budget': rng.normal(1e7, 1e6, n),
+            'revenue': rng.normal(5e7, 5e6, n),
+        })
+        self.df.loc[[10, 2000], 'budget'] = [6e7, -3e7]
+        self.df.loc[4000, 'revenue'] = 2e8
+        self.df.loc[7, 'revenue'] = np.nan
+
+    def test_find_outliers_zscore_matches_scipy(self):
+        outliers = find_outliers(self.df, ['budget', 'revenue'])
+        for col in ['budget', 'revenue']:
+            z_scores = stats.zscore(self.df[col], nan_policy='omit')
+            expected_rows = np.flatnonzero(np.abs(np.nan_to_num(z_scores)) > 3)
+            entries = outliers.for_column(col, method='zscore')
+            self.assertEqual(sorted(entries['row']), list(expected_rows), f"zscore rows mismatch for {col}")
+            np.testing.assert_allclose(np.sort(np.abs(entries['score'])), np.sort(np.abs(z_scores[expected_rows])))
+        top_budget = outliers.for_column('budget', method='zscore')
+        self.assertEqual(top_budget['row'].iloc[0], 10, "Error the largest outlier should be listed first")
+
+    def test_robust_methods(self):
+        outliers = find_outliers(self.df, ['budget', 'revenue'])
+        counts = outliers.counts()
+        for method in ['mad', 'iqr']:
+            rows = outliers.outlier_rows(method, cols=['budget'])
+            self.assertIn(10, rows, f"Error {method} should flag row 10")
+            self.assertIn(2000, rows, f"Error {method} should flag row 2000")
+        self.assertLess(counts.loc['budget', 'zscore'], 0.01 * len(self.df), "Error index should be sparse")
+        self.assertEqual(len(outliers), int(counts.to_numpy().sum()))
+
+    def test_zero_scale_column_is_not_scored(self):
+        df = pd.DataFrame({'budget': [0.0] * 90 + [1e6] * 10})
+        outliers = find_outliers(df, ['budget'])
+        self.assertEqual(outliers.counts().loc['budget', 'mad'], 0)
+        self.assertEqual(outliers.counts().loc['budget', 'iqr'], 0)
+
+    def test_streaming_matches_in_memory(self):
+        def make_chunks():
+            return (self.df.iloc[start:start + 700].astype(str) for start in range(0, len(self.df), 700))
+        streamed = find_outliers_in_chunks(make_chunks, ['budget', 'revenue'])
+        exact = find_outliers(self.df, ['budget', 'revenue'])
+        np.testing.assert_array_equal(streamed.outlier_rows('zscore'), exact.outlier_rows('zscore'))
+        for row in [10, 2000, 4000]:
+            self.assertIn(row, streamed.outlier_rows('mad'))
+
+    def test_merge_partitions(self):
+        detector = OutlierDetector(['budget']).fit_exact(self.df)
+        left = OutlierDetector(['budget'])
+        left.params = detector.params
+        left.scan(self.df.iloc[:2500], row_offset=0)
+        right = OutlierDetector(['budget'])
+        right.params = detector.params
+        right.scan(self.df.iloc[2500:], row_offset=2500)
+        merged = left.index.merge(right.index)
+        exact = find_outliers(self.df, ['budget'])
+        np.testing.assert_array_equal(merged.outlier_rows('iqr'), exact.outlier_rows('iqr'))
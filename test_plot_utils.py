@@ -0,0 +1,40 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+from plot_utils import get_column_bins, get_pair_counts, build_scatter_and_density_figure
+
+class TestPlotUtils(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'budget': rng.lognormal(10, 2, 20000),
+            'runtime': np.where(rng.random(20000) < 0.1, np.nan, rng.normal(100, 20, 20000)),
+            'title': 'x',
+        })
+
+    def test_pair_counts_match_histogram2d(self):
+        bins = 20
+        x_edges, x_indexes = get_column_bins(self.df['budget'], bins=bins)
+        y_edges, y_indexes = get_column_bins(self.df['runtime'], bins=bins)
+        self.assertEqual((y_indexes == -1).sum(), self.df['runtime'].isna().sum(), "Error missing values should not be binned")
+        counts = get_pair_counts(x_indexes, y_indexes, bins)
+        valid = self.df['runtime'].notna()
+        expected, _, _ = np.histogram2d(self.df['runtime'][valid], self.df['budget'][valid], bins=[y_edges, x_edges])
+        np.testing.assert_array_equal(counts, expected)
+
+    def test_figure_size_is_bounded_by_bins(self):
+        fig = build_scatter_and_density_figure(self.df, mode='heatmap', bins=10)
+        kinds = sorted(trace.type for trace in fig.data)
+        self.assertEqual(kinds, ['bar', 'bar', 'heatmap', 'heatmap'])
+        for trace in fig.data:
+            if trace.type == 'heatmap':
+                self.assertEqual(np.asarray(trace.z).shape, (10, 10))
+
+        fig = build_scatter_and_density_figure(self.df, mode='scattergl', sample_size=500)
+        scatters = [trace for trace in fig.data if trace.type == 'scattergl']
+        self.assertEqual([len(trace.x) for trace in scatters], [500, 500], "Error scattergl should plot a sample")
+
+        with self.assertRaises(ValueError):
+            build_scatter_and_density_figure(self.df, mode='hexbin')
@@ -0,0 +1,66 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from profile_cache import ProfileCache, column_fingerprint
+from column_catalog import ColumnCatalog
+from stat_utils import compute_column_stats
+
+class TestProfileCache(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, "profiles")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_column_fingerprint(self):
+        a = pd.Series([1.0, 2.0, np.nan], name='budget')
+        b = pd.Series([1.0, 2.0, np.nan], name='revenue', index=[7, 8, 9])
+        self.assertEqual(column_fingerprint(a), column_fingerprint(b), "Error name and index should not matter")
+        self.assertNotEqual(column_fingerprint(a), column_fingerprint(a.astype(np.float32)), "Error dtype should matter")
+        self.assertNotEqual(column_fingerprint(a), column_fingerprint(pd.Series([1.0, 2.5, np.nan])))
+        s = pd.Series(['en', None, 'fr'])
+        self.assertEqual(column_fingerprint(s), column_fingerprint(s.copy()))
+        self.assertNotEqual(column_fingerprint(s), column_fingerprint(pd.Series(['en', None, 'de'])))
+
+    def test_compute_column_stats_cache(self):
+        df = pd.DataFrame({'budget': np.arange(100.0), 'revenue': np.arange(100.0) * 2})
+        first = compute_column_stats(df, cache=ProfileCache(self.cache_path))
+
+        # a new session on the same unchanged columns is all lookups
+        cache = ProfileCache(self.cache_path)
+        df['runtime'] = df['budget']
+        second = compute_column_stats(df, cache=cache)
+        self.assertEqual(cache.hits, 3, "Error runtime has the same content as budget")
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(second['budget'], first['budget'])
+        self.assertEqual(second['runtime'].column, 'runtime')
+
+        df.loc[0, 'revenue'] = -1.0
+        third = compute_column_stats(df, ['revenue'], cache=cache)
+        self.assertEqual(cache.misses, 1, "Error a changed column should be recomputed")
+        self.assertEqual(third['revenue'].min_val, -1.0)
+
+    def test_catalog_cache(self):
+        df = pd.DataFrame({'homepage': [None, 'http://x', None], 'popularity': [1.0, np.nan, 2.0]})
+        ColumnCatalog(df, cache=ProfileCache(self.cache_path))
+        cache = ProfileCache(self.cache_path)
+        catalog = ColumnCatalog(df, cache=cache)
+        self.assertEqual(catalog.profile_count, 0, "Error all profiles should come from the cache")
+        self.assertEqual(cache.hit_rate, 1.0)
+        self.assertEqual(catalog.get('homepage').column_type, 'string')
+        self.assertEqual(catalog.get('popularity').null_count, 1)
+
+    def test_eviction(self):
+        cache = ProfileCache(self.cache_path, max_bytes=3000)
+        for i in range(10):
+            cache.put("blob", f"{i:04d}", np.zeros(100))
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 3000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNotNone(cache.get("blob", "0009"), "Error the latest entry should survive eviction")
+        self.assertIsNone(cache.get("blob", "0000"), "Error the oldest entry should be evicted")
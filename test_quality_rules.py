@@ -0,0 +1,82 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+from quality_rules import compile_rules, check_quality, RuleReport
+from column_types import extract_integer
+
+class TestQualityRules(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': ['1', '2', 'x3', None, '5'],
+            'imdb_id': ['tt0114709', '0113497', None, 'tt12', ' tt7 '],
+            'original_language': ['en', 'eng', 'fr', '', 'EN'],
+            'budget': ['30000000', '-5', 'abc', '0', '1.0'],
+            'runtime': ['81.0', '1500', None, '-1', '90'],
+            'release_date': ['1995-10-30', '1995-13-01', '95-10-30', None, '2001-01-01'],
+            'status': ['Released', 'Rumored', 'Gone', None, ' Planned '],
+            'adult': ['False', 'true', 'yes', None, 'FALSE'],
+        })
+        self.rules = compile_rules()
+
+    def test_violations(self):
+        report = check_quality(self.df, self.rules)
+        counts = report.counts()
+        self.assertEqual(report.rows_checked, 5)
+        self.assertEqual(list(report.violations('id:required')), [3])
+        self.assertEqual(list(report.violations('id:type')), [2])
+        self.assertEqual(list(report.violations('imdb_id:regex')), [1])
+        self.assertEqual(list(report.violations('original_language:regex')), [1, 4])
+        self.assertEqual(list(report.violations('budget:type')), [1, 2])
+        self.assertEqual(list(report.violations('budget:range')), [1], "Error non-numeric values should be left to the type rule")
+        self.assertEqual(list(report.violations('runtime:range')), [1, 3])
+        self.assertEqual(list(report.violations('release_date:regex')), [2])
+        self.assertEqual(list(report.violations('release_date:type')), [1, 2])
+        self.assertEqual(list(report.violations('status:in_set')), [2])
+        self.assertEqual(list(report.violations('adult:type')), [2])
+        self.assertEqual(counts['title:required'], 0, "Error rules of missing columns should not count violations")
+        self.assertIn('title', report.missing_columns)
+        self.assertEqual(list(report.violating_rows(['id:type', 'budget:type'])), [1, 2])
+
+    def test_chunks_match_whole_frame(self):
+        whole = check_quality(self.df, self.rules)
+        report = None
+        for start in range(0, len(self.df), 2):
+            report = check_quality(self.df.iloc[start:start + 2], self.rules, report=report)
+        pd.testing.assert_series_equal(report.counts(), whole.counts())
+        for name in whole.rule_names:
+            self.assertEqual(list(report.violations(name)), list(whole.violations(name)), f"Error rule {name} differs across chunks")
+
+        # positional row ids with an offset, and merging partial reports
+        first = check_quality(self.df.iloc[:3].reset_index(drop=True), self.rules, row_offset=0)
+        second = check_quality(self.df.iloc[3:].reset_index(drop=True), self.rules, row_offset=3)
+        merged = first.merge(second)
+        self.assertEqual(list(merged.violations('runtime:range')), [1, 3])
+        self.assertEqual(merged.rows_checked, 5)
+
+    def test_numeric_dtypes(self):
+        df = pd.DataFrame({'budget': [1.0, -2.0, np.nan, 2.5], 'vote_average': [5.0, 11.0, 0.0, np.nan]})
+        report = check_quality(df, self.rules)
+        self.assertEqual(list(report.violations('budget:type')), [1, 3])
+        self.assertEqual(list(report.violations('budget:range')), [1])
+        self.assertEqual(list(report.violations('vote_average:range')), [1])
+
+    def test_integer_rule_matches_extractor(self):
+        values = ['12', ' 12', '12 ', ' 12.0', '12.05', '-5', '+5', '1e3', '12', None, '  ']
+        report = check_quality(pd.DataFrame({'vote_count': values}), self.rules)
+        expected = [i for i, value in enumerate(values) if value is not None and value.strip() and extract_integer(value) is None]
+        self.assertEqual(list(report.violations('vote_count:type')), expected)
+        report = check_quality(pd.DataFrame({'vote_count': [12.0, -1.0, 2.5, 1e16, np.nan]}), self.rules)
+        self.assertEqual(list(report.violations('vote_count:type')), [1, 2, 3], "Error numeric values should agree with extract_integer")
+
+    def test_config_errors(self):
+        with self.assertRaises(ValueError):
+            compile_rules({'budget': [{'rule': 'range'}]})
+        with self.assertRaises(ValueError):
+            compile_rules({'budget': [{'rule': 'unknown'}]})
+        with self.assertRaises(ValueError):
+            compile_rules({'budget': [{'rule': 'range', 'min': 0}, {'rule': 'range', 'max': 9}]})
+        rules = compile_rules({'budget': [{'rule': 'range', 'min': 0}, {'rule': 'range', 'max': 9, 'name': 'budget:max'}]})
+        self.assertEqual([rule.name for rule in rules], ['budget:range', 'budget:max'])
+        self.assertIsInstance(check_quality(self.df, rules), RuleReport)
@@ -0,0 +1,73 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+from sketch_utils import TDigest, HyperLogLog, MisraGries, ColumnSketch
+from stat_utils import sketch_column_stats, merge_column_sketches
+
+class TestSketchUtils(TestCase):
+
+    def test_tdigest_quantiles(self):
+        rng = np.random.default_rng(1)
+        values = rng.lognormal(10, 2, 200_000)
+        digest = TDigest()
+        for chunk in np.array_split(values, 20):
+            digest.update(chunk)
+        sorted_values = np.sort(values)
+        for q in [0.01, 0.25, 0.5, 0.75, 0.99]:
+            estimate = digest.quantile(q)
+            rank = np.searchsorted(sorted_values, estimate) / len(values)
+            self.assertLess(abs(rank - q), 0.01, f"rank error too large at q={q}")
+        self.assertEqual(digest.quantile(0.0), values.min(), "Error min should be exact")
+        self.assertEqual(digest.quantile(1.0), values.max(), "Error max should be exact")
+        self.assertLess(len(digest.means), 400, "Error digest should stay bounded")
+
+    def test_tdigest_merge(self):
+        rng = np.random.default_rng(2)
+        a = rng.normal(0, 1, 50_000)
+        b = rng.normal(5, 1, 50_000)
+        merged = TDigest().update(a).merge(TDigest().update(b))
+        median = np.median(np.concatenate([a, b]))
+        self.assertAlmostEqual(merged.quantile(0.5), median, delta=0.1)
+        self.assertAlmostEqual(merged.cdf(median), 0.5, delta=0.01)
+
+    def test_hyperloglog(self):
+        hll = HyperLogLog(precision=14)
+        hll.update(np.arange(100_000))
+        estimate = hll.count()
+        self.assertLess(abs(estimate - 100_000) / 100_000, 4 * hll.relative_error, f"estimate {estimate} too far off")
+
+        small = HyperLogLog().update(['en', 'fr', 'en', 'de'])
+        self.assertEqual(small.count(), 3, "Error small cardinalities should be near exact")
+
+        left = HyperLogLog().update([f"tt{i}" for i in range(30_000)])
+        right = HyperLogLog().update([f"tt{i}" for i in range(20_000, 50_000)])
+        merged = left.merge(right).count()
+        self.assertLess(abs(merged - 50_000) / 50_000, 0.05, f"merged estimate {merged} too far off")
+
+    def test_misra_gries(self):
+        values = ['Released'] * 500 + ['Rumored'] * 200 + [f"noise{i}" for i in range(300)]
+        summary = MisraGries(k=10)
+        for chunk in np.array_split(np.array(values, dtype=object), 7):
+            summary.update(chunk)
+        top = summary.top(2)
+        self.assertEqual(list(top.index), ['Released', 'Rumored'])
+        self.assertGreaterEqual(top['Released'], 500 - summary.error_bound)
+        self.assertLessEqual(top['Released'], 500)
+
+    def test_sketch_column_stats_chunks_and_merge(self):
+        df = pd.DataFrame({
+            'budget': [str(i % 50) for i in range(1000)],
+            'status': ['Released' if i % 4 else 'Planned' for i in range(1000)],
+        })
+        df.loc[5, 'budget'] = 'not a number'
+        left = sketch_column_stats([df.iloc[:400], df.iloc[400:700]])
+        right = sketch_column_stats(df.iloc[700:])
+        sketches = merge_column_sketches(left, right)
+        budget = sketches['budget']
+        self.assertIsInstance(budget, ColumnSketch)
+        self.assertEqual(budget.count, 999)
+        self.assertEqual(budget.missing_count, 1)
+        self.assertEqual(budget.nunique(), 50)
+        self.assertAlmostEqual(budget.quantile(0.5), 24.5, delta=1.0)
+        self.assertEqual(sketches['status'].value_counts(1).index[0], 'Released')
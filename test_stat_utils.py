@@ -1,7 +1,11 @@
 from unittest import TestCase
 import pandas as pd
+import numpy as np
+import io
+import contextlib
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
-from stat_utils import show_df_grid, show_duplicates
+from stat_utils import show_df_grid, show_duplicates, compute_column_stats, get_df_grid_preview, compare_numeric_scalers
 
 class TestStatUtils(TestCase):
 
@@ -64,4 +68,130 @@ class TestStatUtils(TestCase):
             'L': ['abcdefghij', 'klmnopqrst', 'uvwxyzabcd', 'efghijklmn', 'klmnopqrst', 'uvwxyzabcd', 'efghijklmn', 'opqrstuvwx']
         }, dtype='str')
 
-        show_df_grid(df, N=3, truncate_length=5, index_width=3)
\ No newline at end of file
+        show_df_grid(df, N=3, truncate_length=5, index_width=3)
+
+class TestComputeColumnStats(TestCase):
+
+    def test_compute_column_stats_matches_pandas(self):
+        rng = np.random.default_rng(7)
+        df = pd.DataFrame({
+            'budget': rng.integers(0, 5, 200) * 1e7,
+            'popularity': rng.lognormal(0, 1, 200),
+            'runtime': rng.normal(100, 20, 200).round(),
+        })
+        df.loc[::9, 'popularity'] = np.nan
+        # values that fail numeric conversion are counted as missing
+        df['runtime'] = df['runtime'].astype(object)
+        df.loc[3, 'runtime'] = 'Beware Of Frost Bites'
+
+        all_stats = compute_column_stats(df)
+        self.assertEqual(set(all_stats.keys()), {'budget', 'popularity', 'runtime'})
+        for col, column_stats in all_stats.items():
+            s = pd.to_numeric(df[col], errors='coerce')
+            self.assertEqual(column_stats.count, s.count(), f"count mismatch for {col}")
+            self.assertEqual(column_stats.missing_count, s.isna().sum(), f"missing mismatch for {col}")
+            self.assertEqual(column_stats.unique_count, s.nunique(), f"nunique mismatch for {col}")
+            self.assertAlmostEqual(column_stats.mean, s.mean(), places=6)
+            self.assertAlmostEqual(column_stats.median, s.median(), places=6)
+            self.assertEqual(column_stats.mode, s.mode().iloc[0], f"mode mismatch for {col}")
+            self.assertAlmostEqual(column_stats.std_dev, s.std(), places=6)
+            self.assertAlmostEqual(column_stats.skew, s.skew(), places=6)
+            self.assertAlmostEqual(column_stats.kurtosis, s.kurtosis(), places=6)
+            self.assertAlmostEqual(column_stats.iqr, s.quantile(0.75) - s.quantile(0.25), places=6)
+            self.assertEqual(column_stats.min_val, s.min())
+            self.assertEqual(column_stats.max_val, s.max())
+            z_scores = np.abs((s - s.mean()) / s.std(ddof=0))
+            self.assertAlmostEqual(column_stats.max_abs_zscore, z_scores.max(), places=6)
+            self.assertEqual(column_stats.zscore_outlier_count, (z_scores > 3).sum())
+
+    def test_compute_column_stats_empty_column(self):
+        df = pd.DataFrame({'revenue': [np.nan, np.nan, np.nan]})
+        column_stats = compute_column_stats(df, ['revenue'])['revenue']
+        self.assertEqual(column_stats.count, 0)
+        self.assertEqual(column_stats.missing_count, 3)
+        self.assertEqual(column_stats.unique_count, 0)
+        self.assertTrue(np.isnan(column_stats.median), "Error median of an empty column should be NaN")
+
+
+class TestShowDfGridPreview(TestCase):
+
+    def test_get_df_grid_preview(self):
+        df = pd.DataFrame(np.arange(1000 * 12).reshape(1000, 12), columns=list('ABCDEFGHIJKL'))
+        head_df, tail_df = get_df_grid_preview(df, 3)
+        self.assertEqual(list(head_df.columns), ['A', 'B', 'C', 'J', 'K', 'L'])
+        self.assertEqual(list(head_df.index), [0, 1, 2])
+        self.assertEqual(list(tail_df.index), [997, 998, 999])
+
+    def test_show_df_grid_prints_only_preview_rows(self):
+        df = pd.DataFrame({col: [f"{col}{i}" for i in range(50)] for col in 'ABCDEFGH'})
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            show_df_grid(df, N=3, val_size=8, col_width=10)
+        text = output.getvalue()
+        for label in ['A0', 'A2', 'A47', 'A49', 'H0', 'H49']:
+            self.assertIn(label, text, f"Error preview should show {label}")
+        for label in ['A3', 'A46', 'D0', 'E0']:
+            self.assertNotIn(label, text, f"Error preview should not show {label}")
+
+    def test_show_df_grid_index_name(self):
+        df = pd.DataFrame({'A': range(10)}, index=pd.Index(range(10), name='movie_idx'))
+        output = io.StringIO()
+        show_df_grid(df, N=2, out=output)
+        header = output.getvalue().splitlines()[1]
+        self.assertEqual(header.split('|')[1].strip(), 'movie_idx', "Error the index name should be the index header")
+
+
+class TestCompareNumericScalers(TestCase):
+
+    def test_summaries_match_sklearn(self):
+        rng = np.random.default_rng(11)
+        df = pd.DataFrame({
+            'budget': rng.lognormal(15, 1, 500),
+            'runtime': rng.normal(100, 15, 500),
+        })
+        df.loc[[3, 40], 'runtime'] = [400.0, 1.0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = compare_numeric_scalers(df, 'budget', threshold=3)
+            frames = compare_numeric_scalers(df, threshold=3, materialize=True)
+
+        standard = StandardScaler().fit_transform(df)
+        clamped = np.clip(standard, -3, 3)
+        kept = standard[(np.abs(standard) <= 3).all(axis=1)]
+        expected = {
+            'standard': standard,
+            'standard_clamped': clamped,
+            'minmax_clamped': MinMaxScaler().fit_transform(clamped),
+            'standard_dropped': kept,
+            'minmax_dropped': MinMaxScaler().fit_transform(kept),
+        }
+        for variant, values in expected.items():
+            np.testing.assert_allclose(frames[variant].to_numpy(), values, atol=1e-9, err_msg=variant)
+            for j, col in enumerate(df.columns):
+                s = pd.Series(values[:, j])
+                summary = summaries[variant][col]
+                self.assertEqual(summary.count, len(s), f"{variant} {col} count")
+                self.assertAlmostEqual(summary.mean, s.mean(), places=9, msg=f"{variant} {col} mean")
+                self.assertAlmostEqual(summary.std_dev, s.std(), places=9, msg=f"{variant} {col} std")
+                self.assertAlmostEqual(summary.min_val, s.min(), places=9, msg=f"{variant} {col} min")
+                self.assertAlmostEqual(summary.max_val, s.max(), places=9, msg=f"{variant} {col} max")
+                self.assertAlmostEqual(summary.skew, s.skew(), places=6, msg=f"{variant} {col} skew")
+                self.assertAlmostEqual(summary.kurtosis, s.kurtosis(), places=6, msg=f"{variant} {col} kurtosis")
+
+    def test_chunked_summaries_match(self):
+        rng = np.random.default_rng(12)
+        df = pd.DataFrame({
+            'budget': rng.lognormal(15, 1, 1000),
+            'runtime': rng.normal(100, 15, 1000),
+        })
+        df.loc[::17, 'budget'] = np.nan
+        df.loc[[5, 500], 'runtime'] = [400.0, 1.0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            whole = compare_numeric_scalers(df, threshold=3, chunk_rows=len(df))
+            chunked = compare_numeric_scalers(df, threshold=3, chunk_rows=7)
+        for variant, summaries in whole.items():
+            for col, summary in summaries.items():
+                other = chunked[variant][col]
+                self.assertEqual(other.count, summary.count, f"Error {variant} {col} count")
+                for field in ['mean', 'std_dev', 'min_val', 'max_val', 'skew', 'kurtosis']:
+                    self.assertAlmostEqual(getattr(other, field), getattr(summary, field), places=9,
+                                           msg=f"Error {variant} {col} {field}")
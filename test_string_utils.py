@@ -1,6 +1,8 @@
 from unittest import TestCase
+import numpy as np
+import pandas as pd
 
-from string_utils import format_value, Justify, SpecialChars
+from string_utils import format_value, format_values, Justify, SpecialChars
 
 class TestStringUtils(TestCase):
   
@@ -101,3 +103,21 @@ class TestStringUtils(TestCase):
         expected = '_{"a"' + SpecialChars.ELIPSIS_CHAR.value + '_'
         self.assertEqual(expected, result, "Expected: {expected}, Got: {result}")
 
+    def test_format_values(self):
+        # format_values matches format_value cell by cell for every dtype branch
+        rng = np.random.default_rng(0)
+        columns = [
+            np.concatenate([rng.normal(0, 1e6, 500), rng.lognormal(0, 20, 500), [0.0, -0.0, np.nan, 1e16, 1e-05, 999.9995, 1.23456789]]),
+            rng.normal(0, 1e4, 200).astype(np.float32),
+            np.concatenate([rng.integers(-10**12, 10**12, 500), [0, 7, 10**17 + 3]]),
+            np.array([True, False, True]),
+            np.array(['Released', 'a very long string', '', '  ', 'x\ny', '12345678901', '007'], dtype=object),
+            np.array(['abc', None, np.nan, 1, 1.0, True, {'a': 1}, 3.14159265358], dtype=object),
+        ]
+        for values in columns:
+            for val_size, fill_width in [(8, 10), (3, 5), (12, 12)]:
+                for justify in [None, Justify.LEFT, Justify.CENTER]:
+                    series = pd.Series(values)
+                    expected = [format_value(x, val_size, fill_width, justify=justify) for x in series.tolist()]
+                    result = format_values(series, val_size, fill_width, justify=justify).tolist()
+                    self.assertEqual(expected, result, f"Error format_values of {series.dtype} val_size:{val_size} justify:{justify}")
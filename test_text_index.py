@@ -0,0 +1,68 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from text_index import TextIndex, vbyte_encode, vbyte_decode
+
+class TestTextIndex(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'title': ['Toy Story', 'Jumanji', 'Toy Soldiers', 'Animal House', None, 'Story of Us'],
+            'original_title': ['Toy Story', 'Jumanji', 'Toy Soldiers', 'Animal House', 'Animação', 'Story of Us'],
+            'overview': ['Led by Woody, toys live happily.', 'Animated board game', None,
+                         'College story', 'Animated', 'A marriage story'],
+            'tagline': [None, 'Roll the dice', None, None, None, None],
+        })
+
+    def test_vbyte_round_trip(self):
+        values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2**31 - 1, 2**40])
+        data = vbyte_encode(values)
+        self.assertEqual(len(data), 1 + 1 + 1 + 2 + 2 + 2 + 3 + 5 + 6)
+        np.testing.assert_array_equal(vbyte_decode(data), values)
+
+    def test_queries(self):
+        index = TextIndex().add(self.df)
+        self.assertEqual(list(index.posting('toy')), [0, 2])
+        self.assertEqual(list(index.posting('Story')), [0, 3, 5], "Error terms should be lowercased")
+        self.assertEqual(list(index.search(['toy', 'story'])), [0])
+        self.assertEqual(list(index.search('toy story')), [0])
+        self.assertEqual(list(index.search(['jumanji', 'soldiers'], mode='or')), [1, 2])
+        self.assertEqual(list(index.search(['toy', 'missing'])), [])
+        self.assertEqual(list(index.prefix_search('anim')), [1, 3, 4], "Error prefixes should match every term once")
+        self.assertEqual(list(index.prefix_terms('anim')), ['animal', 'animated', 'animação'])
+
+    def test_incremental_build_and_persistence(self):
+        whole = TextIndex().add(self.df)
+        index = TextIndex(max_segments=2)
+        for start in range(0, len(self.df), 2):
+            index.add(self.df.iloc[start:start + 2])
+        self.assertLessEqual(len(index.segments), 2, "Error segments should be merged")
+        for term in ['toy', 'story', 'animated', 'dice']:
+            np.testing.assert_array_equal(index.posting(term), whole.posting(term))
+        self.assertEqual(list(index.prefix_search('s')), list(whole.prefix_search('s')))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "text_index.npz")
+            index.save(path)
+            loaded = TextIndex.load(path)
+        self.assertEqual(loaded.rows_indexed, 6)
+        self.assertEqual(loaded.num_terms, whole.num_terms)
+        self.assertEqual(list(loaded.search(['story', 'marriage'])), [5])
+        loaded.add(pd.DataFrame({'title': ['Toy Story 2']}))
+        self.assertEqual(list(loaded.search(['toy', 'story'])), [0, 6], "Error a loaded index should keep growing")
+
+    def test_merge_policy(self):
+        df = pd.concat([self.df] * 20, ignore_index=True)
+        whole = TextIndex().add(df)
+        index = TextIndex(max_segments=8).add_frame(df, chunk_rows=3)
+        sizes = [segment.num_postings for segment in index.segments]
+        self.assertLessEqual(len(sizes), 8)
+        self.assertEqual(sizes, sorted(sizes, reverse=True), "Error only the newest segments should be merged")
+        num_segments = len(index.segments)
+        self.assertEqual(index.num_terms, whole.num_terms)
+        self.assertEqual(len(index.segments), num_segments, "Error num_terms should not merge segments")
+        for term in ['toy', 'story', 'animated', 'dice']:
+            np.testing.assert_array_equal(index.posting(term), whole.posting(term))
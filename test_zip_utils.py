@@ -0,0 +1,85 @@
+from unittest import TestCase
+import os
+import tempfile
+import zipfile
+import pandas as pd
+
+from zip_utils import list_zip_csv_members, read_zip_csv_member, read_zip_csv_members, iter_zip_csv_chunks, is_zip_path, open_zip_csv_member, get_zip_member_stats
+from csv_scanner import read_csv_scanned
+
+class TestZipUtils(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.zip_path = os.path.join(self.tmpdir.name, "movies.zip")
+        self.movies_df = pd.DataFrame({
+            'id': [str(i) for i in range(100)],
+            'title': [f"Title {i}" for i in range(100)]
+        })
+        self.ratings_df = pd.DataFrame({
+            'movieId': [str(i % 7) for i in range(50)],
+            'rating': [str(i % 5) for i in range(50)]
+        })
+        with zipfile.ZipFile(self.zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("bundle/movies_metadata.csv", self.movies_df.to_csv(index=False))
+            zf.writestr("bundle/ratings.csv", self.ratings_df.to_csv(index=False))
+            zf.writestr("bundle/README.txt", "not a csv")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_list_zip_csv_members(self):
+        members = list_zip_csv_members(self.zip_path)
+        self.assertEqual(members, ["bundle/movies_metadata.csv", "bundle/ratings.csv"], f"unexpected members {members}")
+        self.assertTrue(is_zip_path(self.zip_path), "Error zip file should be detected")
+
+    def test_read_zip_csv_member(self):
+        df, stats = read_zip_csv_member(self.zip_path, "movies_metadata.csv", dtype=str)
+        pd.testing.assert_frame_equal(df, self.movies_df)
+        self.assertEqual(stats.rows, 100, "Error should have read 100 rows")
+        self.assertGreater(stats.uncompressed_bytes, 0, "Error should report the member size")
+
+    def test_read_zip_csv_members(self):
+        frames, all_stats = read_zip_csv_members(self.zip_path, max_workers=2, verbose=False, dtype=str)
+        self.assertEqual(set(frames.keys()), {"bundle/movies_metadata.csv", "bundle/ratings.csv"})
+        pd.testing.assert_frame_equal(frames["bundle/ratings.csv"], self.ratings_df)
+        self.assertEqual(len(all_stats), 2, "Error should have stats for each member")
+
+    def test_members_of_the_same_base_name(self):
+        with zipfile.ZipFile(self.zip_path, "a") as zf:
+            zf.writestr("small/ratings.csv", self.ratings_df.iloc[:5].to_csv(index=False))
+        frames, _ = read_zip_csv_members(self.zip_path, verbose=False, dtype=str)
+        self.assertEqual(len(frames["bundle/ratings.csv"]), 50, "Error members should not overwrite each other")
+        self.assertEqual(len(frames["small/ratings.csv"]), 5)
+
+    def test_member_readers(self):
+        reports = []
+
+        def read_movies(f, **read_csv_kwargs):
+            df, report = read_csv_scanned(f, **read_csv_kwargs)
+            reports.append(report)
+            return df
+
+        frames, all_stats = read_zip_csv_members(self.zip_path, ["movies_metadata.csv", "ratings.csv"], verbose=False,
+                                                 readers={"movies_metadata.csv": read_movies}, dtype=str)
+        pd.testing.assert_frame_equal(frames[all_stats[0].member], self.movies_df)
+        self.assertEqual([report.records for report in reports], [100], "Error the given reader should read the member")
+        pd.testing.assert_frame_equal(frames["bundle/ratings.csv"], self.ratings_df)
+
+    def test_iter_zip_csv_chunks(self):
+        chunks = list(iter_zip_csv_chunks(self.zip_path, "movies_metadata.csv", chunksize=30, dtype=str))
+        self.assertEqual([len(chunk) for chunk in chunks], [30, 30, 30, 10])
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.movies_df)
+
+    def test_open_zip_csv_member(self):
+        with open_zip_csv_member(self.zip_path, "movies_metadata.csv") as f:
+            df, report = read_csv_scanned(f, dtype=str)
+        pd.testing.assert_frame_equal(df, self.movies_df)
+        self.assertEqual(report.records, 100, "Error the scanner should read the member")
+        stats = get_zip_member_stats(self.zip_path, "movies_metadata.csv", len(df), 0.5)
+        _, read_stats = read_zip_csv_member(self.zip_path, "movies_metadata.csv", dtype=str)
+        self.assertEqual(stats[:4], read_stats[:4], "Error the member stats should match a pandas read")
+
+    def test_missing_member(self):
+        with self.assertRaises(ValueError):
+            read_zip_csv_member(self.zip_path, "credits.csv")
@@ -0,0 +1,264 @@
+# An inverted full-text index over the text columns of the movies,
+# for keyword lookups without a str.contains scan of every overview.
+#
+# usage:
+# from text_index import TextIndex
+# index = TextIndex()                    # title, original_title, overview, tagline
+# for chunk in pd.read_csv(path, dtype=str, chunksize=10000):
+#     index.add(chunk)
+# index.add_frame(df, chunk_rows=10000)   # a DataFrame in memory, chunk by chunk
+# index.save("text_index.npz")
+# index = TextIndex.load("text_index.npz")
+# rows = index.search(["toy", "story"])              # rows with both terms
+# rows = index.search(["pixar", "dreamworks"], mode='or')
+# rows = index.prefix_search("animat")               # animation, animated, ...
+# df.iloc[rows]
+#
+# Text is lowercased and split into \w+ tokens. Documents are row
+# positions, continuing across the added chunks. Every add builds an
+# immutable segment: a sorted term array and, per term, the sorted row
+# positions delta encoded as variable-byte integers (7 bits per byte,
+# high bit set on all but the last byte of a value). Queries read the
+# postings of each segment and concatenate them, segments cover
+# increasing row ranges. After each add the newest segments are merged
+# while the segment before them is no larger than all of them together,
+# so segment sizes decrease geometrically and each posting is merged
+# O(log n) times, and further while there are more than max_segments.
+# Only save merges every segment into one.
+
+import re
+import numpy as np
+import pandas as pd
+
+TEXT_INDEX_FIELDS = ['title', 'original_title', 'overview', 'tagline']
+TOKEN_PATTERN = r"\w+"
+DEFAULT_MAX_SEGMENTS = 8
+DEFAULT_CHUNK_ROWS = 10000
+
+def tokenize(text):
+    return re.findall(TOKEN_PATTERN, text.lower()) if isinstance(text, str) else []
+
+def vbyte_encode(values):
+    # variable-byte encoding of non-negative integers, vectorized
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += values >= (np.uint64(1) << np.uint64(7 * k))
+    starts = np.cumsum(nbytes) - nbytes
+    owners = np.repeat(np.arange(len(values)), nbytes)
+    shifts = (np.arange(len(owners)) - starts[owners]).astype(np.uint64)
+    data = ((values[owners] >> (np.uint64(7) * shifts)) & np.uint64(0x7F)).astype(np.uint8)
+    data[shifts.astype(np.int64) < nbytes[owners] - 1] |= 0x80
+    return data
+
+def vbyte_decode(data):
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.int64)
+    last = (data & 0x80) == 0
+    group_starts = np.flatnonzero(np.concatenate([[True], last[:-1]]))
+    owners = np.cumsum(np.concatenate([[0], last[:-1]]))
+    shifts = (np.arange(len(data)) - group_starts[owners]).astype(np.uint64)
+    parts = (data & 0x7F).astype(np.uint64) << (np.uint64(7) * shifts)
+    return np.add.reduceat(parts, group_starts).astype(np.int64)
+
+def decode_postings(data, counts):
+    # row positions of consecutive postings of the given lengths, each
+    # delta encoded from its own first row
+    deltas = vbyte_decode(data)
+    if len(deltas) == 0:
+        return deltas
+    rows = np.cumsum(deltas)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    bases = rows[starts] - deltas[starts]
+    return rows - np.repeat(bases, counts)
+
+def tokenize_chunk(chunk, fields):
+    # unique (term, row position) pairs of the text fields of a chunk
+    terms, rows = [], []
+    for field in fields:
+        if field not in chunk.columns:
+            continue
+        tokens = chunk[field].reset_index(drop=True).dropna().astype(str).str.lower().str.findall(TOKEN_PATTERN)
+        tokens = tokens.explode().dropna()
+        terms.append(tokens.to_numpy(dtype=object))
+        rows.append(tokens.index.to_numpy(dtype=np.int64))
+    if len(terms) == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.int64)
+    return np.concatenate(terms), np.concatenate(rows)
+
+def concatenate_rows(parts):
+    # sorted unique rows of the postings of several segments or terms
+    parts = [part for part in parts if len(part) > 0]
+    if len(parts) == 0:
+        return np.empty(0, dtype=np.int64)
+    if len(parts) == 1:
+        return parts[0]
+    return np.unique(np.concatenate(parts))
+
+class TextSegment:
+    """Immutable sorted terms and variable-byte delta encoded postings of a range of rows."""
+
+    def __init__(self, terms, offsets, counts, data):
+        self.terms = terms  # sorted unicode array
+        self.offsets = offsets  # byte offset of each posting in data, plus the end
+        self.counts = counts  # number of rows of each posting
+        self.data = data
+
+    @classmethod
+    def from_pairs(cls, terms, rows):
+        # terms and rows are parallel arrays of term strings and row positions
+        if len(terms) == 0:
+            return cls(np.empty(0, dtype=str), np.zeros(1, dtype=np.int64),
+                       np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8))
+        codes, uniques = pd.factorize(terms, sort=True)
+        keys = np.unique(codes.astype(np.int64) * (int(rows.max()) + 1) + rows)
+        codes, rows = np.divmod(keys, int(rows.max()) + 1)
+        counts = np.bincount(codes, minlength=len(uniques))
+        first = np.concatenate([[True], codes[1:] != codes[:-1]])
+        deltas = np.where(first, rows, rows - np.concatenate([[0], rows[:-1]]))
+        nbytes = np.ones(len(deltas), dtype=np.int64)
+        for k in range(1, 10):
+            nbytes += deltas >= (1 << (7 * k))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, weights=nbytes, minlength=len(uniques)))]).astype(np.int64)
+        return cls(np.asarray(uniques, dtype=str), offsets, counts, vbyte_encode(deltas))
+
+    def __len__(self):
+        return len(self.terms)
+
+    @property
+    def num_postings(self):
+        # (term, row) pairs, the cost of merging the segment
+        return int(self.counts.sum())
+
+    def _decode(self, i):
+        return np.cumsum(vbyte_decode(self.data[self.offsets[i]:self.offsets[i + 1]]))
+
+    def posting(self, term):
+        i = np.searchsorted(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return self._decode(i)
+        return np.empty(0, dtype=np.int64)
+
+    def prefix_range(self, prefix):
+        # positions of the terms starting with prefix
+        lo = np.searchsorted(self.terms, prefix, side='left')
+        hi = np.searchsorted(self.terms, prefix + '\U0010ffff', side='left')
+        return lo, hi
+
+    def pairs(self):
+        # every (term, row) pair of the segment, to merge segments
+        owners = np.repeat(np.arange(len(self.terms)), self.counts)
+        return self.terms[owners], decode_postings(self.data, self.counts)
+
+class TextIndex:
+    """Inverted index of text columns, built chunk by chunk into compressed segments."""
+
+    def __init__(self, fields=TEXT_INDEX_FIELDS, max_segments=DEFAULT_MAX_SEGMENTS):
+        self.fields = list(fields)
+        self.max_segments = max_segments
+        self.segments = []
+        self.rows_indexed = 0
+
+    def add(self, chunk, row_offset=None):
+        # index the text fields of a chunk. Row positions continue from
+        # the previous add unless row_offset is given.
+        if row_offset is None:
+            row_offset = self.rows_indexed
+        terms, rows = tokenize_chunk(chunk, self.fields)
+        self.segments.append(TextSegment.from_pairs(terms, rows + row_offset))
+        self.rows_indexed = row_offset + len(chunk)
+        self.merge_segments(self.get_merge_start())
+        return self
+
+    def add_frame(self, df, chunk_rows=DEFAULT_CHUNK_ROWS):
+        # index a DataFrame chunk_rows rows at a time, one segment each
+        for start in range(0, len(df), chunk_rows):
+            self.add(df.iloc[start:start + chunk_rows])
+        return self
+
+    def get_merge_start(self):
+        # the first of the newest segments to merge after an add: back
+        # while the segment before is no larger than the newer ones
+        # together, or while there would be more than max_segments
+        start = len(self.segments) - 1
+        if start < 1:
+            return 0
+        newer = self.segments[start].num_postings
+        while start > 0 and (self.segments[start - 1].num_postings <= newer or start + 1 > self.max_segments):
+            start -= 1
+            newer += self.segments[start].num_postings
+        return start
+
+    def merge_segments(self, start=0):
+        # merge the segments from start on into one
+        if len(self.segments) - start <= 1:
+            return self
+        pairs = [segment.pairs() for segment in self.segments[start:]]
+        terms = np.concatenate([p[0] for p in pairs])
+        rows = np.concatenate([p[1] for p in pairs])
+        self.segments[start:] = [TextSegment.from_pairs(terms, rows)]
+        return self
+
+    @property
+    def num_terms(self):
+        # distinct terms of all the segments, without merging them
+        if len(self.segments) == 1:
+            return len(self.segments[0])
+        return len(np.unique(np.concatenate([segment.terms for segment in self.segments]))) if self.segments else 0
+
+    def posting(self, term):
+        # sorted row positions of a term
+        return concatenate_rows([segment.posting(term.lower()) for segment in self.segments])
+
+    def search(self, terms, mode='and'):
+        # rows having all (mode='and') or any (mode='or') of the terms
+        if isinstance(terms, str):
+            terms = tokenize(terms)
+        if mode not in ('and', 'or'):
+            raise ValueError(f"unknown search mode:{mode}")
+        # intersect the shortest postings first
+        postings = sorted((self.posting(term) for term in terms), key=len)
+        if len(postings) == 0:
+            return np.empty(0, dtype=np.int64)
+        rows = postings[0]
+        for posting in postings[1:]:
+            if mode == 'and':
+                if len(rows) == 0:
+                    break
+                rows = np.intersect1d(rows, posting, assume_unique=True)
+            else:
+                rows = np.union1d(rows, posting)
+        return rows
+
+    def prefix_terms(self, prefix):
+        prefix = prefix.lower()
+        terms = [segment.terms[slice(*segment.prefix_range(prefix))] for segment in self.segments]
+        return np.unique(np.concatenate(terms)) if terms else np.empty(0, dtype=str)
+
+    def prefix_search(self, prefix):
+        # rows having any term that starts with prefix
+        prefix = prefix.lower()
+        parts = []
+        for segment in self.segments:
+            lo, hi = segment.prefix_range(prefix)
+            if hi > lo:
+                # the postings of the matching terms are contiguous in data
+                rows = decode_postings(segment.data[segment.offsets[lo]:segment.offsets[hi]], segment.counts[lo:hi])
+                parts.append(np.unique(rows))
+        return concatenate_rows(parts)
+
+    def save(self, path):
+        # one merged segment, the postings stay variable-byte encoded
+        self.merge_segments()
+        segment = self.segments[0] if self.segments else TextSegment.from_pairs(np.empty(0, dtype=str), np.empty(0, dtype=np.int64))
+        np.savez(path, terms=segment.terms, offsets=segment.offsets, counts=segment.counts, data=segment.data,
+                 fields=np.asarray(self.fields, dtype=str), rows_indexed=np.int64(self.rows_indexed))
+
+    @classmethod
+    def load(cls, path, max_segments=DEFAULT_MAX_SEGMENTS):
+        with np.load(path, allow_pickle=False) as saved:
+            index = cls(fields=saved['fields'].tolist(), max_segments=max_segments)
+            index.segments = [TextSegment(saved['terms'], saved['offsets'], saved['counts'], saved['data'])]
+            index.rows_indexed = int(saved['rows_indexed'])
+        return index
@@ -0,0 +1,124 @@
+# Read the csv members of the Kaggle movies zip bundle directly
+# from the downloaded zip file without extracting them to disk.
+#
+# usage:
+# from zip_utils import read_zip_csv_members
+# frames, stats = read_zip_csv_members("the-movies-dataset.zip", dtype=str, low_memory=False)
+# movies_df = frames["movies_metadata.csv"]             # keyed by full member name
+# frames, stats = read_zip_csv_members(zip_path, ["movies_metadata.csv", "links.csv"],
+#                                      readers={"movies_metadata.csv": read_movies})
+#
+# Each member is decompressed as a stream straight into pandas.read_csv,
+# or into the reader given for it, and independent members are read
+# concurrently on a thread pool.
+
+import os
+import time
+import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+MOVIES_METADATA_MEMBER = "movies_metadata.csv"
+# the members keyed by movie id that are read along with the metadata
+MOVIES_COMPANION_MEMBERS = ["credits.csv", "keywords.csv", "links.csv"]
+
+# throughput of a single member read, sizes in bytes
+ZipMemberStats = namedtuple(
+    "ZipMemberStats", ["member", "compressed_bytes", "uncompressed_bytes", "rows", "seconds"])
+
+def is_zip_path(path):
+    return path is not None and os.path.isfile(path) and zipfile.is_zipfile(path)
+
+def list_zip_csv_members(zip_path):
+    # return the names of all csv members, in archive order
+    with zipfile.ZipFile(zip_path) as zf:
+        return [info.filename for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith('.csv')]
+
+def resolve_zip_member(zf, member):
+    # find a member by its full name or by its base name, so that
+    # "movies_metadata.csv" also matches "the-movies-dataset/movies_metadata.csv"
+    names = zf.namelist()
+    if member in names:
+        return member
+    matches = [name for name in names if os.path.basename(name) == member]
+    if len(matches) == 0:
+        raise ValueError(f"member:{member} not found in zip file:{zf.filename}")
+    if len(matches) > 1:
+        raise ValueError(f"member:{member} is ambiguous in zip file:{zf.filename}: {matches}")
+    return matches[0]
+
+@contextmanager
+def open_zip_csv_member(zip_path, member):
+    # open one member of the zip file as a binary file object, for
+    # readers other than pandas.read_csv
+    with zipfile.ZipFile(zip_path) as zf:
+        with zf.open(resolve_zip_member(zf, member)) as f:
+            yield f
+
+def read_zip_csv_member(zip_path, member, reader=pd.read_csv, **read_csv_kwargs):
+    # stream one csv member of the zip file into a DataFrame with
+    # reader(binary_file, **read_csv_kwargs), pandas.read_csv by default.
+    # Each call opens its own ZipFile handle so that members can
+    # be decompressed concurrently from separate threads.
+    start = time.perf_counter()
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo(resolve_zip_member(zf, member))
+        with zf.open(info) as f:
+            df = reader(f, **read_csv_kwargs)
+    seconds = time.perf_counter() - start
+    stats = ZipMemberStats(info.filename, info.compress_size, info.file_size, len(df), seconds)
+    return df, stats
+
+def get_zip_member_stats(zip_path, member, rows, seconds):
+    # the ZipMemberStats of a member read through open_zip_csv_member
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo(resolve_zip_member(zf, member))
+    return ZipMemberStats(info.filename, info.compress_size, info.file_size, rows, seconds)
+
+def iter_zip_csv_chunks(zip_path, member, chunksize, **read_csv_kwargs):
+    # yield DataFrame chunks of chunksize rows from one csv member
+    # of the zip file, keeping at most one chunk in memory
+    with zipfile.ZipFile(zip_path) as zf:
+        with zf.open(resolve_zip_member(zf, member)) as f:
+            with pd.read_csv(f, chunksize=chunksize, **read_csv_kwargs) as reader:
+                for chunk in reader:
+                    yield chunk
+
+def read_zip_csv_members(zip_path, members=None, max_workers=4, verbose=True, readers=None, **read_csv_kwargs):
+    # read several csv members of the zip file concurrently.
+    # members defaults to all csv members of the zip file, and readers
+    # maps a member, as named in members, to its read_zip_csv_member reader.
+    # returns a dict of DataFrames keyed by full member name, so members
+    # of the same base name in different directories are all kept,
+    # and the list of ZipMemberStats in the order of members
+    if members is None:
+        members = list_zip_csv_members(zip_path)
+    if len(members) == 0:
+        return {}, []
+    readers = readers or {}
+
+    def read_member(member):
+        return read_zip_csv_member(zip_path, member, reader=readers.get(member, pd.read_csv), **read_csv_kwargs)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(members)))) as executor:
+        results = list(executor.map(read_member, members))
+
+    frames = {stats.member: df for df, stats in results}
+    all_stats = [stats for _, stats in results]
+    if verbose:
+        show_zip_read_stats(all_stats)
+    return frames, all_stats
+
+def show_zip_read_stats(all_stats):
+    # print the per-member throughput of a zip read
+    print(f"{'Member':<32} {'Rows':>10} {'Zipped MB':>10} {'CSV MB':>10} {'Seconds':>8} {'MB/s':>8}")
+    print('-' * 83)
+    for stats in all_stats:
+        zipped_mb = stats.compressed_bytes / 1e6
+        csv_mb = stats.uncompressed_bytes / 1e6
+        mb_per_sec = csv_mb / stats.seconds if stats.seconds > 0 else float('inf')
+        print(f"{stats.member:<32} {stats.rows:>10} {zipped_mb:>10.1f} {csv_mb:>10.1f} {stats.seconds:>8.2f} {mb_per_sec:>8.1f}")
+    print('-' * 83)